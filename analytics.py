@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+평가 결과 분석 - 리포트의 페르소나별 결과를 열 단위 DataFrame으로 모은 뒤 벡터 연산으로 집계
+점수 분포, 부트스트랩 신뢰구간을 포함한 A/B 선호도 평균, 같은 페르소나 반복 평가 간 일치도를 계산
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+RESULT_COLUMNS = ["report_id", "created_at", "kind", "screens", "persona", "score", "preference_a", "preferred",
+                  "cached"]
+SCREEN_KEYS = ["kind", "screens", "persona"]
+
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE_LEVEL = 0.95
+# 재표본 인덱스 행렬의 최대 원소 수 (수천 건을 재표본할 때 메모리를 제한하기 위해 나눠서 계산)
+BOOTSTRAP_MAX_ELEMENTS = 2_000_000
+
+# 반복 평가 점수가 중앙값에서 이 범위 안이면 일치한 것으로 봄
+SCORE_AGREEMENT_TOLERANCE = 1
+
+
+def results_frame(reports: Iterable[Dict]) -> pd.DataFrame:
+    """리포트 목록(ReportStore.iter_results 또는 {"results": [...]})을 결과 한 건당 한 행으로 변환
+
+    JSON에서 값을 꺼내는 부분만 파이썬 반복이고 이후 집계는 모두 열 단위 연산 (실패 결과는 제외)
+    """
+    columns = {name: [] for name in RESULT_COLUMNS}
+    for report in reports:
+        screens = ",".join(report.get("image_hashes", []))
+        for result in report["results"]:
+            if result.get("error"):
+                continue
+            structured = result.get("structured") or {}
+            columns["report_id"].append(report.get("id"))
+            columns["created_at"].append(report.get("created_at"))
+            columns["kind"].append(report.get("kind"))
+            columns["screens"].append(screens)
+            columns["persona"].append(result["persona"])
+            columns["score"].append(structured.get("score"))
+            columns["preference_a"].append(structured.get("preference_a"))
+            columns["preferred"].append(structured.get("preferred"))
+            columns["cached"].append(bool(result.get("cached")))
+    frame = pd.DataFrame(columns)
+    frame["score"] = pd.to_numeric(frame["score"], errors="coerce")
+    frame["preference_a"] = pd.to_numeric(frame["preference_a"], errors="coerce")
+    frame["created_at"] = pd.to_numeric(frame["created_at"], errors="coerce")
+    frame["cached"] = frame["cached"].astype(bool)
+    return frame
+
+
+def bootstrap_ci(values, resamples: int = BOOTSTRAP_RESAMPLES, confidence: float = CONFIDENCE_LEVEL,
+                 seed: Optional[int] = 0) -> Tuple[float, float]:
+    """평균의 부트스트랩 백분위 신뢰구간 (값이 하나면 폭 0, 없으면 NaN)"""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return float("nan"), float("nan")
+    if values.size == 1:
+        return float(values[0]), float(values[0])
+    rng = np.random.default_rng(seed)
+    means = np.empty(resamples)
+    chunk = max(1, BOOTSTRAP_MAX_ELEMENTS // values.size)
+    for start in range(0, resamples, chunk):
+        stop = min(resamples, start + chunk)
+        means[start:stop] = values[rng.integers(0, values.size, size=(stop - start, values.size))].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def score_distribution(frame: pd.DataFrame) -> pd.DataFrame:
+    """페르소나별 단일 화면 점수 분포 (건수, 평균, 표준편차, 최솟값, 사분위수, 최댓값)"""
+    scores = frame.loc[frame["score"].notna(), ["persona", "score"]]
+    distribution = scores.groupby("persona")["score"].describe()
+    return distribution.rename(columns={"25%": "p25", "50%": "median", "75%": "p75"})
+
+
+def preference_summary(frame: pd.DataFrame, resamples: int = BOOTSTRAP_RESAMPLES,
+                       confidence: float = CONFIDENCE_LEVEL) -> pd.DataFrame:
+    """페르소나별 A안 선호도 평균과 부트스트랩 신뢰구간, 선호 안 득표 수"""
+    rated = frame.loc[frame["preference_a"].notna(), ["persona", "preference_a", "preferred"]]
+    grouped = rated.assign(
+        votes_a=rated["preferred"] == "A", votes_b=rated["preferred"] == "B"
+    ).groupby("persona")
+    summary = grouped.agg(
+        count=("preference_a", "size"),
+        mean_a=("preference_a", "mean"),
+        votes_a=("votes_a", "sum"),
+        votes_b=("votes_b", "sum")
+    )
+    intervals = [
+        bootstrap_ci(values.to_numpy(), resamples, confidence)
+        for _, values in grouped["preference_a"]
+    ]
+    summary["ci_low"] = [low for low, _ in intervals]
+    summary["ci_high"] = [high for _, high in intervals]
+    summary["mean_b"] = 100 - summary["mean_a"]
+    return summary[["count", "mean_a", "mean_b", "ci_low", "ci_high", "votes_a", "votes_b"]]
+
+
+def preference_overall(frame: pd.DataFrame, resamples: int = BOOTSTRAP_RESAMPLES,
+                       confidence: float = CONFIDENCE_LEVEL) -> Dict:
+    """전체 결과의 A안 선호도 평균과 부트스트랩 신뢰구간"""
+    values = frame["preference_a"].dropna().to_numpy()
+    if not values.size:
+        return {"count": 0, "mean_a": None, "ci_low": None, "ci_high": None}
+    low, high = bootstrap_ci(values, resamples, confidence)
+    return {"count": int(values.size), "mean_a": float(values.mean()), "ci_low": low, "ci_high": high}
+
+
+def persona_agreement(frame: pd.DataFrame) -> pd.DataFrame:
+    """같은 화면을 같은 페르소나로 여러 번 평가했을 때의 일치도 (2회 이상 새로 평가한 경우만)
+
+    score_agreement: 점수가 중앙값 ±1 안에 든 비율 / vote_agreement: 다수 선호 안을 고른 비율
+    캐시된 결과는 이전 응답의 복사본이므로 독립 표본에서 제외
+    """
+    fresh = frame.loc[~frame["cached"]]
+    fresh = fresh.loc[fresh.groupby(SCREEN_KEYS)["persona"].transform("size") >= 2]
+    fresh = fresh.assign(
+        score_close=(fresh["score"] - fresh.groupby(SCREEN_KEYS)["score"].transform("median")).abs()
+        .le(SCORE_AGREEMENT_TOLERANCE).astype(float).where(fresh["score"].notna()),
+        votes_a=fresh["preferred"] == "A",
+        votes_b=fresh["preferred"] == "B"
+    )
+    agreement = fresh.groupby(SCREEN_KEYS).agg(
+        samples=("persona", "size"),
+        score_std=("score", "std"),
+        score_agreement=("score_close", "mean"),
+        preference_std=("preference_a", "std"),
+        votes_a=("votes_a", "sum"),
+        votes_b=("votes_b", "sum")
+    )
+    votes = agreement["votes_a"] + agreement["votes_b"]
+    agreement["vote_agreement"] = np.maximum(agreement["votes_a"], agreement["votes_b"]) / votes.where(votes > 0)
+    return agreement.drop(columns=["votes_a", "votes_b"])
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+OpenAI API 호출 래퍼 - 요청 타임아웃, Retry-After를 따르는 지수 백오프 재시도, RPM/TPM 토큰 버킷 제한
+PersonaEvaluator의 모든 chat.completions 호출이 이 계층을 거침
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import openai
+
+DEFAULT_TIMEOUT_SECONDS = 60.0
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+# 조직 사용량 한도 (환경 변수로 조정)
+DEFAULT_RPM_LIMIT = int(os.environ.get("OPENAI_RPM_LIMIT", "500"))
+DEFAULT_TPM_LIMIT = int(os.environ.get("OPENAI_TPM_LIMIT", "30000"))
+
+# 실패 유형 (결과 dict의 error_type)
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_TIMEOUT = "timeout"
+ERROR_CONNECTION = "connection"
+ERROR_SERVER = "server_error"
+ERROR_CLIENT = "client_error"
+ERROR_UNKNOWN = "unknown"
+
+
+class TokenBucket:
+    """초당 일정량이 채워지는 토큰 버킷 (capacity는 분당 한도)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # 한도보다 큰 요청은 버킷이 가득 찼을 때 통과시켜 영원히 막히지 않도록 함
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """요청 수(RPM)와 토큰 수(TPM) 버킷을 함께 관리하는 스레드 안전 제한기"""
+
+    def __init__(self, rpm: int = DEFAULT_RPM_LIMIT, tpm: int = DEFAULT_TPM_LIMIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """요청 1건과 예상 토큰만큼 여유가 생길 때까지 대기하고 대기한 시간을 반환"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+                if delay <= 0:
+                    self.requests.tokens -= 1
+                    self.tokens.tokens -= min(estimated_tokens, self.tokens.capacity)
+                    return waited
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, seconds: float) -> None:
+        """429 응답을 받으면 버킷을 비워 다른 스레드도 함께 물러나게 함"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.requests.tokens = min(self.requests.tokens, -seconds * self.requests.rate)
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_limiter_lock = threading.Lock()
+
+
+def shared_rate_limiter() -> RateLimiter:
+    """프로세스 전체에서 공유하는 제한기 (Streamlit 재실행마다 평가기를 새로 만들어도 한도 유지)"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
+
+
+class APICallFailed(Exception):
+    """재시도 후에도 실패한 호출 (error_type과 재시도 횟수 포함)"""
+
+    def __init__(self, message: str, error_type: str, retries: int):
+        super().__init__(message)
+        self.error_type = error_type
+        self.retries = retries
+
+
+def classify_error(error: Exception) -> Tuple[str, bool]:
+    """예외를 (error_type, 재시도 가능 여부)로 분류"""
+    if isinstance(error, openai.RateLimitError):
+        return ERROR_RATE_LIMITED, True
+    if isinstance(error, openai.APITimeoutError):
+        return ERROR_TIMEOUT, True
+    if isinstance(error, openai.APIConnectionError):
+        return ERROR_CONNECTION, True
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code >= 500 or error.status_code in (408, 409):
+            return ERROR_SERVER, True
+        return ERROR_CLIENT, False
+    return ERROR_UNKNOWN, False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """응답 헤더의 retry-after-ms / retry-after 값 (초)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class ResilientClient:
+    """chat.completions 호출에 제한기, 타임아웃, 재시도를 적용"""
+
+    def __init__(self, client: openai.OpenAI, timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY, limiter: Optional[RateLimiter] = None,
+                 tracer=None):
+        self.client = client
+        # client_pool.ConnectionTracer (연결 설정 시간 측정, 없으면 측정하지 않음)
+        self.tracer = tracer
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = limiter if limiter is not None else shared_rate_limiter()
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Retry-After가 있으면 따르고, 없으면 full jitter 지수 백오프"""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def create(self, estimated_tokens: int = 0, **kwargs) -> Tuple[object, Dict]:
+        """chat.completions.create 호출 후 (응답, 호출 정보) 반환, 재시도 소진 시 APICallFailed"""
+        kwargs.setdefault("timeout", self.timeout)
+        info = {"retries": 0, "throttled_seconds": 0.0, "connect_seconds": 0.0}
+        attempt = 0
+        while True:
+            info["throttled_seconds"] += self.limiter.acquire(estimated_tokens)
+            if self.tracer is not None:
+                self.tracer.reset()
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+                self._record_connect(info)
+                return response, info
+            except Exception as e:
+                self._record_connect(info)
+                error_type, retryable = classify_error(e)
+                if not retryable or attempt >= self.max_retries:
+                    raise APICallFailed(str(e), error_type, attempt) from e
+                delay = self.backoff_delay(attempt, e)
+                if error_type == ERROR_RATE_LIMITED:
+                    # 다음 acquire에서 대기하도록 버킷을 비움 (따로 sleep하면 두 번 기다리게 됨)
+                    self.limiter.penalize(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+                info["retries"] = attempt
+
+    def _record_connect(self, info: Dict) -> None:
+        if self.tracer is not None:
+            info["connect_seconds"] += self.tracer.elapsed()
@@ -5,15 +5,28 @@ PRD 기반 핵심 기능 구현
 """
 
 import streamlit as st
-import openai
-import base64
-import json
-import uuid
-from datetime import datetime
-from typing import Dict, List, Optional
+import pandas as pd
 import os
-from PIL import Image
-import io
+import time
+from datetime import datetime
+
+from analytics import persona_agreement, preference_overall, preference_summary, results_frame, score_distribution
+from evaluation_schema import aggregate_rankings, aggregate_scores, variant_label
+from evaluator import (
+    DEFAULT_MAX_CONCURRENCY, FLOW_MAX_SCREENS, MAX_CONCURRENCY_LIMIT, MODEL, RANK_MAX_VARIANTS,
+    REQUEST_MODE_COMBINED, REQUEST_MODE_PER_PERSONA, PersonaEvaluator, summarize_usage
+)
+from image_pipeline import DEFAULT_MAX_EDGE, DEFAULT_QUALITY, PreprocessOptions, make_thumbnail
+from image_store import get_session_image_store
+from jobs import (
+    FINISHED_STATUSES, JOB_INTERRUPTED, JOB_KIND_AB, JOB_KIND_FLOW, JOB_KIND_RANK, JOB_KIND_SINGLE, RESULT_FIELDS,
+    JobManager
+)
+from metrics import TARGET_RUN_COST_KRW, TARGET_RUN_SECONDS, run_summary, serve_metrics, shared_metrics
+from persona_registry import PersonaRegistry
+from reports import ReportStore
+from result_cache import ResultCache
+from sampling import MAX_SAMPLES_LIMIT, SamplingOptions
 
 # 페이지 설정
 st.set_page_config(
@@ -22,185 +35,338 @@ st.set_page_config(
     layout="wide"
 )
 
-# 기본 페르소나 라이브러리 (P0 요구사항)
-DEFAULT_PERSONAS = {
-    "개발자": {
-        "description": "5년 경력의 백엔드 개발자. 기술적 세부사항을 중시하고, 효율성과 논리적 구조를 선호한다.",
-        "characteristics": "기술 친화적, 논리적 사고, 효율성 중시, 복잡한 UI보다 기능성 선호"
-    },
-    "기획자": {
-        "description": "3년 경력의 제품 기획자. 사용자 경험과 비즈니스 가치를 균형있게 고려한다.",
-        "characteristics": "사용자 중심적 사고, 비즈니스 임팩트 고려, 데이터 기반 의사결정 선호"
-    },
-    "비숙련 사용자": {
-        "description": "IT 기술에 익숙하지 않은 40대 일반 사용자. 직관적이고 간단한 인터페이스를 선호한다.",
-        "characteristics": "기술 비친화적, 직관성 중시, 복잡한 기능 회피, 명확한 안내 필요"
-    },
-    "디자이너": {
-        "description": "UI/UX 디자이너로 시각적 일관성과 사용자 경험을 중시한다.",
-        "characteristics": "시각적 일관성 중시, 사용자 경험 전문가, 접근성 고려, 트렌드 민감"
-    },
-    "마케터": {
-        "description": "디지털 마케팅 담당자로 전환율과 사용자 참여도를 중시한다.",
-        "characteristics": "전환율 중시, 사용자 참여도 관심, 명확한 CTA 선호, 브랜딩 고려"
-    }
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """세션과 재실행 사이에서 공유하는 평가 결과 캐시"""
+    return ResultCache()
+
+REQUEST_MODE_LABELS = {
+    REQUEST_MODE_PER_PERSONA: "페르소나별 개별 요청 (빠름)",
+    REQUEST_MODE_COMBINED: "한 번에 묶어서 요청 (이미지 토큰 절감)"
 }
 
-class PersonaEvaluator:
-    def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
+# 진행 중인 작업을 다시 그리는 간격 (초)
+JOB_POLL_INTERVAL = 1.0
+
+JOB_SESSION_KEYS = {
+    JOB_KIND_SINGLE: "job_single", JOB_KIND_AB: "job_ab", JOB_KIND_FLOW: "job_flow", JOB_KIND_RANK: "job_rank"
+}
+JOB_TITLES = {
+    JOB_KIND_SINGLE: ("📊 평가 결과", "평가"),
+    JOB_KIND_AB: ("📊 A/B 테스트 결과", "비교 평가"),
+    JOB_KIND_FLOW: ("📊 사용자 흐름 평가 결과", "흐름 평가"),
+    JOB_KIND_RANK: ("📊 디자인 변형 순위 결과", "순위 평가")
+}
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """모든 세션이 공유하는 백그라운드 작업 관리자 (스크립트 재실행과 무관하게 계속 실행)"""
+    return JobManager(report_store=get_report_store())
+
+@st.cache_resource
+def start_metrics_server():
+    """PERSONA_METRICS_PORT가 설정되면 /metrics (Prometheus)와 /metrics.csv를 제공 (프로세스당 한 번)"""
+    port = os.environ.get("PERSONA_METRICS_PORT")
+    return serve_metrics(shared_metrics(), int(port)) if port else None
+
+@st.cache_resource
+def get_persona_registry() -> PersonaRegistry:
+    """기본 + 커스텀 페르소나 라이브러리 (파일이 바뀌면 다음 재실행 때 자동 반영)"""
+    return PersonaRegistry()
+
+@st.cache_resource
+def get_report_store() -> ReportStore:
+    """완료된 평가를 공유 링크(?report=<id>)로 다시 보여주는 리포트 저장소"""
+    return ReportStore()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def report_thumbnail(data: bytes) -> bytes:
+    """리포트 이미지 미리보기 (재실행마다 원본 전체를 디코딩하지 않도록 썸네일을 캐시)"""
+    return make_thumbnail(data)
+
+def load_upload(image_store, evaluator: PersonaEvaluator, uploaded):
+    """업로드 이미지를 세션 저장소에서 불러옴 (크기 제한을 넘거나 읽을 수 없으면 오류를 표시하고 None)"""
+    try:
+        return image_store.load(uploaded, evaluator.image_options, evaluator.prepare_image)
+    except (TypeError, ValueError) as e:
+        st.error(f"{uploaded.name}: {str(e)}")
+        return None
+
+def render_job(job_manager: JobManager, job_id: str):
+    """작업 결과 표시 (진행 중이면 폴링하는 프래그먼트로 표시)"""
+    job = job_manager.get(job_id)
+    if job is None:
+        forget_job(job_id)
+        st.warning("평가 작업을 찾을 수 없습니다. 다시 평가를 시작해주세요.")
+        return
+    if job["status"] in FINISHED_STATUSES:
+        render_job_body(job)
+    else:
+        poll_job(job_manager, job_id)
+
+def forget_job(job_id: str):
+    """작업 저장소에서 사라진 작업 ID를 세션에서 제거 (다음 재실행부터 다시 조회하지 않음)"""
+    for key in JOB_SESSION_KEYS.values():
+        if st.session_state.get(key) == job_id:
+            del st.session_state[key]
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def poll_job(job_manager: JobManager, job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        # 폴링 중에 작업 DB가 비워지거나 교체된 경우
+        forget_job(job_id)
+        st.info("평가 작업을 더 이상 찾을 수 없습니다. 다시 평가를 시작해주세요.")
+        return
+    render_job_body(job)
+    if job["status"] in FINISHED_STATUSES:
+        # 전체 앱을 다시 실행하여 완료된 결과를 폴링 없이 표시
+        st.rerun()
+
+def render_job_body(job):
+    """페르소나별 완료 결과, 생성 중인 텍스트, 대기 상태와 집계를 표시"""
+    heading, title = JOB_TITLES[job["kind"]]
+    field = RESULT_FIELDS[job["kind"]]
+    results = {result["persona"]: result for result in job["results"]}
     
-    def encode_image(self, image_input) -> str:
-        """이미지를 base64로 인코딩 (파일 업로드 또는 PIL Image 지원)"""
-        # Check for None or invalid input types
-        if image_input is None:
-            raise ValueError("이미지 입력이 None입니다.")
-        
-        # Check if input is a DeltaGenerator or other Streamlit object
-        if hasattr(image_input, '__class__') and 'DeltaGenerator' in str(type(image_input)):
-            raise TypeError("DeltaGenerator 객체는 이미지로 처리할 수 없습니다. 올바른 이미지를 업로드해주세요.")
-        
-        # Check if input is a PIL Image
-        if hasattr(image_input, 'save') and hasattr(image_input, 'format'):
-            try:
-                # PIL Image의 경우
-                img_bytes = io.BytesIO()
-                image_input.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
-                return base64.b64encode(img_bytes.getvalue()).decode('utf-8')
-            except Exception as e:
-                raise ValueError(f"PIL 이미지 처리 중 오류가 발생했습니다: {str(e)}")
-        
-        # Check if input has getvalue method (file upload)
-        elif hasattr(image_input, 'getvalue'):
-            try:
-                # 파일 업로드의 경우 (BytesIO)
-                return base64.b64encode(image_input.getvalue()).decode('utf-8')
-            except Exception as e:
-                raise ValueError(f"파일 업로드 처리 중 오류가 발생했습니다: {str(e)}")
-        
+    st.subheader(heading)
+    st.progress(len(results) / len(job["personas"]), text=f"{len(results)}/{len(job['personas'])} 페르소나 완료")
+    if job["status"] == JOB_INTERRUPTED:
+        st.warning("서버가 재시작되어 작업이 중단되었습니다. 다시 시작하면 완료된 페르소나는 캐시에서 바로 불러옵니다.")
+    
+    for persona in job["personas"]:
+        result = results.get(persona)
+        if result is None:
+            with st.expander(f"🎭 {persona} 페르소나 {title}", expanded=True):
+                partial = job["partial"].get(persona)
+                if partial:
+                    # 흐름/순위 평가는 단계·비교 진행 상황 텍스트, 나머지는 생성 중인 JSON
+                    st.code(partial, language=None if job["kind"] in (JOB_KIND_FLOW, JOB_KIND_RANK) else "json")
+                else:
+                    st.caption("응답 대기 중...")
+            continue
+        render_result(result, field, title)
+    
+    if job["status"] not in FINISHED_STATUSES:
+        return
+    render_summary(job["kind"], list(results.values()), job["request_mode"])
+    if job.get("report_id"):
+        st.markdown(f"🔗 공유 링크: [`?report={job['report_id']}`](?report={job['report_id']})")
+        render_history(get_report_store(), job["report_id"], job["kind"])
+
+def render_result(result, field: str, title: str):
+    """페르소나 한 명의 평가 결과"""
+    icon = "⚠️" if result.get("error") else "🎭"
+    with st.expander(f"{icon} {result['persona']} 페르소나 {title}", expanded=True):
+        if result.get('error'):
+            st.error(result[field])
         else:
-            # Unsupported input type
-            raise TypeError(f"지원되지 않는 이미지 형식입니다: {type(image_input)}. PIL Image 또는 파일 업로드만 지원됩니다.")
+            st.markdown(result[field])
+        st.caption(format_result_meta(result))
+
+def render_summary(kind: str, results, request_mode: str):
+    """평균 점수 또는 선호도 차트와 토큰 사용량"""
+    if kind == JOB_KIND_SINGLE:
+        render_score_summary(results)
+    elif kind == JOB_KIND_FLOW:
+        render_flow_summary(results)
+    elif kind == JOB_KIND_RANK:
+        render_ranking_summary(results)
+    else:
+        render_preference_summary(results)
+    st.caption(f"토큰 사용량 ({REQUEST_MODE_LABELS[request_mode]}): {format_usage(results)}")
+
+def render_report(report_store: ReportStore, report_id: str):
+    """저장된 리포트 표시 (모델 호출 없이 저장소에서 바로 불러옴)"""
+    started = time.perf_counter()
+    report = report_store.load(report_id)
+    load_ms = (time.perf_counter() - started) * 1000
+    if report is None:
+        st.error("리포트를 찾을 수 없습니다. 링크를 다시 확인해주세요.")
+        return
     
-    def evaluate_single_screen(self, image_base64: str, persona_name: str, persona_info: Dict) -> Dict:
-        """단일 화면 평가 (P0 요구사항)"""
-        prompt = f"""
-        당신은 '{persona_name}' 페르소나입니다.
-        
-        페르소나 정보:
-        - 설명: {persona_info['description']}
-        - 특성: {persona_info['characteristics']}
-        
-        첨부된 프로토타입 화면을 이 페르소나의 관점에서 평가해주세요.
-        
-        다음 형식으로 응답해주세요:
-        1. 전체적인 인상 (1-10점)
-        2. 장점 (3가지)
-        3. 단점 (3가지)
-        4. 개선 제안 (3가지)
-        5. 이 페르소나가 가장 중요하게 생각할 요소
-        
-        구체적이고 실용적인 피드백을 제공해주세요.
-        """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1000
-            )
-            
-            return {
-                "persona": persona_name,
-                "evaluation": response.choices[0].message.content,
-                "timestamp": datetime.now().isoformat()
-            }
-        except Exception as e:
-            return {
-                "persona": persona_name,
-                "evaluation": f"평가 중 오류가 발생했습니다: {str(e)}",
-                "timestamp": datetime.now().isoformat()
-            }
+    heading, title = JOB_TITLES[report["kind"]]
+    st.subheader(heading)
+    created_at = datetime.fromtimestamp(report["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+    duration = f" · 평가 소요 {report['duration_seconds']:.1f}초" if report["duration_seconds"] is not None else ""
+    st.caption(f"리포트 {report['id']} · {created_at}{duration} · 불러오기 {load_ms:.0f}ms")
     
-    def compare_ab_test(self, image_a_base64: str, image_b_base64: str, 
-                       persona_name: str, persona_info: Dict) -> Dict:
-        """A/B 테스트 평가 (P0 요구사항)"""
-        prompt = f"""
-        당신은 '{persona_name}' 페르소나입니다.
-        
-        페르소나 정보:
-        - 설명: {persona_info['description']}
-        - 특성: {persona_info['characteristics']}
-        
-        첨부된 두 개의 프로토타입 화면(A안, B안)을 비교하여 평가해주세요.
-        
-        다음 형식으로 응답해주세요:
-        1. 선호하는 안: A안 또는 B안
-        2. 선호도: A안 vs B안 (예: 70% vs 30%)
-        3. 선택 이유 (구체적으로 3가지)
-        4. A안의 장단점
-        5. B안의 장단점
-        6. 이 페르소나 관점에서의 최종 추천
-        
-        객관적이고 구체적인 근거를 제시해주세요.
-        """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_a_base64}"
-                                }
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_b_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1200
+    images = report["images"]
+    if report["kind"] == JOB_KIND_SINGLE:
+        captions = ["평가 대상 프로토타입"]
+    elif report["kind"] in (JOB_KIND_AB, JOB_KIND_RANK):
+        captions = [f"{variant_label(index)}안" for index in range(len(images))]
+    else:
+        captions = [f"{index}단계" for index in range(1, len(images) + 1)]
+    columns = st.columns(min(len(images), 5) or 1)
+    for index, (image, caption) in enumerate(zip(images, captions)):
+        with columns[index % len(columns)]:
+            st.image(report_thumbnail(image["data"]), caption=caption, width=400)
+    
+    for result in report["results"]:
+        render_result(result, RESULT_FIELDS[report["kind"]], title)
+    render_summary(report["kind"], report["results"], report["request_mode"])
+    render_history(report_store, report_id, report["kind"])
+
+def render_score_summary(results):
+    score_stats = aggregate_scores(results)
+    if score_stats["count"]:
+        st.metric(
+            "페르소나 평균 점수",
+            f"{score_stats['mean']:.1f} / 10",
+            help=f"최저 {score_stats['min']}점 · 최고 {score_stats['max']}점 ({score_stats['count']}명)"
+        )
+
+def render_flow_summary(results):
+    """페르소나별 단계 점수 추이와 예상 이탈 지점"""
+    flows = {
+        result["persona"]: result["structured"] for result in results
+        if not result.get("error") and result.get("structured", {}).get("scores")
+    }
+    if not flows:
+        return
+    means = [flow["mean_score"] for flow in flows.values() if flow["mean_score"] is not None]
+    drop_offs = {persona: flow["drop_off_step"] for persona, flow in flows.items() if flow["drop_off_step"]}
+    st.metric(
+        "흐름 평균 점수",
+        f"{sum(means) / len(means):.1f} / 10" if means else "-",
+        help="예상 이탈: " + (", ".join(f"{persona} {step}단계" for persona, step in drop_offs.items()) or "없음")
+    )
+    steps = max(len(flow["scores"]) for flow in flows.values())
+    st.line_chart(pd.DataFrame(
+        {persona: flow["scores"] + [None] * (steps - len(flow["scores"])) for persona, flow in flows.items()},
+        index=[f"{step}단계" for step in range(1, steps + 1)]
+    ))
+
+def render_ranking_summary(results):
+    """페르소나 순위를 합친 변형별 평균 순위와 1위 득표"""
+    ranking_stats = aggregate_rankings(results)
+    if not ranking_stats["count"]:
+        return
+    best = ranking_stats["order"][0]
+    st.metric(
+        "종합 1위",
+        f"{best}안",
+        help=f"평균 순위 {ranking_stats['mean_ranks'][best]:.1f}위 · 1위 선택 {ranking_stats['first_votes'][best]}명 "
+             f"({ranking_stats['count']}명)"
+    )
+    st.dataframe(pd.DataFrame(
+        {
+            "평균 순위": list(ranking_stats["mean_ranks"].values()),
+            "1위 선택": list(ranking_stats["first_votes"].values()),
+        },
+        index=[f"{variant}안" for variant in ranking_stats["order"]]
+    ))
+
+def render_preference_summary(results):
+    """디자인별/페르소나별 선호도 비교 차트 (PRD P0)"""
+    frame = results_frame([{"results": results}])
+    overall = preference_overall(frame)
+    if not overall["count"]:
+        return
+    summary = preference_summary(frame)
+    st.metric(
+        "평균 선호도",
+        f"A안 {overall['mean_a']:.0f}% vs B안 {100 - overall['mean_a']:.0f}%",
+        help=f"A안 선호도 95% 신뢰구간 {overall['ci_low']:.0f}–{overall['ci_high']:.0f}% · "
+             f"A안 선호 {summary['votes_a'].sum()}명 · B안 선호 {summary['votes_b'].sum()}명"
+    )
+    st.bar_chart(summary[["mean_a", "mean_b"]].rename(columns={"mean_a": "A안", "mean_b": "B안"}))
+
+def render_history(report_store: ReportStore, report_id: str, kind: str):
+    """같은 화면 조합의 저장된 리포트를 모두 모은 누적 통계 (두 번 이상 실행한 경우)"""
+    if kind not in (JOB_KIND_SINGLE, JOB_KIND_AB):
+        return
+    frame = results_frame(report_store.iter_results(same_screens_as=report_id))
+    runs = frame["report_id"].nunique()
+    if runs < 2:
+        return
+    with st.expander(f"📈 같은 화면 누적 통계 ({runs}회 실행)"):
+        if kind == JOB_KIND_SINGLE:
+            st.dataframe(score_distribution(frame).round(2))
+        else:
+            st.caption("A안 선호도 평균과 95% 부트스트랩 신뢰구간")
+            st.dataframe(preference_summary(frame).round(1))
+        agreement = persona_agreement(frame)
+        if not agreement.empty:
+            st.caption("반복 평가 일치도 (캐시되지 않은 평가가 2회 이상인 페르소나)")
+            st.dataframe(agreement.droplevel(["kind", "screens"]).dropna(axis=1, how="all").round(2))
+
+def format_result_meta(result) -> str:
+    """평가 시간, 캐시 여부, 재시도/실패 정보를 한 줄로 표시"""
+    meta = f"평가 시간: {result['timestamp']}"
+    if result.get('cached'):
+        meta += " · 캐시된 결과"
+    if result.get('ttft_seconds') is not None and not result.get('cached'):
+        meta += f" · 첫 토큰 {result['ttft_seconds']:.1f}초 · 전체 {result['latency_seconds']:.1f}초"
+    if result.get('connect_seconds'):
+        meta += f" · 연결 설정 {result['connect_seconds'] * 1000:.0f}ms"
+    sampling = result.get('sampling')
+    if sampling and sampling.get('std') is not None:
+        unit = "%" if sampling['field'] == "preference_a" else "점"
+        meta += (f" · 샘플 {sampling['samples']}개 (요청 {sampling['requests']}회) · 표준편차 {sampling['std']:.1f}{unit}"
+                 f" · 95% 신뢰구간 {sampling['ci_low']:.1f}–{sampling['ci_high']:.1f}{unit}")
+    if result.get('reused_steps'):
+        meta += f" · 변경 없는 {result['reused_steps']}단계 재사용"
+    if result.get('reused_comparisons'):
+        meta += f" · 이전 비교 {result['reused_comparisons']}회 재사용"
+    if result.get('retries'):
+        meta += f" · 재시도 {result['retries']}회"
+    if result.get('error'):
+        meta += f" · 실패 유형: {result.get('error_type', 'unknown')}"
+    return meta
+
+def format_usage(results) -> str:
+    """결과 목록의 토큰 사용량 요약 문자열"""
+    usage = summarize_usage(results)
+    return (
+        f"요청 {usage['requests']}회 · 입력 토큰 {usage['prompt_tokens']:,} · "
+        f"출력 토큰 {usage['completion_tokens']:,} · 합계 {usage['total_tokens']:,}"
+    )
+
+def render_metrics_panel(evaluator: PersonaEvaluator, job):
+    """모델 호출 p50/p95 지연과 최근 실행의 예상 비용을 PRD 목표(5분 이내 / 1만원 이하)와 비교"""
+    summary = evaluator.metrics.summary()
+    st.sidebar.markdown("### ⏱️ 성능 / 비용")
+    if summary["p50_latency_seconds"] is not None:
+        st.sidebar.markdown(
+            f"호출 지연 p50 {summary['p50_latency_seconds']:.1f}초 · p95 {summary['p95_latency_seconds']:.1f}초"
+        )
+        if summary["p50_ttft_seconds"] is not None:
+            st.sidebar.caption(
+                f"첫 토큰 p50 {summary['p50_ttft_seconds']:.1f}초 · p95 {summary['p95_ttft_seconds']:.1f}초"
             )
-            
-            return {
-                "persona": persona_name,
-                "comparison": response.choices[0].message.content,
-                "timestamp": datetime.now().isoformat()
-            }
-        except Exception as e:
-            return {
-                "persona": persona_name,
-                "comparison": f"비교 평가 중 오류가 발생했습니다: {str(e)}",
-                "timestamp": datetime.now().isoformat()
-            }
+        if summary["prompt_tokens"]:
+            st.sidebar.caption(f"프롬프트 캐시 적중 {summary['cached_tokens'] / summary['prompt_tokens']:.0%} (입력 토큰 기준)")
+    else:
+        st.sidebar.caption("아직 기록된 모델 호출이 없습니다.")
+    
+    if job and job["status"] in FINISHED_STATUSES:
+        run = run_summary(MODEL, summarize_usage(job["results"]), job["updated_at"] - job["created_at"])
+        st.sidebar.markdown(
+            f"최근 실행: {'✅' if run['within_time'] else '⚠️'} {run['duration_seconds']:.0f}초 "
+            f"(목표 {TARGET_RUN_SECONDS // 60}분) · "
+            f"{'✅' if run['within_cost'] else '⚠️'} 약 {run['cost_krw']:,.0f}원 (목표 {TARGET_RUN_COST_KRW:,}원)"
+        )
+    
+    col_csv, col_prom = st.sidebar.columns(2)
+    col_csv.download_button("CSV", evaluator.metrics.to_csv(), file_name="persona_metrics.csv", mime="text/csv")
+    col_prom.download_button("Prometheus", evaluator.metrics.to_prometheus(), file_name="persona_metrics.prom",
+                             mime="text/plain")
 
 def main():
     st.title("🤖 AI 페르소나 프로토타입 평가 에이전트")
     st.markdown("### SaaS 프로토타입을 AI 페르소나가 빠르게 평가해드립니다")
     
+    # 공유 링크로 접속한 경우 저장된 리포트만 표시 (API 키 불필요)
+    report_id = st.query_params.get("report")
+    if report_id:
+        render_report(get_report_store(), report_id)
+        if st.button("새 평가 시작"):
+            st.query_params.clear()
+            st.rerun()
+        return
+    
     # API 키 입력 (기본값 설정)
     default_api_key = ""
     api_key = st.sidebar.text_input("OpenAI API Key", value=default_api_key, type="password")
@@ -208,20 +374,75 @@ def main():
         st.warning("OpenAI API 키를 입력해주세요.")
         return
     
-    evaluator = PersonaEvaluator(api_key)
+    # 이미지 전처리 설정
+    with st.sidebar.expander("🖼️ 이미지 전처리"):
+        max_edge = st.select_slider(
+            "최대 긴 변 (px)",
+            options=[768, 1024, 1536, 2048],
+            value=DEFAULT_MAX_EDGE,
+            help="GPT-4o는 2048px 안으로 맞춘 뒤 짧은 변 768px로 축소하므로 그 이상은 자동으로 줄여 전송합니다."
+        )
+        output_format_label = st.selectbox("재압축 포맷", ["원본 유지", "JPEG", "WEBP"])
+        quality = st.slider("압축 품질", min_value=50, max_value=95, value=DEFAULT_QUALITY,
+                            disabled=output_format_label == "원본 유지")
+    image_options = PreprocessOptions(
+        max_edge=max_edge,
+        output_format=None if output_format_label == "원본 유지" else output_format_label,
+        quality=quality
+    )
+    
+    with st.sidebar.expander("🎲 반복 샘플링"):
+        max_samples = st.slider(
+            "페르소나당 최대 샘플 수",
+            min_value=1,
+            max_value=MAX_SAMPLES_LIMIT,
+            value=1,
+            help="2 이상이면 한 요청에서 여러 응답(n=)을 받아 점수/선호도의 평균과 신뢰구간을 표시합니다. "
+                 "신뢰구간이 아래 기준보다 좁아지면 추가 샘플을 요청하지 않습니다. (페르소나별 개별 요청에서만 사용)"
+        )
+        score_ci_width = st.slider("점수 신뢰구간 기준 (점)", min_value=0.5, max_value=3.0, value=1.0, step=0.5,
+                                   disabled=max_samples == 1)
+        preference_ci_width = st.slider("선호도 신뢰구간 기준 (%p)", min_value=5, max_value=30, value=10, step=5,
+                                        disabled=max_samples == 1)
+    sampling = SamplingOptions(
+        max_samples=max_samples, score_ci_width=score_ci_width, preference_ci_width=preference_ci_width
+    )
+    
+    result_cache = get_result_cache()
+    start_metrics_server()
+    evaluator = PersonaEvaluator(api_key, cache=result_cache, image_options=image_options, sampling=sampling)
+    # 업로드 이미지는 세션당 한 번만 전처리/인코딩하고 재실행과 모드 전환 간에 재사용
+    image_store = get_session_image_store(st.session_state)
+    
+    max_concurrency = st.sidebar.slider(
+        "동시 평가 수",
+        min_value=1,
+        max_value=MAX_CONCURRENCY_LIMIT,
+        value=DEFAULT_MAX_CONCURRENCY,
+        help="동시에 실행할 페르소나 평가 요청 수 (OpenAI 사용량 한도에 맞게 조정)"
+    )
+    
+    request_mode = st.sidebar.radio(
+        "요청 방식",
+        list(REQUEST_MODE_LABELS),
+        format_func=REQUEST_MODE_LABELS.get,
+        help="묶음 요청은 이미지를 한 번만 보내 토큰 비용을 줄이지만, 모든 페르소나 결과가 한꺼번에 표시됩니다."
+    )
     
     # 평가 모드 선택
     evaluation_mode = st.radio(
         "평가 모드를 선택하세요:",
-        ["단일 화면 평가", "A/B 테스트 비교"]
+        ["단일 화면 평가", "A/B 테스트 비교", "사용자 흐름 평가", "디자인 변형 순위"]
     )
     
     # 페르소나 선택
+    persona_registry = get_persona_registry()
+    persona_library = persona_registry.personas()
     st.subheader("📋 평가할 페르소나 선택")
     selected_personas = st.multiselect(
         "페르소나를 선택하세요 (복수 선택 가능):",
-        list(DEFAULT_PERSONAS.keys()),
-        default=["개발자", "비숙련 사용자"]
+        list(persona_library.keys()),
+        default=[persona for persona in ["개발자", "비숙련 사용자"] if persona in persona_library]
     )
     
     if not selected_personas:
@@ -231,7 +452,9 @@ def main():
     # 선택된 페르소나 정보 표시
     with st.expander("선택된 페르소나 정보"):
         for persona in selected_personas:
-            st.write(f"**{persona}**: {DEFAULT_PERSONAS[persona]['description']}")
+            st.write(f"**{persona}** (v{persona_library[persona]['version']}): {persona_library[persona]['description']}")
+    personas = {persona: persona_library[persona] for persona in selected_personas}
+    job_manager = get_job_manager()
     
     if evaluation_mode == "단일 화면 평가":
         st.subheader("📱 프로토타입 업로드")
@@ -241,28 +464,100 @@ def main():
             type=['png', 'jpg', 'jpeg']
         )
         
-        if uploaded_file and st.button("평가 시작"):
-            with st.spinner("AI 페르소나들이 평가 중입니다..."):
-                # 업로드된 파일이나 붙여넣은 이미지 처리 (encode_image가 둘 다 처리)
-                image_base64 = evaluator.encode_image(uploaded_file)
-                
-                # 이미지 표시
-                st.image(uploaded_file, caption="평가 대상 프로토타입", width=400)
-                
-                # 각 페르소나별 평가 실행
-                results = []
-                for persona in selected_personas:
-                    result = evaluator.evaluate_single_screen(
-                        image_base64, persona, DEFAULT_PERSONAS[persona]
-                    )
-                    results.append(result)
-                
-                # 결과 표시
-                st.subheader("📊 평가 결과")
-                for result in results:
-                    with st.expander(f"🎭 {result['persona']} 페르소나 평가"):
-                        st.write(result['evaluation'])
-                        st.caption(f"평가 시간: {result['timestamp']}")
+        # 업로드된 파일이나 붙여넣은 이미지 전처리 (세션 저장소에 있으면 재사용)
+        stored = load_upload(image_store, evaluator, uploaded_file) if uploaded_file else None
+        
+        if stored:
+            # 이미지 표시
+            st.image(stored.preview, caption="평가 대상 프로토타입", width=400)
+            st.caption(stored.prepared.summary())
+            
+            if st.button("평가 시작"):
+                # 백그라운드 작업으로 접수하고 작업 ID만 세션에 보관 (재실행되어도 평가는 계속 진행)
+                st.session_state[JOB_SESSION_KEYS[JOB_KIND_SINGLE]] = job_manager.submit(
+                    evaluator, JOB_KIND_SINGLE, [stored.base64], personas, request_mode, max_concurrency
+                )
+        
+        job_id = st.session_state.get(JOB_SESSION_KEYS[JOB_KIND_SINGLE])
+        if job_id:
+            render_job(job_manager, job_id)
+    
+    elif evaluation_mode == "사용자 흐름 평가":
+        st.subheader("📱 사용자 흐름 화면 업로드")
+        
+        uploaded_files = st.file_uploader(
+            f"흐름 순서대로 화면을 업로드하세요 (파일 이름 순서가 단계 순서, 최대 {FLOW_MAX_SCREENS}장)",
+            type=['png', 'jpg', 'jpeg'],
+            accept_multiple_files=True,
+            key="flow_files"
+        )
+        uploaded_files = sorted(uploaded_files or [], key=lambda uploaded: uploaded.name)
+        if len(uploaded_files) > FLOW_MAX_SCREENS:
+            st.warning(f"처음 {FLOW_MAX_SCREENS}장만 평가합니다.")
+            uploaded_files = uploaded_files[:FLOW_MAX_SCREENS]
+        
+        # 읽을 수 없거나 크기 제한을 넘는 화면은 오류를 표시하고 제외
+        loaded = [(uploaded, load_upload(image_store, evaluator, uploaded)) for uploaded in uploaded_files]
+        loaded = [(uploaded, stored) for uploaded, stored in loaded if stored is not None]
+        
+        if loaded:
+            stored_screens = [stored for _, stored in loaded]
+            preview_columns = st.columns(min(len(stored_screens), 5))
+            for index, (uploaded, stored) in enumerate(loaded):
+                with preview_columns[index % len(preview_columns)]:
+                    st.image(stored.preview, caption=f"{index + 1}단계 · {uploaded.name}")
+            st.caption("화면 하나를 바꿔 다시 평가하면 바뀐 단계 앞까지는 이전 결과를 재사용합니다.")
+            
+            if st.button("흐름 평가 시작"):
+                # 흐름 평가는 단계마다 이전 요약이 필요하므로 요청 방식과 관계없이 페르소나별로 진행
+                st.session_state[JOB_SESSION_KEYS[JOB_KIND_FLOW]] = job_manager.submit(
+                    evaluator, JOB_KIND_FLOW, [stored.base64 for stored in stored_screens], personas,
+                    REQUEST_MODE_PER_PERSONA, max_concurrency
+                )
+        
+        job_id = st.session_state.get(JOB_SESSION_KEYS[JOB_KIND_FLOW])
+        if job_id:
+            render_job(job_manager, job_id)
+    
+    elif evaluation_mode == "디자인 변형 순위":
+        st.subheader("🏆 디자인 변형 업로드")
+        
+        uploaded_files = st.file_uploader(
+            f"비교할 디자인 변형을 업로드하세요 (파일 이름 순서대로 A안, B안..., 최대 {RANK_MAX_VARIANTS}개)",
+            type=['png', 'jpg', 'jpeg'],
+            accept_multiple_files=True,
+            key="rank_files"
+        )
+        uploaded_files = sorted(uploaded_files or [], key=lambda uploaded: uploaded.name)
+        if len(uploaded_files) > RANK_MAX_VARIANTS:
+            st.warning(f"처음 {RANK_MAX_VARIANTS}개만 비교합니다.")
+            uploaded_files = uploaded_files[:RANK_MAX_VARIANTS]
+        
+        loaded = [(uploaded, load_upload(image_store, evaluator, uploaded)) for uploaded in uploaded_files]
+        loaded = [(uploaded, stored) for uploaded, stored in loaded if stored is not None]
+        
+        if len(loaded) == 1:
+            st.info("순위를 매기려면 두 개 이상의 변형을 업로드해주세요.")
+        elif loaded:
+            stored_variants = [stored for _, stored in loaded]
+            preview_columns = st.columns(min(len(stored_variants), 4))
+            for index, (uploaded, stored) in enumerate(loaded):
+                with preview_columns[index % len(preview_columns)]:
+                    st.image(stored.preview, caption=f"{variant_label(index)}안 · {uploaded.name}")
+            count = len(stored_variants)
+            st.caption(f"모든 쌍({count * (count - 1) // 2}개)을 비교하지 않고 페르소나당 A/B 비교를 "
+                       f"최대 {sum(index.bit_length() for index in range(1, count))}회만 실행합니다.")
+            
+            if st.button("순위 평가 시작"):
+                # 다음 비교 대상이 이전 비교 결과에 따라 정해지므로 요청 방식과 관계없이 페르소나별로 진행
+                st.session_state[JOB_SESSION_KEYS[JOB_KIND_RANK]] = job_manager.submit(
+                    evaluator, JOB_KIND_RANK, [stored.base64 for stored in stored_variants], personas,
+                    REQUEST_MODE_PER_PERSONA, max_concurrency
+                )
+        
+        job_id = st.session_state.get(JOB_SESSION_KEYS[JOB_KIND_RANK])
+        if job_id:
+            render_job(job_manager, job_id)
     
     else:  # A/B 테스트 모드
         st.subheader("📱 A/B 테스트 프로토타입 업로드")
@@ -272,8 +567,6 @@ def main():
         
         uploaded_file_a = None
         uploaded_file_b = None
-        pasted_image_a = None
-        pasted_image_b = None
         
         with col1:
             st.write("**A안**")
@@ -295,56 +588,69 @@ def main():
         current_image_a = uploaded_file_a
         current_image_b = uploaded_file_b
         
+        # 업로드 시 한 번만 전처리하여 미리보기와 평가에 함께 사용
+        stored_a = load_upload(image_store, evaluator, current_image_a) if current_image_a else None
+        stored_b = load_upload(image_store, evaluator, current_image_b) if current_image_b else None
+        
         # 이미지 미리보기 표시
         col1_preview, col2_preview = st.columns(2)
         with col1_preview:
-            if current_image_a:
-                st.image(current_image_a, caption="A안 미리보기", width=300)
+            if stored_a:
+                st.image(stored_a.preview, caption="A안 미리보기", width=300)
+                st.caption(stored_a.prepared.summary())
         with col2_preview:
-            if current_image_b:
-                st.image(current_image_b, caption="B안 미리보기", width=300)
+            if stored_b:
+                st.image(stored_b.preview, caption="B안 미리보기", width=300)
+                st.caption(stored_b.prepared.summary())
         
-        # A/B 테스트 버튼 표시 조건 개선 - 세션 상태도 확인
-        show_ab_button = False
-        if ab_upload_method == "파일 업로드":
-            if uploaded_file_a and uploaded_file_b:
-                show_ab_button = True
-        elif ab_upload_method == "클립보드에서 붙여넣기":
-            # 컴포넌트 반환값 또는 세션 상태 확인
-            session_key_a = "clipboard_paste_paste_a"
-            session_key_b = "clipboard_paste_paste_b"
-            has_image_a = pasted_image_a or (session_key_a in st.session_state and st.session_state[session_key_a] is not None)
-            has_image_b = pasted_image_b or (session_key_b in st.session_state and st.session_state[session_key_b] is not None)
-            if has_image_a and has_image_b:
-                show_ab_button = True
+        # A/B 테스트 버튼 표시 조건: 두 이미지가 모두 업로드된 경우
+        show_ab_button = bool(stored_a and stored_b)
         
         if show_ab_button and st.button("A/B 테스트 시작"):
-            with st.spinner("AI 페르소나들이 A/B 테스트를 진행 중입니다..."):
-                # A안, B안 이미지 처리 (encode_image가 파일과 PIL Image 둘 다 처리)
-                image_a_base64 = evaluator.encode_image(current_image_a)
-                image_b_base64 = evaluator.encode_image(current_image_b)
-                
-                # 이미지들 표시
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.image(current_image_a, caption="A안", width=300)
-                with col2:
-                    st.image(current_image_b, caption="B안", width=300)
-                
-                # 각 페르소나별 A/B 테스트 실행
-                results = []
-                for persona in selected_personas:
-                    result = evaluator.compare_ab_test(
-                        image_a_base64, image_b_base64, persona, DEFAULT_PERSONAS[persona]
-                    )
-                    results.append(result)
-                
-                # 결과 표시
-                st.subheader("📊 A/B 테스트 결과")
-                for result in results:
-                    with st.expander(f"🎭 {result['persona']} 페르소나 비교 평가"):
-                        st.write(result['comparison'])
-                        st.caption(f"평가 시간: {result['timestamp']}")
+            # A안, B안은 미리보기 단계에서 저장소에 인코딩된 base64를 그대로 사용
+            st.session_state[JOB_SESSION_KEYS[JOB_KIND_AB]] = job_manager.submit(
+                evaluator, JOB_KIND_AB, [stored_a.base64, stored_b.base64], personas, request_mode, max_concurrency
+            )
+        
+        job_id = st.session_state.get(JOB_SESSION_KEYS[JOB_KIND_AB])
+        if job_id:
+            render_job(job_manager, job_id)
+    
+    # 사이드바에 페르소나 라이브러리 상태
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 🎭 페르소나 라이브러리")
+    st.sidebar.caption(
+        f"전체 {len(persona_library)}명 (커스텀 {len(persona_registry.custom_names())}명) · "
+        f"버전 {persona_registry.version}  \n"
+        f"파일: {persona_registry.path}"
+    )
+    if persona_registry.last_error:
+        st.sidebar.error(f"페르소나 파일 오류 (이전 목록 사용 중):\n{persona_registry.last_error}")
+    
+    # 사이드바에 캐시 통계
+    cache_stats = result_cache.stats()
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 💾 결과 캐시")
+    st.sidebar.markdown(
+        f"히트 {cache_stats['hits']} / 미스 {cache_stats['misses']} "
+        f"(적중률 {cache_stats['hit_rate']:.0%})  \n"
+        f"저장 {cache_stats['entries']}건 · {cache_stats['bytes'] / 1024:.1f} KB"
+    )
+    if st.sidebar.button("캐시 비우기"):
+        result_cache.clear()
+        st.rerun()
+    connection_stats = evaluator.api.tracer.stats() if evaluator.api.tracer else None
+    if connection_stats:
+        st.sidebar.caption(
+            f"HTTP 연결 {connection_stats['connections_opened']}개 생성 · "
+            f"평균 설정 {connection_stats['avg_connect_seconds'] * 1000:.0f}ms (이후 요청은 연결 재사용)"
+        )
+    store_stats = image_store.stats()
+    st.sidebar.caption(
+        f"세션 이미지 {store_stats['entries']}개 · "
+        f"{store_stats['bytes'] / 1024 / 1024:.1f} / {store_stats['max_bytes'] / 1024 / 1024:.0f} MB"
+    )
+    render_metrics_panel(evaluator, job_manager.get(job_id) if job_id else None)
     
     # 사이드바에 추가 정보
     st.sidebar.markdown("---")
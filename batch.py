@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+배치 평가 - 폴더 또는 zip에 담긴 화면 전체를 선택한 페르소나로 한 번에 평가
+(화면, 페르소나) 쌍마다 결과를 JSONL에 즉시 기록하므로 중단 후 다시 실행하면 남은 쌍만 평가
+
+사용 예:
+    python batch.py screens.zip --personas 개발자,디자이너 --out results.jsonl
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from evaluator import DEFAULT_MAX_CONCURRENCY, PersonaEvaluator
+from image_pipeline import DEFAULT_MAX_EDGE, DEFAULT_QUALITY, PreprocessOptions
+from persona_registry import DEFAULT_PERSONA_LIBRARY_PATH, PersonaRegistry
+from result_cache import ResultCache, hash_image
+from sampling import MAX_SAMPLES_LIMIT, SamplingOptions
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+@dataclass
+class Screen:
+    """배치 대상 화면 (이름은 폴더/zip 내부 상대 경로)"""
+    name: str
+    load: Callable[[], bytes]
+
+
+def collect_screens(path: str) -> List[Screen]:
+    """디렉터리(하위 폴더 포함) 또는 zip 파일에서 이미지 화면 목록을 이름순으로 수집"""
+    if os.path.isdir(path):
+        screens = []
+        for root, _, files in os.walk(path):
+            for filename in files:
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    full_path = os.path.join(root, filename)
+                    screens.append(Screen(os.path.relpath(full_path, path), _file_loader(full_path)))
+        return sorted(screens, key=lambda screen: screen.name)
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            names = [
+                info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+                and not os.path.basename(info.filename).startswith(".")
+            ]
+        return [Screen(name, _zip_loader(path, name)) for name in sorted(names)]
+
+    raise ValueError(f"폴더 또는 zip 파일이 아닙니다: {path}")
+
+
+def _file_loader(path: str) -> Callable[[], bytes]:
+    def load() -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+    return load
+
+
+def _zip_loader(path: str, name: str) -> Callable[[], bytes]:
+    def load() -> bytes:
+        with zipfile.ZipFile(path) as archive:
+            return archive.read(name)
+    return load
+
+
+def load_checkpoint(results_path: str) -> Set[Tuple[str, str]]:
+    """결과 파일에서 이미 성공한 (화면 해시, 페르소나) 쌍을 읽음 (마지막 줄이 잘렸으면 무시)"""
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not record.get("result", {}).get("error"):
+                done.add((record["screen_hash"], record["persona"]))
+    return done
+
+
+class BatchJob:
+    """(화면 × 페르소나) 쌍을 제한된 동시성으로 평가하고 JSONL에 체크포인트 기록"""
+
+    def __init__(self, evaluator: PersonaEvaluator, screens: List[Screen], personas: Dict[str, Dict],
+                 results_path: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.evaluator = evaluator
+        self.screens = screens
+        self.personas = personas
+        self.results_path = results_path
+        self.max_concurrency = max_concurrency
+        self._write_lock = threading.Lock()
+
+    def run(self, on_progress: Optional[Callable[[int, int, Dict], None]] = None) -> Dict:
+        """남은 쌍을 모두 평가하고 완료/건너뜀/실패 건수를 반환"""
+        done = load_checkpoint(self.results_path)
+        self._end_partial_line()
+        total = len(self.screens) * len(self.personas)
+        summary = {"total": total, "skipped": 0, "completed": 0, "failed": 0}
+        finished = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency), thread_name_prefix="batch-eval") as executor:
+            futures = []
+            for screen in self.screens:
+                try:
+                    image_base64, screen_hash = self._prepare(screen)
+                except Exception as e:
+                    # 읽을 수 없는 화면은 실패로 기록하고 다음 화면으로 진행 (재실행 시 다시 시도)
+                    for persona_name in self.personas:
+                        record = self._record(screen, None, persona_name, {
+                            "persona": persona_name,
+                            "evaluation": f"이미지 처리 중 오류가 발생했습니다: {str(e)}",
+                            "error": True,
+                            "timestamp": datetime.now().isoformat()
+                        })
+                        finished += 1
+                        summary["failed"] += 1
+                        if on_progress:
+                            on_progress(finished, total, record)
+                    continue
+
+                for persona_name, persona_info in self.personas.items():
+                    if (screen_hash, persona_name) in done:
+                        summary["skipped"] += 1
+                        finished += 1
+                        continue
+                    futures.append(executor.submit(
+                        self._evaluate, screen, image_base64, screen_hash, persona_name, persona_info
+                    ))
+
+            if on_progress and summary["skipped"]:
+                on_progress(finished, total, {"skipped": summary["skipped"]})
+
+            for future in as_completed(futures):
+                record = future.result()
+                finished += 1
+                summary["failed" if record["result"].get("error") else "completed"] += 1
+                if on_progress:
+                    on_progress(finished, total, record)
+
+        return summary
+
+    def _prepare(self, screen: Screen) -> Tuple[str, str]:
+        # 화면은 한 번만 전처리하고 모든 페르소나 요청에서 같은 base64를 공유 (전처리 시간은 호출 계측값에 기록)
+        image_base64 = self.evaluator.prepare_image(io.BytesIO(screen.load())).base64
+        return image_base64, hash_image(image_base64)
+
+    def _evaluate(self, screen: Screen, image_base64: str, screen_hash: str,
+                  persona_name: str, persona_info: Dict) -> Dict:
+        result = self.evaluator.evaluate_single_screen(image_base64, persona_name, persona_info)
+        return self._record(screen, screen_hash, persona_name, result)
+
+    def _record(self, screen: Screen, screen_hash: Optional[str], persona_name: str, result: Dict) -> Dict:
+        record = {
+            "screen": screen.name,
+            "screen_hash": screen_hash,
+            "persona": persona_name,
+            "result": result,
+            "recorded_at": datetime.now().isoformat()
+        }
+        self._append(record)
+        return record
+
+    def _end_partial_line(self) -> None:
+        # 이전 실행이 기록 도중 끊겼으면 줄을 닫아 다음 기록이 잘린 줄에 붙지 않도록 함
+        if not os.path.exists(self.results_path):
+            return
+        with open(self.results_path, "rb+") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _append(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._write_lock:
+            with open(self.results_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="폴더/zip의 화면 전체를 AI 페르소나로 배치 평가")
+    parser.add_argument("screens", help="화면 이미지 폴더 또는 zip 파일 경로")
+    parser.add_argument("--personas", help="쉼표로 구분한 페르소나 이름 (기본: 전체)")
+    parser.add_argument("--persona-file", default=DEFAULT_PERSONA_LIBRARY_PATH,
+                        help="커스텀 페르소나 YAML/JSON 파일 (기본 페르소나에 추가)")
+    parser.add_argument("--out", default="batch_results.jsonl", help="결과 JSONL 경로 (재실행 시 이어서 평가)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="동시 요청 수")
+    parser.add_argument("--max-edge", type=int, default=DEFAULT_MAX_EDGE, help="전처리 최대 긴 변 (px)")
+    parser.add_argument("--format", choices=["JPEG", "WEBP", "PNG"], help="재압축 포맷 (기본: 원본 유지)")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY, help="재압축 품질")
+    parser.add_argument("--samples", type=int, default=1,
+                        help=f"페르소나당 최대 샘플 수 (2 이상이면 신뢰구간이 좁아질 때까지 반복 샘플링, 최대 {MAX_SAMPLES_LIMIT})")
+    parser.add_argument("--score-ci-width", type=float, default=SamplingOptions.score_ci_width,
+                        help="반복 샘플링을 멈출 점수 95%% 신뢰구간 폭")
+    parser.add_argument("--no-cache", action="store_true", help="결과 캐시를 사용하지 않음")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"),
+                        help="OpenAI API 키 (기본: OPENAI_API_KEY 환경 변수)")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("OpenAI API 키가 필요합니다 (--api-key 또는 OPENAI_API_KEY)")
+
+    registry = PersonaRegistry(args.persona_file)
+    library = registry.personas()
+    if registry.last_error:
+        parser.error(f"페르소나 파일 오류: {registry.last_error}")
+    persona_names = [name.strip() for name in args.personas.split(",") if name.strip()] \
+        if args.personas else list(library)
+    unknown = [name for name in persona_names if name not in library]
+    if unknown:
+        parser.error(f"알 수 없는 페르소나: {', '.join(unknown)}")
+
+    if not 1 <= args.samples <= MAX_SAMPLES_LIMIT:
+        parser.error(f"--samples는 1-{MAX_SAMPLES_LIMIT} 사이여야 합니다")
+
+    screens = collect_screens(args.screens)
+    if not screens:
+        parser.error(f"평가할 이미지가 없습니다: {args.screens}")
+
+    evaluator = PersonaEvaluator(
+        args.api_key,
+        cache=None if args.no_cache else ResultCache(),
+        image_options=PreprocessOptions(max_edge=args.max_edge, output_format=args.format, quality=args.quality),
+        sampling=SamplingOptions(max_samples=args.samples, score_ci_width=args.score_ci_width)
+    )
+    job = BatchJob(
+        evaluator,
+        screens,
+        {name: library[name] for name in persona_names},
+        args.out,
+        max_concurrency=args.concurrency
+    )
+
+    def report(finished: int, total: int, record: Dict) -> None:
+        if "screen" in record:
+            status = "실패" if record["result"].get("error") else "완료"
+            print(f"[{finished}/{total}] {status}: {record['screen']} · {record['persona']}", file=sys.stderr)
+        else:
+            print(f"[{finished}/{total}] 이전 실행 결과 {record['skipped']}건 재사용", file=sys.stderr)
+
+    summary = job.run(on_progress=report)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
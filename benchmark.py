@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+오프라인 벤치마크 - 목 OpenAI 서버를 상대로 PersonaEvaluator의 단일 화면/A/B/배치/묶음 평가 경로를 부하 테스트
+페르소나 수, 이미지 크기, 동시성 조합마다 처리량, 꼬리 지연(p50/p95/p99), 메모리를 JSON으로 출력하고
+--baseline 결과와 비교해 허용 범위를 넘는 성능 저하가 있으면 종료 코드 1을 반환
+
+사용 예:
+    python benchmark.py --out bench.json
+    python benchmark.py --latency lognormal:0.5,0.4 --rate-limit 0.05 --baseline bench.json
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageDraw
+
+from api_client import RateLimiter
+from batch import BatchJob, collect_screens
+from client_pool import build_api
+from evaluator import DEFAULT_PERSONAS, PersonaEvaluator
+from metrics import MetricsRecorder, percentile
+from mock_openai import LatencyModel, MockConfig, MockOpenAIServer
+
+MODES = ("single", "ab", "batch", "single_combined", "ab_combined")
+# 모든 페르소나를 한 요청으로 묶는 모드 (동시성과 스트리밍이 적용되지 않음)
+COMBINED_MODES = ("single_combined", "ab_combined")
+DEFAULT_PERSONA_COUNTS = "1,5"
+DEFAULT_IMAGE_SIZES = "1280x800,2560x1600"
+DEFAULT_CONCURRENCY = "1,5,10"
+DEFAULT_TOLERANCE = 0.2
+MOCK_API_KEY = "sk-mock"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    mode: str
+    personas: int
+    width: int
+    height: int
+    concurrency: int
+    stream: bool
+
+    @property
+    def id(self) -> str:
+        return (f"{self.mode}/p{self.personas}/{self.width}x{self.height}/c{self.concurrency}"
+                f"/{'stream' if self.stream else 'plain'}")
+
+
+def synthetic_personas(count: int) -> Dict[str, Dict]:
+    """기본 페르소나를 반복해 원하는 수만큼 생성 (5명 초과 시 이름에 번호를 붙임)"""
+    personas = {}
+    for index, (name, info) in zip(range(count), itertools.cycle(DEFAULT_PERSONAS.items())):
+        personas[name if index < len(DEFAULT_PERSONAS) else f"{name} {index // len(DEFAULT_PERSONAS) + 1}"] = info
+    return personas
+
+
+def synthetic_screen(width: int, height: int, seed: int) -> bytes:
+    """UI 스크린샷과 비슷한 압축률을 갖도록 단색 블록과 텍스트 줄로 채운 PNG"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (245, 246, 248))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + rng.randrange(40, width // 3), y + rng.randrange(20, height // 6)], fill=color)
+    for line in range(0, height, 28):
+        draw.text((rng.randrange(20, 200), line), "Lorem ipsum 프로토타입 " * rng.randrange(1, 6), fill=(30, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def run_scenario(scenario: Scenario, base_url: str, rounds: int, batch_screens: int,
+                 trace_memory: bool = True) -> Dict:
+    """시나리오 하나를 rounds번 실행하고 처리량/지연/메모리 측정값을 반환"""
+    metrics = MetricsRecorder(log_path=None)
+    # 클라이언트 측 제한기 대기는 측정 대상이 아니므로 사실상 무제한으로 설정
+    api = build_api(MOCK_API_KEY, base_url=base_url, limiter=RateLimiter(rpm=10 ** 6, tpm=10 ** 9))
+    evaluator = PersonaEvaluator(MOCK_API_KEY, api=api, metrics=metrics)
+    personas = synthetic_personas(scenario.personas)
+    image_a = evaluator.encode_image(io.BytesIO(synthetic_screen(scenario.width, scenario.height, 1)))
+    image_b = evaluator.encode_image(io.BytesIO(synthetic_screen(scenario.width, scenario.height, 2)))
+
+    with tempfile.TemporaryDirectory(prefix="persona-bench-") as workdir:
+        if scenario.mode == "batch":
+            for index in range(batch_screens):
+                with open(os.path.join(workdir, f"screen_{index:03d}.png"), "wb") as f:
+                    f.write(synthetic_screen(scenario.width, scenario.height, index))
+            screens = collect_screens(workdir)
+
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        results = []
+        for round_index in range(rounds):
+            if scenario.mode == "batch":
+                # 라운드마다 새 결과 파일을 써야 체크포인트로 건너뛰지 않음
+                job = BatchJob(evaluator, screens, personas, os.path.join(workdir, f"round_{round_index}.jsonl"),
+                               max_concurrency=scenario.concurrency)
+                job.run()
+                with open(job.results_path, encoding="utf-8") as f:
+                    results.extend(json.loads(line)["result"] for line in f)
+            elif scenario.mode in COMBINED_MODES:
+                results.extend(
+                    evaluator.evaluate_single_screen_combined(image_a, personas)
+                    if scenario.mode == "single_combined"
+                    else evaluator.compare_ab_test_combined(image_a, image_b, personas)
+                )
+            elif scenario.stream:
+                stream = evaluator.evaluate_single_screen_stream(image_a, personas, scenario.concurrency) \
+                    if scenario.mode == "single" \
+                    else evaluator.compare_ab_test_stream(image_a, image_b, personas, scenario.concurrency)
+                results.extend(payload for event, _, payload in stream if event == "done")
+            else:
+                many = evaluator.evaluate_single_screen_many(image_a, personas, scenario.concurrency) \
+                    if scenario.mode == "single" \
+                    else evaluator.compare_ab_test_many(image_a, image_b, personas, scenario.concurrency)
+                results.extend(many)
+        wall_seconds = time.perf_counter() - started
+        peak_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    records = [record for record in metrics.records() if not record.cached]
+    latencies = [record.latency_seconds for record in records if record.latency_seconds is not None]
+    ttfts = [record.ttft_seconds for record in records if record.ttft_seconds is not None]
+    return {
+        "id": scenario.id,
+        **asdict(scenario),
+        "rounds": rounds,
+        "evaluations": len(results),
+        "failures": sum(1 for result in results if result.get("error")),
+        "retries": sum(record.retries for record in records),
+        "wall_seconds": wall_seconds,
+        "throughput_per_second": len(results) / wall_seconds if wall_seconds else None,
+        "latency_seconds": {f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+        "ttft_seconds": {f"p{q}": percentile(ttfts, q) for q in (50, 95, 99)},
+        "payload_bytes_mean": sum(record.payload_bytes for record in records) / len(records) if records else None,
+        "peak_traced_mb": peak_bytes / 1024 / 1024 if peak_bytes is not None else None,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def find_regressions(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """기준 결과 대비 처리량이 tolerance 이상 줄거나 p95 지연이 tolerance 이상 늘어난 시나리오"""
+    previous = {scenario["id"]: scenario for scenario in baseline.get("scenarios", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result["id"])
+        if before is None:
+            continue
+        if before["throughput_per_second"] and result["throughput_per_second"] is not None \
+                and result["throughput_per_second"] < before["throughput_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result['id']}: 처리량 {before['throughput_per_second']:.2f} → {result['throughput_per_second']:.2f}/s"
+            )
+        p95_before, p95_after = before["latency_seconds"]["p95"], result["latency_seconds"]["p95"]
+        if p95_before and p95_after is not None and p95_after > p95_before * (1 + tolerance):
+            regressions.append(f"{result['id']}: p95 지연 {p95_before:.3f} → {p95_after:.3f}s")
+    return regressions
+
+
+def _ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _sizes(value: str) -> List[tuple]:
+    return [tuple(int(side) for side in item.lower().split("x")) for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="목 OpenAI 서버를 상대로 한 평가 경로 오프라인 벤치마크")
+    parser.add_argument("--modes", default=",".join(MODES), help="실행할 모드 (single,ab,batch,single_combined,ab_combined)")
+    parser.add_argument("--personas", default=DEFAULT_PERSONA_COUNTS, help="페르소나 수 목록")
+    parser.add_argument("--image-sizes", default=DEFAULT_IMAGE_SIZES, help="이미지 크기 목록 (WxH)")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY, help="동시 요청 수 목록")
+    parser.add_argument("--stream", choices=["on", "off", "both"], default="on",
+                        help="단일/A/B 모드의 스트리밍 여부 (배치는 항상 비스트리밍)")
+    parser.add_argument("--rounds", type=int, default=2, help="시나리오별 반복 횟수")
+    parser.add_argument("--batch-screens", type=int, default=4, help="배치 모드 화면 수")
+    parser.add_argument("--latency", default="fixed:0.2", help="목 서버 지연 분포 (fixed:s / uniform:a,b / lognormal:median,sigma)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="목 서버가 429를 돌려줄 확률")
+    parser.add_argument("--retry-after-ms", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-url", help="이미 실행 중인 목 서버 주소 (지정하면 내장 서버를 띄우지 않음)")
+    parser.add_argument("--no-trace-memory", action="store_true", help="tracemalloc 측정을 끔 (오버헤드 제거)")
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: 표준 출력)")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="허용 성능 저하 비율")
+    args = parser.parse_args(argv)
+
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"알 수 없는 모드: {', '.join(unknown)}")
+    streams = {"on": [True], "off": [False], "both": [True, False]}[args.stream]
+    scenarios = []
+    for mode, persona_count, (width, height), concurrency in itertools.product(
+            modes, _ints(args.personas), _sizes(args.image_sizes), _ints(args.concurrency)):
+        if mode in COMBINED_MODES:
+            # 요청이 하나뿐이므로 동시성 목록의 첫 값으로 한 번만 실행
+            if concurrency == _ints(args.concurrency)[0]:
+                scenarios.append(Scenario(mode, persona_count, width, height, 1, False))
+            continue
+        for stream in ([False] if mode == "batch" else streams):
+            scenarios.append(Scenario(mode, persona_count, width, height, concurrency, stream))
+
+    config = MockConfig(
+        latency=LatencyModel.parse(args.latency),
+        rate_limit_probability=args.rate_limit,
+        retry_after_ms=args.retry_after_ms,
+        seed=args.seed
+    )
+    server = None if args.server_url else MockOpenAIServer(config).start()
+    base_url = args.server_url or server.base_url
+    results = []
+    try:
+        for index, scenario in enumerate(scenarios, 1):
+            result = run_scenario(scenario, base_url, args.rounds, args.batch_screens, not args.no_trace_memory)
+            results.append(result)
+            print(
+                f"[{index}/{len(scenarios)}] {scenario.id}: {result['throughput_per_second']:.2f} 평가/s · "
+                f"p95 {result['latency_seconds']['p95'] or 0:.3f}s · 실패 {result['failures']}",
+                file=sys.stderr
+            )
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        "created_at": time.time(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "baseline")},
+        "mock_server": server.stats if server is not None else None,
+        "scenarios": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"성능 저하: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
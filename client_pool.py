@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+OpenAI 클라이언트 풀 - API 키별로 하나의 클라이언트(HTTP 연결 풀)를 프로세스 전체에서 공유
+Streamlit 재실행이나 세션이 바뀌어도 keep-alive 연결과 TLS 세션을 재사용하고 연결 설정 시간을 따로 측정
+"""
+
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+import openai
+
+from api_client import DEFAULT_TIMEOUT_SECONDS, RateLimiter, ResilientClient
+
+# 동시 평가(최대 10) 여러 세션이 함께 쓰도록 여유를 둔 연결 한도
+DEFAULT_MAX_CONNECTIONS = 32
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 16
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# httpcore trace 이벤트 중 새 연결 설정에 해당하는 단계
+_CONNECT_STEPS = ("connection.connect_tcp", "connection.start_tls")
+
+
+class ConnectionTracer:
+    """httpcore trace 콜백으로 TCP 연결과 TLS 핸드셰이크 시간을 호출 스레드별로 측정"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.total_connect_seconds = 0.0
+
+    def __call__(self, event_name: str, info: Dict) -> None:
+        for step in _CONNECT_STEPS:
+            if event_name == f"{step}.started":
+                self._started()[step] = time.perf_counter()
+            elif event_name == f"{step}.complete":
+                started = self._started().pop(step, None)
+                if started is not None:
+                    elapsed = time.perf_counter() - started
+                    self._local.connect_seconds = self.elapsed() + elapsed
+                    with self._lock:
+                        self.total_connect_seconds += elapsed
+                        if step == "connection.connect_tcp":
+                            self.connections_opened += 1
+
+    def _started(self) -> Dict[str, float]:
+        if not hasattr(self._local, "started"):
+            self._local.started = {}
+        return self._local.started
+
+    def reset(self) -> None:
+        """현재 스레드의 측정값 초기화 (요청 직전에 호출)"""
+        self._local.connect_seconds = 0.0
+
+    def elapsed(self) -> float:
+        """현재 스레드에서 reset 이후 연결 설정에 쓴 시간 (기존 연결 재사용 시 0)"""
+        return getattr(self._local, "connect_seconds", 0.0)
+
+    def attach(self, request: httpx.Request) -> None:
+        """httpx request 이벤트 훅: 요청마다 trace 콜백을 연결"""
+        request.extensions["trace"] = self
+
+    def stats(self) -> Dict:
+        with self._lock:
+            opened = self.connections_opened
+            total = self.total_connect_seconds
+        return {
+            "connections_opened": opened,
+            "total_connect_seconds": total,
+            "avg_connect_seconds": total / opened if opened else 0.0
+        }
+
+
+def build_api(api_key: str, base_url: Optional[str] = None, limiter: Optional[RateLimiter] = None) -> ResilientClient:
+    """연결 한도와 keep-alive를 조정한 HTTP 클라이언트로 ResilientClient 생성 (base_url은 호환 서버나 벤치마크용 목 서버)"""
+    tracer = ConnectionTracer()
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=DEFAULT_MAX_CONNECTIONS,
+            max_keepalive_connections=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(DEFAULT_TIMEOUT_SECONDS, connect=10.0),
+        follow_redirects=True,
+        event_hooks={"request": [tracer.attach]}
+    )
+    # 재시도는 ResilientClient가 Retry-After와 제한기를 고려해 직접 처리
+    client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+    return ResilientClient(client, limiter=limiter, tracer=tracer)
+
+
+_pool: Dict[str, ResilientClient] = {}
+_pool_lock = threading.Lock()
+
+
+def get_shared_api(api_key: str) -> ResilientClient:
+    """API 키별로 공유되는 ResilientClient (httpx.Client는 스레드 안전하므로 동시 평가에서 그대로 공유)"""
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    with _pool_lock:
+        api = _pool.get(key)
+        if api is None:
+            api = build_api(api_key)
+            _pool[key] = api
+        return api
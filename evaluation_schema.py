@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+평가 결과 구조화 스키마 - OpenAI JSON Schema 응답 형식과 검증/복구 파서
+점수, 장단점, 선호 안, 선호도 비율을 타입이 있는 필드로 받아 집계를 dict 연산으로 처리
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+# 파싱 경로: 스키마 그대로 파싱 / 깨진 JSON 복구 / 자유 텍스트에서 추출
+PARSE_JSON = "json"
+PARSE_REPAIRED = "repaired"
+PARSE_TEXT = "text"
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+SINGLE_SCREEN_PROPERTIES = {
+    "score": {"type": "integer", "description": "전체적인 인상 점수 (1-10)"},
+    "summary": {"type": "string", "description": "전체적인 인상 요약"},
+    "pros": {**_STRING_LIST, "description": "장점 3가지"},
+    "cons": {**_STRING_LIST, "description": "단점 3가지"},
+    "suggestions": {**_STRING_LIST, "description": "개선 제안 3가지"},
+    "key_factor": {"type": "string", "description": "이 페르소나가 가장 중요하게 생각할 요소"},
+}
+
+AB_TEST_PROPERTIES = {
+    "preferred": {"type": "string", "enum": ["A", "B"], "description": "선호하는 안"},
+    "preference_a": {"type": "integer", "description": "A안 선호도 (%)"},
+    "preference_b": {"type": "integer", "description": "B안 선호도 (%), preference_a와 합이 100"},
+    "reasons": {**_STRING_LIST, "description": "선택 이유 3가지"},
+    "a_pros": {**_STRING_LIST, "description": "A안의 장점"},
+    "a_cons": {**_STRING_LIST, "description": "A안의 단점"},
+    "b_pros": {**_STRING_LIST, "description": "B안의 장점"},
+    "b_cons": {**_STRING_LIST, "description": "B안의 단점"},
+    "recommendation": {"type": "string", "description": "이 페르소나 관점에서의 최종 추천"},
+}
+
+
+def _object_schema(properties: Dict) -> Dict:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+FLOW_STEP_PROPERTIES = {
+    "score": {"type": "integer", "description": "이 단계 화면의 점수 (1-10)"},
+    "summary": {"type": "string", "description": "이 단계에서 사용자가 보고 한 일을 한두 문장으로 요약"},
+    "friction": {**_STRING_LIST, "description": "이 단계에서 막히거나 헷갈리는 점"},
+    "continue_likelihood": {"type": "integer", "description": "다음 단계로 계속 진행할 가능성 (%)"},
+    "suggestions": {**_STRING_LIST, "description": "이 단계의 개선 제안"},
+}
+
+
+def response_format(name: str, properties: Dict) -> Dict:
+    """chat.completions의 response_format (strict JSON Schema)"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": _object_schema(properties)},
+    }
+
+
+def combined_response_format(name: str, properties: Dict) -> Dict:
+    """여러 페르소나 결과를 results 배열로 받는 response_format"""
+    item = _object_schema({"persona": {"type": "string"}, **properties})
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": _object_schema({"results": {"type": "array", "items": item}}),
+        },
+    }
+
+
+SINGLE_SCREEN_RESPONSE_FORMAT = response_format("single_screen_evaluation", SINGLE_SCREEN_PROPERTIES)
+AB_TEST_RESPONSE_FORMAT = response_format("ab_test_comparison", AB_TEST_PROPERTIES)
+FLOW_STEP_RESPONSE_FORMAT = response_format("flow_step_evaluation", FLOW_STEP_PROPERTIES)
+
+# 계속 진행 가능성이 이 값 미만인 첫 단계를 이탈 지점으로 봄
+FLOW_DROP_OFF_THRESHOLD = 50
+
+
+def load_json(text: str) -> Tuple[Optional[object], str]:
+    """JSON 파싱 (실패 시 코드 펜스, 앞뒤 설명문, 후행 쉼표를 제거하여 한 번 더 시도)"""
+    try:
+        return json.loads(text), PARSE_JSON
+    except (TypeError, ValueError):
+        pass
+    if not text:
+        return None, PARSE_TEXT
+
+    candidate = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start != -1 and end > start:
+        candidate = re.sub(r",\s*([}\]])", r"\1", candidate[start:end + 1])
+        try:
+            return json.loads(candidate), PARSE_REPAIRED
+        except ValueError:
+            pass
+    return None, PARSE_TEXT
+
+
+def _int(value, default: Optional[int] = None) -> Optional[int]:
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return int(round(value))
+    match = re.search(r"-?\d+(?:\.\d+)?", str(value or ""))
+    return int(round(float(match.group()))) if match else default
+
+
+def _strings(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return [str(item) for item in value if str(item).strip()]
+
+
+def validate_single_evaluation(data: Dict) -> Dict:
+    """단일 화면 평가 필드 검증 및 타입 보정 (점수는 1-10으로 제한)"""
+    score = _int(data.get("score"))
+    return {
+        "score": min(10, max(1, score)) if score is not None else None,
+        "summary": str(data.get("summary") or ""),
+        "pros": _strings(data.get("pros")),
+        "cons": _strings(data.get("cons")),
+        "suggestions": _strings(data.get("suggestions")),
+        "key_factor": str(data.get("key_factor") or ""),
+    }
+
+
+def validate_ab_comparison(data: Dict) -> Dict:
+    """A/B 비교 필드 검증 (선호도를 합 100으로 정규화하고 선호 안과 일치시킴)"""
+    preference_a = _int(data.get("preference_a"))
+    preference_b = _int(data.get("preference_b"))
+    if preference_a is None and preference_b is not None:
+        preference_a = 100 - preference_b
+    if preference_a is not None:
+        if preference_b is not None and preference_a + preference_b > 0:
+            preference_a = round(100 * preference_a / (preference_a + preference_b))
+        preference_a = min(100, max(0, preference_a))
+        preference_b = 100 - preference_a
+
+    preferred = str(data.get("preferred") or "").strip().upper()[:1]
+    if preferred not in ("A", "B"):
+        preferred = None
+    if preference_a is not None and preference_a != 50:
+        preferred = "A" if preference_a > 50 else "B"
+    return {
+        "preferred": preferred,
+        "preference_a": preference_a,
+        "preference_b": preference_b,
+        "reasons": _strings(data.get("reasons")),
+        "a_pros": _strings(data.get("a_pros")),
+        "a_cons": _strings(data.get("a_cons")),
+        "b_pros": _strings(data.get("b_pros")),
+        "b_cons": _strings(data.get("b_cons")),
+        "recommendation": str(data.get("recommendation") or ""),
+    }
+
+
+def validate_flow_step(data: Dict) -> Dict:
+    """흐름 단계 평가 필드 검증 (점수 1-10, 진행 가능성 0-100)"""
+    score = _int(data.get("score"))
+    likelihood = _int(data.get("continue_likelihood"))
+    return {
+        "score": min(10, max(1, score)) if score is not None else None,
+        "summary": str(data.get("summary") or ""),
+        "friction": _strings(data.get("friction")),
+        "continue_likelihood": min(100, max(0, likelihood)) if likelihood is not None else None,
+        "suggestions": _strings(data.get("suggestions")),
+    }
+
+
+def parse_single_evaluation(text: str) -> Tuple[Dict, str]:
+    """단일 화면 평가 응답 파싱 (JSON → 복구 → 자유 텍스트에서 점수 추출 순)"""
+    data, mode = load_json(text)
+    if isinstance(data, dict):
+        return validate_single_evaluation(data), mode
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(?:/\s*10|점)", text or "")
+    return validate_single_evaluation({"score": match.group(1) if match else None, "summary": text}), PARSE_TEXT
+
+
+def parse_flow_step(text: str) -> Tuple[Dict, str]:
+    """흐름 단계 응답 파싱 (JSON → 복구 → 자유 텍스트에서 점수 추출 순)"""
+    data, mode = load_json(text)
+    if isinstance(data, dict):
+        return validate_flow_step(data), mode
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(?:/\s*10|점)", text or "")
+    return validate_flow_step({"score": match.group(1) if match else None, "summary": text}), PARSE_TEXT
+
+
+def parse_ab_comparison(text: str) -> Tuple[Dict, str]:
+    """A/B 비교 응답 파싱 (JSON → 복구 → 자유 텍스트의 'A% vs B%' 추출 순)"""
+    data, mode = load_json(text)
+    if isinstance(data, dict):
+        return validate_ab_comparison(data), mode
+    fallback = {"recommendation": text}
+    match = re.search(r"(\d+)\s*%\s*(?:vs\.?|대|:|/)\s*(\d+)\s*%", text or "")
+    if match:
+        fallback["preference_a"], fallback["preference_b"] = match.group(1), match.group(2)
+    else:
+        preferred = re.search(r"선호하는 안\W*([AB])안", text or "")
+        fallback["preferred"] = preferred.group(1) if preferred else None
+    return validate_ab_comparison(fallback), PARSE_TEXT
+
+
+def _bullets(items: List[str]) -> str:
+    return "\n".join(f"- {item}" for item in items) or "- (없음)"
+
+
+def format_single_evaluation(structured: Dict) -> str:
+    """구조화된 단일 화면 평가를 화면 표시용 마크다운으로 변환"""
+    score = structured.get("score")
+    return (
+        f"**전체적인 인상: {score if score is not None else '-'}/10점**\n\n"
+        f"{structured.get('summary', '')}\n\n"
+        f"**장점**\n{_bullets(structured.get('pros', []))}\n\n"
+        f"**단점**\n{_bullets(structured.get('cons', []))}\n\n"
+        f"**개선 제안**\n{_bullets(structured.get('suggestions', []))}\n\n"
+        f"**가장 중요하게 생각할 요소**: {structured.get('key_factor', '')}"
+    )
+
+
+def format_ab_comparison(structured: Dict) -> str:
+    """구조화된 A/B 비교를 화면 표시용 마크다운으로 변환"""
+    preferred = structured.get("preferred")
+    preference_a, preference_b = structured.get("preference_a"), structured.get("preference_b")
+    split = f"A안 {preference_a}% vs B안 {preference_b}%" if preference_a is not None else "-"
+    return (
+        f"**선호하는 안: {preferred + '안' if preferred else '-'}** ({split})\n\n"
+        f"**선택 이유**\n{_bullets(structured.get('reasons', []))}\n\n"
+        f"**A안 장점**\n{_bullets(structured.get('a_pros', []))}\n\n"
+        f"**A안 단점**\n{_bullets(structured.get('a_cons', []))}\n\n"
+        f"**B안 장점**\n{_bullets(structured.get('b_pros', []))}\n\n"
+        f"**B안 단점**\n{_bullets(structured.get('b_cons', []))}\n\n"
+        f"**최종 추천**: {structured.get('recommendation', '')}"
+    )
+
+
+def summarize_flow(steps: List[Dict]) -> Dict:
+    """단계별 점수와 평균, 처음으로 이탈 가능성이 높아지는 단계 (1부터 시작, 없으면 None)"""
+    scores = [step.get("score") for step in steps]
+    valid = [score for score in scores if score is not None]
+    drop_off = next(
+        (index for index, step in enumerate(steps, 1)
+         if step.get("continue_likelihood") is not None and step["continue_likelihood"] < FLOW_DROP_OFF_THRESHOLD),
+        None
+    )
+    return {
+        "steps": len(steps),
+        "scores": scores,
+        "mean_score": sum(valid) / len(valid) if valid else None,
+        "drop_off_step": drop_off,
+    }
+
+
+def format_flow(steps: List[Dict]) -> str:
+    """단계별 흐름 평가를 화면 표시용 마크다운으로 변환"""
+    flow = summarize_flow(steps)
+    mean = f"{flow['mean_score']:.1f}" if flow["mean_score"] is not None else "-"
+    drop_off = f"{flow['drop_off_step']}단계" if flow["drop_off_step"] else "없음"
+    lines = [f"**흐름 평균 점수: {mean}/10점** · 예상 이탈 지점: {drop_off}"]
+    for index, step in enumerate(steps, 1):
+        likelihood = step.get("continue_likelihood")
+        lines.append(
+            f"\n**{index}단계 ({step.get('score') if step.get('score') is not None else '-'}/10, "
+            f"계속 진행 {likelihood if likelihood is not None else '-'}%)**: {step.get('summary', '')}\n"
+            f"- 막히는 점: {', '.join(step.get('friction', [])) or '(없음)'}\n"
+            f"- 개선 제안: {', '.join(step.get('suggestions', [])) or '(없음)'}"
+        )
+    return "\n".join(lines)
+
+
+def variant_label(index: int) -> str:
+    """0부터 시작하는 디자인 변형 번호를 A, B, C... 라벨로 변환"""
+    return chr(ord("A") + index)
+
+
+def summarize_ranking(count: int, order: List[int], comparisons: List[Dict]) -> Dict:
+    """쌍 비교 결과로 순위표와 신뢰도 계산
+
+    신뢰도는 비교한 쌍의 선호도 차이 평균 (승자 선호도 50%면 0, 100%면 1)
+    """
+    margins = {index: [] for index in range(count)}
+    wins = {index: 0 for index in range(count)}
+    for comparison in comparisons:
+        margin = (comparison["preference"] - 50) / 50
+        margins[comparison["winner"]].append(margin)
+        margins[comparison["loser"]].append(margin)
+        wins[comparison["winner"]] += 1
+    all_margins = [(comparison["preference"] - 50) / 50 for comparison in comparisons]
+    return {
+        "order": [variant_label(index) for index in order],
+        "entries": [
+            {
+                "rank": rank,
+                "variant": variant_label(index),
+                "wins": wins[index],
+                "comparisons": len(margins[index]),
+                "confidence": sum(margins[index]) / len(margins[index]) if margins[index] else None,
+            }
+            for rank, index in enumerate(order, 1)
+        ],
+        "confidence": sum(all_margins) / len(all_margins) if all_margins else None,
+        "comparisons": len(comparisons),
+        "all_pairs": count * (count - 1) // 2,
+    }
+
+
+def format_ranking(structured: Dict) -> str:
+    """순위 평가 결과를 화면 표시용 마크다운으로 변환"""
+    confidence = structured.get("confidence")
+    lines = [
+        f"**순위: {' > '.join(f'{label}안' for label in structured.get('order', []))}** · "
+        f"신뢰도 {f'{confidence:.0%}' if confidence is not None else '-'} · "
+        f"비교 {structured.get('comparisons', 0)}회 (전체 쌍 {structured.get('all_pairs', 0)}개)"
+    ]
+    for entry in structured.get("entries", []):
+        entry_confidence = entry.get("confidence")
+        lines.append(
+            f"{entry['rank']}. **{entry['variant']}안**: {entry['wins']}승 / 비교 {entry['comparisons']}회 · "
+            f"신뢰도 {f'{entry_confidence:.0%}' if entry_confidence is not None else '-'}"
+        )
+    return "\n".join(lines)
+
+
+def aggregate_scores(results: List[Dict]) -> Dict:
+    """페르소나별 단일 화면 점수의 평균/최소/최대"""
+    scores = [
+        result["structured"]["score"] for result in results
+        if not result.get("error") and result.get("structured", {}).get("score") is not None
+    ]
+    if not scores:
+        return {"count": 0, "mean": None, "min": None, "max": None}
+    return {"count": len(scores), "mean": sum(scores) / len(scores), "min": min(scores), "max": max(scores)}
+
+
+def aggregate_preferences(results: List[Dict]) -> Dict:
+    """페르소나별 A/B 선호도 평균과 선호 안 득표 수"""
+    valid = [
+        result["structured"] for result in results
+        if not result.get("error") and result.get("structured", {}).get("preference_a") is not None
+    ]
+    votes = {"A": 0, "B": 0}
+    for structured in valid:
+        if structured.get("preferred") in votes:
+            votes[structured["preferred"]] += 1
+    if not valid:
+        return {"count": 0, "mean_a": None, "mean_b": None, "votes": votes}
+    mean_a = sum(structured["preference_a"] for structured in valid) / len(valid)
+    return {"count": len(valid), "mean_a": mean_a, "mean_b": 100 - mean_a, "votes": votes}
+
+
+def aggregate_rankings(results: List[Dict]) -> Dict:
+    """페르소나별 순위를 합친 변형별 평균 순위와 1위 득표 수 (평균 순위가 낮은 순)"""
+    ranks: Dict[str, List[int]] = {}
+    first_votes: Dict[str, int] = {}
+    for result in results:
+        if result.get("error"):
+            continue
+        for entry in result.get("structured", {}).get("entries", []):
+            ranks.setdefault(entry["variant"], []).append(entry["rank"])
+            first_votes[entry["variant"]] = first_votes.get(entry["variant"], 0) + (entry["rank"] == 1)
+    mean_ranks = {variant: sum(values) / len(values) for variant, values in ranks.items()}
+    order = sorted(mean_ranks, key=lambda variant: (mean_ranks[variant], variant))
+    return {
+        "count": sum(1 for result in results if not result.get("error") and result.get("structured", {}).get("entries")),
+        "order": order,
+        "mean_ranks": {variant: mean_ranks[variant] for variant in order},
+        "first_votes": {variant: first_votes[variant] for variant in order},
+    }
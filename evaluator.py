@@ -0,0 +1,734 @@
+#!/usr/bin/env python3
+"""
+페르소나 평가 엔진 - 기본 페르소나 라이브러리와 OpenAI 기반 PersonaEvaluator
+Streamlit에 의존하지 않으므로 앱, 배치 작업, CLI에서 공통으로 사용
+"""
+
+import hashlib
+import queue
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image
+
+from api_client import ERROR_UNKNOWN, ResilientClient
+from client_pool import get_shared_api
+from evaluation_schema import (
+    AB_TEST_PROPERTIES, AB_TEST_RESPONSE_FORMAT, FLOW_STEP_RESPONSE_FORMAT, PARSE_TEXT, SINGLE_SCREEN_PROPERTIES,
+    SINGLE_SCREEN_RESPONSE_FORMAT, combined_response_format, format_ab_comparison, format_flow,
+    format_ranking, format_single_evaluation, load_json, parse_ab_comparison, parse_flow_step,
+    parse_single_evaluation, summarize_flow, summarize_ranking, validate_ab_comparison, validate_single_evaluation,
+    variant_label
+)
+from image_pipeline import (
+    ImageTooLargeError, PreparedImage, PreprocessOptions, estimate_base64_image_tokens, image_data_url,
+    preprocess_image
+)
+from metrics import CallMetric, MetricsRecorder, shared_metrics
+from prompts import (
+    AB_TEST_COMBINED_INSTRUCTIONS, AB_TEST_INSTRUCTIONS, FLOW_STEP_INSTRUCTIONS, SINGLE_SCREEN_COMBINED_INSTRUCTIONS,
+    SINGLE_SCREEN_INSTRUCTIONS, flow_context_block, persona_block, persona_list_block, prompt_cache_key
+)
+from result_cache import ResultCache, hash_image, make_cache_key
+from sampling import SamplingOptions, converged, merge_samples, sampling_summary
+
+# 기본 페르소나 라이브러리 (P0 요구사항)
+DEFAULT_PERSONAS = {
+    "개발자": {
+        "description": "5년 경력의 백엔드 개발자. 기술적 세부사항을 중시하고, 효율성과 논리적 구조를 선호한다.",
+        "characteristics": "기술 친화적, 논리적 사고, 효율성 중시, 복잡한 UI보다 기능성 선호"
+    },
+    "기획자": {
+        "description": "3년 경력의 제품 기획자. 사용자 경험과 비즈니스 가치를 균형있게 고려한다.",
+        "characteristics": "사용자 중심적 사고, 비즈니스 임팩트 고려, 데이터 기반 의사결정 선호"
+    },
+    "비숙련 사용자": {
+        "description": "IT 기술에 익숙하지 않은 40대 일반 사용자. 직관적이고 간단한 인터페이스를 선호한다.",
+        "characteristics": "기술 비친화적, 직관성 중시, 복잡한 기능 회피, 명확한 안내 필요"
+    },
+    "디자이너": {
+        "description": "UI/UX 디자이너로 시각적 일관성과 사용자 경험을 중시한다.",
+        "characteristics": "시각적 일관성 중시, 사용자 경험 전문가, 접근성 고려, 트렌드 민감"
+    },
+    "마케터": {
+        "description": "디지털 마케팅 담당자로 전환율과 사용자 참여도를 중시한다.",
+        "characteristics": "전환율 중시, 사용자 참여도 관심, 명확한 CTA 선호, 브랜딩 고려"
+    }
+}
+
+# 모델 및 프롬프트 설정 (프롬프트 문구를 바꾸면 PROMPT_VERSION을 올려 캐시를 무효화)
+MODEL = "gpt-4o"
+PROMPT_VERSION = "3"
+SINGLE_SCREEN_MAX_TOKENS = 1000
+AB_TEST_MAX_TOKENS = 1200
+FLOW_STEP_MAX_TOKENS = 600
+
+# 사용자 흐름 평가의 최대 화면 수
+FLOW_MAX_SCREENS = 20
+
+# 디자인 변형 순위 평가의 최대 변형 수 (페르소나당 비교 횟수는 약 N·log2(N))
+RANK_MAX_VARIANTS = 8
+
+# 여러 페르소나를 한 요청으로 묶는 모드의 출력 토큰 상한 (모델 최대 출력 이내)
+COMBINED_MAX_TOKENS_LIMIT = 16000
+
+# 평가 요청 방식
+REQUEST_MODE_PER_PERSONA = "per_persona"
+REQUEST_MODE_COMBINED = "combined"
+
+# 동시 평가 설정 (페르소나별 GPT 호출을 병렬로 실행)
+DEFAULT_MAX_CONCURRENCY = 5
+MAX_CONCURRENCY_LIMIT = 10
+
+# 결과 상태 (실패 결과는 error=True와 함께 error_type, retries를 기록)
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+ERROR_MISSING_PERSONA = "missing_persona"
+
+def failed_result(persona_name: str, result_field: str, message: str, error: Exception) -> Dict:
+    """재시도 후에도 실패한 평가를 성공 결과와 구분되는 dict로 변환"""
+    return {
+        "persona": persona_name,
+        result_field: message,
+        "error": True,
+        "status": STATUS_FAILED,
+        "error_type": getattr(error, "error_type", ERROR_UNKNOWN),
+        "retries": getattr(error, "retries", 0),
+        "timestamp": datetime.now().isoformat()
+    }
+
+def usage_from_response(response) -> Dict:
+    """OpenAI 응답의 토큰 사용량을 dict로 변환 (cached_tokens는 프롬프트 캐시로 할인된 입력 토큰)"""
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0
+    }
+
+def summarize_usage(results: List[Dict]) -> Dict:
+    """평가 결과 목록의 실제 과금 토큰 합계 (캐시 히트는 비용이 없으므로 제외)"""
+    total = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    request_ids = set()
+    for result in results:
+        usage = result.get("usage")
+        if not usage or result.get("cached"):
+            continue
+        # 묶음 요청은 같은 요청을 여러 페르소나가 공유하므로 한 번만 집계
+        request_id = result.get("request_id") or id(result)
+        if request_id in request_ids:
+            continue
+        request_ids.add(request_id)
+        # 반복 샘플링, 흐름 단계, 순위 비교처럼 결과 하나에 여러 번 호출한 경우 실제 호출 수를 합산
+        total["requests"] += result.get("requests", 1)
+        for key in ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens"):
+            total[key] += usage.get(key, 0)
+    return total
+
+class PersonaEvaluator:
+    def __init__(self, api_key: str, cache: Optional[ResultCache] = None,
+                 image_options: Optional[PreprocessOptions] = None, api: Optional[ResilientClient] = None,
+                 metrics: Optional[MetricsRecorder] = None, sampling: Optional[SamplingOptions] = None):
+        # 같은 API 키의 평가기들은 하나의 클라이언트(연결 풀)를 공유하므로 매번 만들어도 비용이 거의 없음
+        self.api = api or get_shared_api(api_key)
+        self.client = self.api.client
+        self.cache = cache
+        self.image_options = image_options or PreprocessOptions()
+        # 호출별 지연/토큰/비용 계측 (기본은 프로세스 공유 기록기)
+        self.metrics = metrics if metrics is not None else shared_metrics()
+        # 단일 화면/A/B 평가의 반복 샘플링 (기본은 응답 하나)
+        self.sampling = sampling or SamplingOptions()
+    
+    def encode_image(self, image_input) -> str:
+        """이미지를 전처리 후 base64로 인코딩 (파일 업로드 또는 PIL Image 지원)"""
+        return self.prepare_image(image_input).base64
+    
+    def prepare_image(self, image_input) -> PreparedImage:
+        """이미지를 전처리(축소/재압축)하고 전/후 크기와 예상 토큰을 함께 반환"""
+        # Check for None or invalid input types
+        if image_input is None:
+            raise ValueError("이미지 입력이 None입니다.")
+        
+        # Check if input is a DeltaGenerator or other Streamlit object
+        if hasattr(image_input, '__class__') and 'DeltaGenerator' in str(type(image_input)):
+            raise TypeError("DeltaGenerator 객체는 이미지로 처리할 수 없습니다. 올바른 이미지를 업로드해주세요.")
+        
+        started = time.perf_counter()
+        
+        # Check if input is a PIL Image
+        if isinstance(image_input, Image.Image):
+            try:
+                prepared = preprocess_image(image_input, self.image_options)
+            except ImageTooLargeError:
+                raise
+            except Exception as e:
+                raise ValueError(f"PIL 이미지 처리 중 오류가 발생했습니다: {str(e)}")
+        
+        # Check if input is a file object (file upload)
+        elif hasattr(image_input, 'getvalue') or hasattr(image_input, 'read'):
+            try:
+                # 파일 업로드(BytesIO)나 임시 파일은 바이트로 복사하지 않고 스트림에서 바로 읽음
+                prepared = preprocess_image(image_input, self.image_options)
+            except ImageTooLargeError:
+                raise
+            except Exception as e:
+                raise ValueError(f"파일 업로드 처리 중 오류가 발생했습니다: {str(e)}")
+        
+        else:
+            # Unsupported input type
+            raise TypeError(f"지원되지 않는 이미지 형식입니다: {type(image_input)}. PIL Image 또는 파일 업로드만 지원됩니다.")
+        
+        self.metrics.record_preprocess(time.perf_counter() - started, hash_image(prepared.base64))
+        return prepared
+    
+    def evaluate_single_screen(self, image_base64: str, persona_name: str, persona_info: Dict,
+                               on_token: Optional[Callable[[str], None]] = None) -> Dict:
+        """단일 화면 평가 (P0 요구사항, on_token을 주면 생성되는 텍스트를 스트리밍)"""
+        cache_key = self._cache_key("single", [image_base64], persona_name, persona_info,
+                                    SINGLE_SCREEN_MAX_TOKENS, self.sampling)
+        cached = self._cache_get(cache_key, "single", persona_name)
+        if cached is not None:
+            return cached
+        
+        try:
+            content, structured, parse_mode, call = self._complete(
+                SINGLE_SCREEN_INSTRUCTIONS, [image_base64], persona_block(persona_name, persona_info),
+                SINGLE_SCREEN_RESPONSE_FORMAT, SINGLE_SCREEN_MAX_TOKENS, parse_single_evaluation,
+                "score", self.sampling.score_ci_width, on_token, kind="single", persona=persona_name
+            )
+            result = {
+                "persona": persona_name,
+                "evaluation": content if parse_mode == PARSE_TEXT else format_single_evaluation(structured),
+                "structured": structured,
+                "parse_mode": parse_mode,
+                **call,
+                "status": STATUS_OK,
+                "timestamp": datetime.now().isoformat()
+            }
+            self._cache_set(cache_key, result)
+            return result
+        except Exception as e:
+            return failed_result(persona_name, "evaluation", f"평가 중 오류가 발생했습니다: {str(e)}", e)
+    
+    def compare_ab_test(self, image_a_base64: str, image_b_base64: str, 
+                       persona_name: str, persona_info: Dict,
+                       on_token: Optional[Callable[[str], None]] = None) -> Dict:
+        """A/B 테스트 평가 (P0 요구사항, on_token을 주면 생성되는 텍스트를 스트리밍)"""
+        cache_key = self._cache_key("ab", [image_a_base64, image_b_base64], persona_name, persona_info,
+                                    AB_TEST_MAX_TOKENS, self.sampling)
+        cached = self._cache_get(cache_key, "ab", persona_name)
+        if cached is not None:
+            return cached
+        
+        try:
+            content, structured, parse_mode, call = self._complete(
+                AB_TEST_INSTRUCTIONS, [image_a_base64, image_b_base64], persona_block(persona_name, persona_info),
+                AB_TEST_RESPONSE_FORMAT, AB_TEST_MAX_TOKENS, parse_ab_comparison,
+                "preference_a", self.sampling.preference_ci_width, on_token, kind="ab", persona=persona_name
+            )
+            result = {
+                "persona": persona_name,
+                "comparison": content if parse_mode == PARSE_TEXT else format_ab_comparison(structured),
+                "structured": structured,
+                "parse_mode": parse_mode,
+                **call,
+                "status": STATUS_OK,
+                "timestamp": datetime.now().isoformat()
+            }
+            self._cache_set(cache_key, result)
+            return result
+        except Exception as e:
+            return failed_result(persona_name, "comparison", f"비교 평가 중 오류가 발생했습니다: {str(e)}", e)
+    
+    def evaluate_flow(self, images: List[str], persona_name: str, persona_info: Dict,
+                      on_token: Optional[Callable[[str], None]] = None) -> Dict:
+        """여러 화면으로 이어지는 사용자 흐름 평가 (P2 요구사항)
+        
+        단계마다 현재 화면 한 장과 이전 단계 요약만 보내고, 단계 결과는 첫 화면부터 현재 화면까지의 해시로 캐시하므로
+        중간 화면을 바꾸면 그 단계부터만 다시 평가됨. on_token에는 단계가 끝날 때마다 진행 상황 한 줄을 전달
+        """
+        steps = []
+        step_results = []
+        for index, image in enumerate(images, 1):
+            cache_key = self._cache_key("flow_step", images[:index], persona_name, persona_info,
+                                        FLOW_STEP_MAX_TOKENS)
+            step_result = self._cache_get(cache_key, "flow_step", persona_name)
+            if step_result is None:
+                try:
+                    content, call = self._chat(
+                        FLOW_STEP_INSTRUCTIONS, [image],
+                        persona_block(persona_name, persona_info) + "\n\n" + flow_context_block(index, steps),
+                        FLOW_STEP_RESPONSE_FORMAT, FLOW_STEP_MAX_TOKENS, kind="flow_step", persona=persona_name
+                    )
+                except Exception as e:
+                    # 완료된 앞 단계는 캐시에 남아 있으므로 다시 실행하면 실패한 단계부터 이어서 평가
+                    result = failed_result(persona_name, "flow", f"{index}단계 평가 중 오류가 발생했습니다: {str(e)}", e)
+                    result["steps"] = step_results
+                    return result
+                structured, parse_mode = parse_flow_step(content)
+                step_result = {
+                    "step": index,
+                    "structured": structured,
+                    "parse_mode": parse_mode,
+                    **call,
+                    "status": STATUS_OK,
+                    "timestamp": datetime.now().isoformat()
+                }
+                self._cache_set(cache_key, step_result)
+            steps.append(step_result["structured"])
+            step_results.append(step_result)
+            if on_token is not None:
+                score = step_result["structured"].get("score")
+                on_token(f"{index}단계{' (캐시)' if step_result.get('cached') else ''}: "
+                         f"{score if score is not None else '-'}/10 · {step_result['structured'].get('summary', '')}\n")
+        
+        fresh = [step for step in step_results if not step.get("cached")]
+        return {
+            "persona": persona_name,
+            "flow": format_flow(steps),
+            "structured": summarize_flow(steps),
+            "steps": step_results,
+            "reused_steps": len(step_results) - len(fresh),
+            # 이번 실행에서 새로 호출한 단계의 사용량/지연만 합산 (캐시된 단계는 비용 없음)
+            "usage": {
+                key: sum(step["usage"].get(key, 0) for step in fresh)
+                for key in ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens")
+            },
+            "requests": len(fresh),
+            "retries": sum(step.get("retries", 0) for step in fresh),
+            "latency_seconds": sum(step.get("latency_seconds", 0.0) for step in fresh),
+            "status": STATUS_OK,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def rank_variants(self, images: List[str], persona_name: str, persona_info: Dict,
+                      on_token: Optional[Callable[[str], None]] = None) -> Dict:
+        """N개 디자인 변형의 순위 평가 (A/B 비교를 이진 삽입 정렬의 비교 함수로 사용)
+        
+        모든 쌍을 비교하지 않고 정렬된 목록에 이진 탐색으로 끼워 넣어 약 N·log2(N)번만 비교 (8개면 28쌍 대신 최대 17회).
+        쌍 비교는 A/B 테스트와 같은 캐시를 쓰므로 변형을 하나 추가하면 새 변형이 포함된 쌍만 호출됨
+        """
+        hashes = [hash_image(image) for image in images]
+        order: List[int] = []
+        comparisons = []
+        for candidate in range(len(images)):
+            low, high = 0, len(order)
+            while low < high:
+                middle = (low + high) // 2
+                comparison = self._compare_variants(images, hashes, candidate, order[middle],
+                                                    persona_name, persona_info)
+                if comparison.get("error"):
+                    # 실패한 비교 결과(error_type, retries 포함)를 순위 결과 필드로 옮김 (앞선 비교는 캐시에 남음)
+                    result = {key: value for key, value in comparison.items() if key != "comparison"}
+                    result["ranking"] = (f"{variant_label(candidate)}안과 {variant_label(order[middle])}안 비교 실패 - "
+                                         f"{comparison['comparison']}")
+                    return result
+                comparisons.append(comparison)
+                if comparison["winner"] == candidate:
+                    high = middle
+                else:
+                    low = middle + 1
+                if on_token is not None:
+                    on_token(f"{variant_label(comparison['winner'])}안 > {variant_label(comparison['loser'])}안 "
+                             f"({comparison['preference']}%){' (캐시)' if comparison['cached'] else ''}\n")
+            order.insert(low, candidate)
+        
+        structured = summarize_ranking(len(images), order, comparisons)
+        fresh = [comparison for comparison in comparisons if not comparison["cached"]]
+        return {
+            "persona": persona_name,
+            "ranking": format_ranking(structured),
+            "structured": structured,
+            "comparisons": [
+                {key: value for key, value in comparison.items() if key != "usage"} for comparison in comparisons
+            ],
+            "reused_comparisons": len(comparisons) - len(fresh),
+            # 이번 실행에서 새로 호출한 비교의 사용량/지연만 합산 (캐시된 비교는 비용 없음)
+            "usage": {
+                key: sum(comparison["usage"].get(key, 0) for comparison in fresh)
+                for key in ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens")
+            },
+            "requests": sum(comparison["requests"] for comparison in fresh),
+            "retries": sum(comparison["retries"] for comparison in fresh),
+            "latency_seconds": sum(comparison["latency_seconds"] for comparison in fresh),
+            "status": STATUS_OK,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _compare_variants(self, images: List[str], hashes: List[str], candidate: int, other: int,
+                          persona_name: str, persona_info: Dict) -> Dict:
+        """두 변형을 A/B로 비교해 승자/패자와 승자 선호도(%) 반환 (실패하면 compare_ab_test의 실패 결과)
+        
+        먼저 보여주는 쪽이 유리한 위치 편향을 줄이기 위해 표시 순서를 쌍과 페르소나의 해시로 섞되,
+        같은 쌍은 항상 같은 순서로 보내 캐시가 적중하도록 함
+        """
+        low, high = sorted((candidate, other), key=lambda index: hashes[index])
+        flip = hashlib.sha256(f"{hashes[low]}:{hashes[high]}:{persona_name}".encode("utf-8")).digest()[0] & 1
+        first, second = (high, low) if flip else (low, high)
+        result = self.compare_ab_test(images[first], images[second], persona_name, persona_info)
+        if result.get("error"):
+            return result
+        structured = result.get("structured", {})
+        preference_first = structured.get("preference_a")
+        if preference_first is None:
+            # 텍스트로만 응답한 경우 선호 안만 사용하고 선호도는 판단 불가(50%)로 처리
+            preference_first = 50
+        first_wins = preference_first > 50 or (preference_first == 50 and structured.get("preferred") != "B")
+        return {
+            "winner": first if first_wins else second,
+            "loser": second if first_wins else first,
+            "shown_first": first,
+            "preference": max(preference_first, 100 - preference_first),
+            "cached": bool(result.get("cached")),
+            "usage": result.get("usage", {}),
+            "requests": result.get("requests", 1),
+            "retries": result.get("retries", 0),
+            "latency_seconds": result.get("latency_seconds", 0.0)
+        }
+    
+    def evaluate_single_screen_combined(self, image_base64: str, personas: Dict[str, Dict]) -> List[Dict]:
+        """모든 페르소나를 한 요청으로 묶어 단일 화면 평가 (이미지 토큰을 한 번만 지불)"""
+        return self._combined_request(
+            "single_combined", [image_base64], personas, SINGLE_SCREEN_COMBINED_INSTRUCTIONS, "evaluation",
+            SINGLE_SCREEN_MAX_TOKENS,
+            combined_response_format("single_screen_evaluations", SINGLE_SCREEN_PROPERTIES),
+            validate_single_evaluation, format_single_evaluation
+        )
+    
+    def compare_ab_test_combined(self, image_a_base64: str, image_b_base64: str,
+                                 personas: Dict[str, Dict]) -> List[Dict]:
+        """모든 페르소나를 한 요청으로 묶어 A/B 테스트 평가 (두 이미지를 한 번만 전송)"""
+        return self._combined_request(
+            "ab_combined", [image_a_base64, image_b_base64], personas, AB_TEST_COMBINED_INSTRUCTIONS, "comparison",
+            AB_TEST_MAX_TOKENS, combined_response_format("ab_test_comparisons", AB_TEST_PROPERTIES),
+            validate_ab_comparison, format_ab_comparison
+        )
+    
+    def _combined_request(self, kind: str, images: List[str], personas: Dict[str, Dict], instructions: str,
+                          result_field: str, per_persona_max_tokens: int, response_format: Dict,
+                          validate: Callable[[Dict], Dict], format_text: Callable[[Dict], str]) -> List[Dict]:
+        """한 번의 요청으로 페르소나별 JSON 응답을 받아 기존 페르소나별 결과 dict로 분리"""
+        if not personas:
+            return []
+        max_tokens = min(per_persona_max_tokens * len(personas), COMBINED_MAX_TOKENS_LIMIT)
+        cache_key = self._cache_key(kind, images, ",".join(personas), personas, max_tokens)
+        cached = self._cache_get(cache_key, kind, ",".join(personas))
+        if cached is not None:
+            return [dict(result, cached=True) for result in cached["results"]]
+        
+        request_id = f"{kind}-{cache_key[:12]}"
+        try:
+            content, call = self._chat(instructions, images, persona_list_block(personas), response_format,
+                                       max_tokens, kind=kind, persona=",".join(personas))
+            usage = call["usage"]
+            data, parse_mode = load_json(content)
+            if not isinstance(data, dict):
+                raise ValueError("페르소나별 JSON 응답을 해석할 수 없습니다.")
+            by_persona = {
+                item.get("persona"): validate(item)
+                for item in data.get("results", [])
+                if isinstance(item, dict)
+            }
+        except Exception as e:
+            return [failed_result(name, result_field, f"평가 중 오류가 발생했습니다: {str(e)}", e) for name in personas]
+        
+        timestamp = datetime.now().isoformat()
+        results = []
+        for name in personas:
+            structured = by_persona.get(name)
+            result = {
+                "persona": name,
+                result_field: format_text(structured) if structured else "응답에서 이 페르소나의 평가를 찾을 수 없습니다.",
+                "structured": structured or {},
+                "parse_mode": parse_mode,
+                "usage": usage,
+                "request_id": request_id,
+                "status": STATUS_OK,
+                "retries": call["retries"],
+                "timestamp": timestamp
+            }
+            if name not in by_persona:
+                result["error"] = True
+                result["status"] = STATUS_FAILED
+                result["error_type"] = ERROR_MISSING_PERSONA
+            results.append(result)
+        if not any(result.get("error") for result in results):
+            self._cache_set(cache_key, {"results": results})
+        return results
+    
+    def _complete(self, instructions: str, images: List[str], persona_text: str, response_format: Dict,
+                  max_tokens: int, parse: Callable[[str], Tuple[Dict, str]], field: str, ci_width: float,
+                  on_token: Optional[Callable[[str], None]] = None, kind: str = "",
+                  persona: str = "") -> Tuple[str, Dict, str, Dict]:
+        """응답 하나 또는 반복 샘플링으로 (대표 응답 텍스트, 구조화 결과, 파싱 경로, 호출 정보) 반환"""
+        if not self.sampling.enabled:
+            content, call = self._chat(instructions, images, persona_text, response_format, max_tokens, on_token,
+                                       kind=kind, persona=persona)
+            structured, parse_mode = parse(content)
+            return content, structured, parse_mode, call
+        
+        # n=으로 한 요청에 여러 응답을 받고, field의 신뢰구간이 ci_width 이하가 될 때까지 추가 요청
+        contents, parsed, calls = [], [], []
+        samples = self.sampling.first_batch()
+        while True:
+            batch, call = self._chat_choices(instructions, images, persona_text, response_format, max_tokens,
+                                             samples=samples, kind=kind, persona=persona)
+            calls.append(call)
+            contents.extend(batch)
+            parsed.extend(parse(content) for content in batch)
+            values = [structured[field] for structured, _ in parsed if structured.get(field) is not None]
+            stable = converged(values, ci_width)
+            if on_token is not None:
+                mean = f"{sum(values) / len(values):.1f}" if values else "-"
+                on_token(f"샘플 {len(contents)}개 · 평균 {mean}{' · 수렴' if stable else ''}\n")
+            if stable or len(contents) >= self.sampling.max_samples:
+                break
+            samples = self.sampling.next_batch(len(contents))
+        
+        representative, structured = merge_samples([structured for structured, _ in parsed], field)
+        return contents[representative], structured, parsed[representative][1], {
+            "usage": {
+                key: sum(call["usage"].get(key, 0) for call in calls)
+                for key in ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens")
+            },
+            **{
+                key: sum(call[key] for call in calls)
+                for key in ("retries", "connect_seconds", "throttled_seconds", "latency_seconds", "payload_bytes")
+            },
+            "requests": len(calls),
+            "sampling": sampling_summary([structured for structured, _ in parsed], field, len(calls), ci_width)
+        }
+    
+    def _chat(self, instructions: str, images: List[str], persona_text: str, response_format: Dict, max_tokens: int,
+              on_token: Optional[Callable[[str], None]] = None, kind: str = "", persona: str = "") -> Tuple[str, Dict]:
+        """정적 지시문 → 이미지 → 페르소나 순으로 chat.completions 호출 후 (응답 텍스트, 사용량/재시도/지연 정보) 반환
+        
+        지시문과 이미지는 같은 화면을 평가하는 모든 페르소나 요청에서 바이트 단위로 같으므로 프롬프트 캐시가 적중
+        """
+        contents, call = self._chat_choices(instructions, images, persona_text, response_format, max_tokens,
+                                            on_token, kind=kind, persona=persona)
+        return contents[0], call
+    
+    def _chat_choices(self, instructions: str, images: List[str], persona_text: str, response_format: Dict,
+                      max_tokens: int, on_token: Optional[Callable[[str], None]] = None, samples: int = 1,
+                      kind: str = "", persona: str = "") -> Tuple[List[str], Dict]:
+        """_chat과 같지만 samples개의 응답(n=)을 한 요청으로 받아 목록으로 반환 (이미지는 한 번만 전송)"""
+        image_parts = [
+            {"type": "image_url", "image_url": {"url": image_data_url(image)}}
+            for image in images
+        ]
+        image_hashes = [hash_image(image) for image in images]
+        request = dict(
+            estimated_tokens=self._estimate_tokens(instructions + persona_text, images, max_tokens * samples),
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": image_parts + [{"type": "text", "text": persona_text}]}
+            ],
+            response_format=response_format,
+            max_tokens=max_tokens,
+            # 같은 화면의 요청을 같은 캐시 서버로 라우팅 (구버전 SDK에서도 동작하도록 extra_body로 전달)
+            extra_body={"prompt_cache_key": prompt_cache_key(kind, image_hashes)}
+        )
+        if samples > 1:
+            request["n"] = samples
+        metric = CallMetric(
+            timestamp=time.time(),
+            kind=kind,
+            persona=persona,
+            model=MODEL,
+            status=STATUS_OK,
+            preprocess_seconds=self.metrics.preprocess_seconds(image_hashes),
+            # 요청 본문의 대부분을 차지하는 프롬프트와 이미지 data URL 크기
+            payload_bytes=len((instructions + persona_text).encode("utf-8")) + sum(
+                len(part["image_url"]["url"]) for part in image_parts
+            ),
+            image_tokens=sum(estimate_base64_image_tokens(image) for image in images)
+        )
+        started = time.perf_counter()
+        try:
+            contents, call = self._send(request, started, on_token)
+        except Exception as e:
+            metric.status = STATUS_FAILED
+            metric.error_type = getattr(e, "error_type", ERROR_UNKNOWN)
+            metric.retries = getattr(e, "retries", 0)
+            metric.latency_seconds = time.perf_counter() - started
+            self.metrics.record(metric)
+            raise
+        
+        metric.latency_seconds = call["latency_seconds"]
+        metric.ttft_seconds = call.get("ttft_seconds")
+        metric.connect_seconds = call["connect_seconds"]
+        metric.throttled_seconds = call["throttled_seconds"]
+        metric.retries = call["retries"]
+        metric.prompt_tokens = call["usage"]["prompt_tokens"]
+        metric.cached_tokens = call["usage"]["cached_tokens"]
+        metric.completion_tokens = call["usage"]["completion_tokens"]
+        self.metrics.record(metric)
+        call["payload_bytes"] = metric.payload_bytes
+        return contents, call
+    
+    def _send(self, request: Dict, started: float,
+              on_token: Optional[Callable[[str], None]] = None) -> Tuple[List[str], Dict]:
+        """요청 전송 후 응답 텍스트 목록 반환 (on_token이 있으면 스트리밍하며 첫 토큰까지의 시간을 기록)"""
+        if on_token is None:
+            response, call_info = self.api.create(**request)
+            return [choice.message.content for choice in response.choices], {
+                "usage": usage_from_response(response),
+                "retries": call_info["retries"],
+                "connect_seconds": call_info["connect_seconds"],
+                "throttled_seconds": call_info["throttled_seconds"],
+                "latency_seconds": time.perf_counter() - started
+            }
+        
+        # 스트리밍: 첫 토큰까지의 시간(TTFT)을 기록하고 조각이 올 때마다 콜백 호출
+        # stream_options도 구버전 SDK에서 TypeError가 나지 않도록 extra_body로 전달
+        request = dict(request, extra_body=dict(request.get("extra_body") or {}, stream_options={"include_usage": True}))
+        stream, call_info = self.api.create(stream=True, **request)
+        parts = []
+        ttft = None
+        usage = usage_from_response(None)
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = usage_from_response(chunk)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                parts.append(delta)
+                on_token(delta)
+        return ["".join(parts)], {
+            "usage": usage,
+            "retries": call_info["retries"],
+            "connect_seconds": call_info["connect_seconds"],
+            "throttled_seconds": call_info["throttled_seconds"],
+            "latency_seconds": time.perf_counter() - started,
+            "ttft_seconds": ttft
+        }
+    
+    def _estimate_tokens(self, prompt: str, images: List[str], max_tokens: int) -> int:
+        """TPM 제한용 예상 토큰 (한글 프롬프트는 글자당 약 1토큰, max_tokens도 한도에 포함됨)"""
+        return len(prompt) + sum(estimate_base64_image_tokens(image) for image in images) + max_tokens
+    
+    def _cache_key(self, kind: str, images: List[str], persona_name: str, persona_info: Dict,
+                   max_tokens: int, sampling: Optional[SamplingOptions] = None) -> str:
+        """이미지 해시, 페르소나 정의, 프롬프트 버전, 모델, max_tokens(, 샘플링 설정)로 캐시 키 생성"""
+        parts = dict(
+            kind=kind,
+            images=[hash_image(image) for image in images],
+            persona=persona_name,
+            persona_info=persona_info,
+            prompt_version=PROMPT_VERSION,
+            model=MODEL,
+            max_tokens=max_tokens
+        )
+        if sampling is not None and sampling.enabled:
+            # 샘플링 결과는 단일 응답과 다르므로 설정별로 따로 저장 (기본 설정의 기존 캐시 키는 그대로 유지)
+            parts["sampling"] = asdict(sampling)
+        return make_cache_key(**parts)
+    
+    def _cache_get(self, key: str, kind: str, persona: str) -> Optional[Dict]:
+        if self.cache is None:
+            return None
+        started = time.perf_counter()
+        result = self.cache.get(key)
+        if result is not None:
+            result["cached"] = True
+            self.metrics.record(CallMetric(
+                timestamp=time.time(), kind=kind, persona=persona, model=MODEL, status=STATUS_OK, cached=True,
+                latency_seconds=time.perf_counter() - started
+            ))
+        return result
+    
+    def _cache_set(self, key: str, result: Dict) -> None:
+        # 오류 결과는 저장하지 않고 성공한 응답만 캐시
+        if self.cache is not None:
+            self.cache.set(key, result)
+    
+    def evaluate_single_screen_many(self, image_base64: str, personas: Dict[str, Dict],
+                                    max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Iterator[Dict]:
+        """여러 페르소나의 단일 화면 평가를 동시에 실행하고 완료되는 순서대로 결과 반환"""
+        return self._fan_out(self.evaluate_single_screen, (image_base64,), personas, max_concurrency)
+    
+    def compare_ab_test_many(self, image_a_base64: str, image_b_base64: str, personas: Dict[str, Dict],
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Iterator[Dict]:
+        """여러 페르소나의 A/B 테스트를 동시에 실행하고 완료되는 순서대로 결과 반환"""
+        return self._fan_out(self.compare_ab_test, (image_a_base64, image_b_base64), personas, max_concurrency)
+    
+    def evaluate_single_screen_stream(self, image_base64: str, personas: Dict[str, Dict],
+                                      max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Iterator[Tuple[str, str, object]]:
+        """여러 페르소나의 단일 화면 평가를 스트리밍으로 동시에 실행하고 토큰/완료 이벤트를 반환"""
+        return self._fan_out_stream(self.evaluate_single_screen, (image_base64,), personas, max_concurrency,
+                                    "evaluation")
+    
+    def compare_ab_test_stream(self, image_a_base64: str, image_b_base64: str, personas: Dict[str, Dict],
+                               max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Iterator[Tuple[str, str, object]]:
+        """여러 페르소나의 A/B 테스트를 스트리밍으로 동시에 실행하고 토큰/완료 이벤트를 반환"""
+        return self._fan_out_stream(self.compare_ab_test, (image_a_base64, image_b_base64), personas,
+                                    max_concurrency, "comparison")
+    
+    def evaluate_flow_stream(self, images: List[str], personas: Dict[str, Dict],
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Iterator[Tuple[str, str, object]]:
+        """여러 페르소나의 흐름 평가를 동시에 실행하고 단계 진행/완료 이벤트를 반환"""
+        return self._fan_out_stream(self.evaluate_flow, (images,), personas, max_concurrency, "flow")
+    
+    def rank_variants_stream(self, images: List[str], personas: Dict[str, Dict],
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Iterator[Tuple[str, str, object]]:
+        """여러 페르소나의 변형 순위 평가를 동시에 실행하고 비교 진행/완료 이벤트를 반환"""
+        return self._fan_out_stream(self.rank_variants, (images,), personas, max_concurrency, "ranking")
+    
+    def _fan_out_stream(self, eval_fn: Callable[..., Dict], image_args: tuple, personas: Dict[str, Dict],
+                        max_concurrency: int, result_field: str) -> Iterator[Tuple[str, str, object]]:
+        """작업 스레드가 큐에 넣은 ("token", 페르소나, 텍스트) / ("done", 페르소나, 결과) 이벤트를 호출 스레드에서 반환
+        
+        Streamlit 요소는 스크립트 스레드에서만 갱신할 수 있으므로 콜백에서 직접 그리지 않고 큐로 전달
+        """
+        if not personas:
+            return
+        events: "queue.Queue[Tuple[str, str, object]]" = queue.Queue()
+        
+        def run(persona_name: str, persona_info: Dict) -> None:
+            try:
+                result = eval_fn(*image_args, persona_name, persona_info,
+                                 on_token=lambda text: events.put(("token", persona_name, text)))
+            except Exception as e:
+                result = failed_result(persona_name, result_field, f"평가 중 오류가 발생했습니다: {str(e)}", e)
+            events.put(("done", persona_name, result))
+        
+        workers = max(1, min(max_concurrency, len(personas)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="persona-eval")
+        try:
+            for persona_name, persona_info in personas.items():
+                executor.submit(run, persona_name, persona_info)
+            remaining = len(personas)
+            while remaining:
+                event = events.get()
+                if event[0] == "done":
+                    remaining -= 1
+                yield event
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _fan_out(self, eval_fn: Callable[..., Dict], image_args: tuple, personas: Dict[str, Dict],
+                 max_concurrency: int) -> Iterator[Dict]:
+        """페르소나별 호출을 제한된 크기의 스레드 풀에 분배 (OpenAI 클라이언트는 스레드 안전)"""
+        if not personas:
+            return
+        workers = max(1, min(max_concurrency, len(personas)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="persona-eval")
+        try:
+            futures = [
+                executor.submit(eval_fn, *image_args, persona_name, persona_info)
+                for persona_name, persona_info in personas.items()
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # 소비가 중단되면(예: Streamlit 재실행) 아직 시작하지 않은 호출은 취소
+            executor.shutdown(wait=False, cancel_futures=True)
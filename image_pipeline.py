@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+이미지 전처리 파이프라인 - 업로드 전 축소, 재압축, MIME 타입 판별
+GPT-4o Vision이 실제로 보는 해상도 이상은 전송하지 않아 요청 크기와 이미지 토큰을 줄임
+헤더만 읽어 크기/픽셀 제한을 먼저 확인하고, 축소 디코딩과 base64 스트리밍 인코딩으로 화면 크기와 관계없이 메모리를 제한
+"""
+
+import base64
+import binascii
+import io
+import math
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Tuple, Union
+
+from PIL import Image, UnidentifiedImageError
+
+# GPT-4o 고해상도(detail=high) 처리 규칙: 2048x2048 안으로 맞춘 뒤 짧은 변을 768로 축소, 512px 타일 단위 과금
+MODEL_MAX_EDGE = 2048
+MODEL_SHORT_EDGE = 768
+TILE_SIZE = 512
+BASE_TOKENS = 85
+TOKENS_PER_TILE = 170
+
+DEFAULT_MAX_EDGE = MODEL_MAX_EDGE
+DEFAULT_QUALITY = 85
+
+# 업로드 한 장의 최대 크기와 디코딩을 허용할 최대 픽셀 수 (디코딩 메모리는 파일 크기가 아니라 픽셀 수에 비례)
+MAX_IMAGE_BYTES = int(os.environ.get("PERSONA_MAX_IMAGE_BYTES", 20 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get("PERSONA_MAX_IMAGE_PIXELS", 40_000_000))
+
+# 축소 시 목표 크기의 이 배수까지는 reduce로 정수배 축소한 뒤 리샘플링
+REDUCING_GAP = 3.0
+# 미리보기 썸네일 최대 크기 (화면 표시 폭 기준, 세로로 긴 모바일 화면은 높이로 제한)
+THUMBNAIL_SIZE = (400, 1600)
+THUMBNAIL_QUALITY = 85
+# 원본을 그대로 보낼 때 base64로 옮기는 청크 크기 (3의 배수여야 청크 경계에 패딩이 생기지 않음)
+BASE64_CHUNK_BYTES = 3 * 64 * 1024
+
+# 포맷별로 그대로 저장할 수 있는 모드 (그 외는 저장 전에 RGB/RGBA로 변환)
+_PNG_MODES = ("1", "L", "LA", "P", "RGB", "RGBA", "I", "I;16")
+_WEBP_MODES = ("RGB", "RGBA")
+# LANCZOS로 리샘플링할 수 있는 모드 (P/1 모드는 Pillow가 NEAREST로 바꿔 글자가 계단처럼 깨짐)
+_RESAMPLE_MODES = ("L", "LA", "RGB", "RGBA", "I", "F", "CMYK", "YCbCr")
+
+# EXIF Orientation 값별 변환 (ImageOps.exif_transpose와 같은 매핑, 축소한 뒤 적용)
+_EXIF_ORIENTATION = 0x0112
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+# base64 문자열 앞부분으로 판별하는 매직 넘버
+_BASE64_SIGNATURES = (
+    ("iVBORw0KGgo", "image/png"),
+    ("/9j/", "image/jpeg"),
+    ("UklGR", "image/webp"),
+    ("R0lGOD", "image/gif"),
+)
+
+
+class ImageTooLargeError(ValueError):
+    """크기 또는 픽셀 제한을 넘는 이미지 (압축 폭탄 포함)"""
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    """전처리 설정 (output_format이 None이면 축소가 필요할 때만 원본 포맷으로 재인코딩)"""
+    max_edge: int = DEFAULT_MAX_EDGE
+    output_format: Optional[str] = None  # "JPEG", "WEBP", "PNG"
+    quality: int = DEFAULT_QUALITY
+
+
+@dataclass
+class PreparedImage:
+    """전처리된 이미지와 전/후 크기 정보 (인코딩 결과는 base64 문자열 하나로만 보관)"""
+    base64: str
+    mime_type: str
+    width: int
+    height: int
+    bytes_before: int
+    bytes_after: int
+    estimated_tokens: int
+
+    @property
+    def data(self) -> bytes:
+        """전처리된 이미지 바이트 (필요할 때만 base64에서 디코딩)"""
+        return binascii.a2b_base64(self.base64)
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+    def summary(self) -> str:
+        """UI 표시용 한 줄 요약"""
+        return (
+            f"{self.width}×{self.height} · {self.bytes_before / 1024:.0f}KB → {self.bytes_after / 1024:.0f}KB "
+            f"· 예상 이미지 토큰 {self.estimated_tokens}"
+        )
+
+
+def model_target_size(width: int, height: int) -> tuple:
+    """GPT-4o가 내부적으로 축소하는 해상도 (이보다 큰 이미지는 전송해도 이득이 없음)"""
+    scale = min(1.0, MODEL_MAX_EDGE / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, MODEL_SHORT_EDGE / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """detail=high 기준 이미지 입력 토큰 추정치"""
+    target_width, target_height = model_target_size(width, height)
+    tiles = math.ceil(target_width / TILE_SIZE) * math.ceil(target_height / TILE_SIZE)
+    return BASE_TOKENS + TOKENS_PER_TILE * tiles
+
+
+# detail=high 최대 타일 수(768x2048 → 2x4 타일)로 계산한 상한
+MAX_IMAGE_TOKENS = BASE_TOKENS + TOKENS_PER_TILE * 8
+_HEADER_BASE64_CHARS = 87384  # 약 64KB, 대부분의 PNG/JPEG 헤더를 포함
+
+
+def estimate_base64_image_tokens(image_base64: str) -> int:
+    """base64 이미지의 헤더만 디코딩하여 이미지 토큰 추정 (읽을 수 없으면 최댓값)"""
+    try:
+        header = base64.b64decode(image_base64[:_HEADER_BASE64_CHARS])
+        with Image.open(io.BytesIO(header)) as image:
+            return estimate_image_tokens(image.width, image.height)
+    except Exception:
+        return MAX_IMAGE_TOKENS
+
+
+def sniff_mime_type(image_base64: str) -> str:
+    """base64 데이터의 시그니처로 MIME 타입 판별 (알 수 없으면 PNG로 간주)"""
+    for prefix, mime_type in _BASE64_SIGNATURES:
+        if image_base64.startswith(prefix):
+            return mime_type
+    return "image/png"
+
+
+def image_data_url(image_base64: str) -> str:
+    """OpenAI image_url 메시지에 넣을 data URL 생성"""
+    return f"data:{sniff_mime_type(image_base64)};base64,{image_base64}"
+
+
+class Base64Writer:
+    """쓰는 즉시 base64로 변환하여 누적하는 쓰기 전용 파일 객체
+
+    이미지 인코더 출력이나 원본 스트림을 3바이트 단위로 바로 변환하므로 원본 바이트 전체 복사본을 만들지 않음
+    """
+
+    def __init__(self):
+        self._encoded = bytearray()
+        self._pending = b""
+        self.size = 0
+
+    def write(self, data) -> int:
+        length = len(data)
+        data = self._pending + bytes(data)
+        cut = len(data) - len(data) % 3
+        self._encoded += binascii.b2a_base64(data[:cut], newline=False)
+        self._pending = data[cut:]
+        self.size += length
+        return length
+
+    def flush(self) -> None:
+        pass
+
+    def getvalue(self) -> str:
+        """남은 바이트까지 인코딩한 base64 문자열"""
+        if self._pending:
+            self._encoded += binascii.b2a_base64(self._pending, newline=False)
+            self._pending = b""
+        return self._encoded.decode("ascii")
+
+
+def _as_stream(source: Union[bytes, BinaryIO]) -> BinaryIO:
+    # BytesIO(bytes)는 버퍼를 복사하지 않고 공유
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+    stream.seek(0)
+    return stream
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(0)
+    return size
+
+
+def _stream_base64(stream: BinaryIO) -> Base64Writer:
+    writer = Base64Writer()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(BASE64_CHUNK_BYTES), b""):
+        writer.write(chunk)
+    return writer
+
+
+def open_image(source: Union[bytes, BinaryIO], max_bytes: int = MAX_IMAGE_BYTES,
+               max_pixels: int = MAX_IMAGE_PIXELS) -> Image.Image:
+    """헤더만 읽어 이미지를 열고 크기/픽셀 제한 확인 (픽셀 디코딩은 축소 시점까지 미룸)"""
+    stream = _as_stream(source)
+    size = _stream_size(stream)
+    if size > max_bytes:
+        raise ImageTooLargeError(
+            f"이미지가 너무 큽니다 ({size / (1024 * 1024):.1f}MB, 최대 {max_bytes // (1024 * 1024)}MB)"
+        )
+    try:
+        image = Image.open(stream)
+    except Image.DecompressionBombError:
+        raise ImageTooLargeError("압축 해제 크기가 비정상적으로 큰 이미지입니다 (압축 폭탄 의심)")
+    except UnidentifiedImageError:
+        raise ValueError("지원되지 않거나 손상된 이미지 파일입니다")
+    check_pixels(image, max_pixels)
+    return image
+
+
+def check_pixels(image: Image.Image, max_pixels: int = MAX_IMAGE_PIXELS) -> None:
+    """픽셀 수 제한 확인 (붙여넣기처럼 이미 디코딩된 PIL 이미지도 같은 제한을 적용)"""
+    if image.width * image.height > max_pixels:
+        raise ImageTooLargeError(
+            f"해상도가 너무 큽니다 ({image.width}×{image.height}, 최대 {max_pixels / 1_000_000:.0f}MP)"
+        )
+
+
+def _orientation(image: Image.Image) -> Tuple[Optional[Image.Transpose], bool]:
+    """EXIF 회전 변환과 가로/세로가 바뀌는지 여부"""
+    transpose = _ORIENTATION_TRANSPOSE.get(image.getexif().get(_EXIF_ORIENTATION))
+    swapped = transpose in (Image.Transpose.TRANSPOSE, Image.Transpose.TRANSVERSE,
+                            Image.Transpose.ROTATE_90, Image.Transpose.ROTATE_270)
+    return transpose, swapped
+
+
+def preprocess_image(source: Union[bytes, BinaryIO, Image.Image],
+                     options: Optional[PreprocessOptions] = None) -> PreparedImage:
+    """이미지를 모델 해상도와 max_edge 이하로 축소하고 필요 시 재압축
+
+    바이트나 파일 객체는 제한을 확인한 뒤 축소 디코딩하고, 원본을 그대로 보낼 때도 스트림에서 바로 base64로 옮김
+    """
+    options = options or PreprocessOptions()
+
+    if isinstance(source, Image.Image):
+        check_pixels(source)
+        stream = None
+        image = source
+    else:
+        stream = _as_stream(source)
+        image = open_image(stream)
+    source_format = (image.format or "PNG").upper()
+
+    # EXIF 회전은 축소한 뒤 적용하되 축소 기준 변은 회전한 방향으로 계산
+    transpose, swapped = _orientation(image)
+    width, height = (image.height, image.width) if swapped else image.size
+    target_width, target_height = model_target_size(width, height)
+    scale = min(1.0, options.max_edge / max(target_width, target_height))
+    target_width, target_height = max(1, round(target_width * scale)), max(1, round(target_height * scale))
+    needs_resize = (target_width, target_height) != (width, height)
+
+    output_format = (options.output_format or source_format).upper()
+    if output_format not in MIME_TYPES or output_format == "GIF":
+        output_format = "PNG"
+
+    # 축소도 포맷 변경도 필요 없으면 원본 바이트를 그대로 사용
+    if stream is not None and not needs_resize and output_format == source_format:
+        writer = _stream_base64(stream)
+        return PreparedImage(
+            base64=writer.getvalue(),
+            mime_type=MIME_TYPES[output_format],
+            width=width,
+            height=height,
+            bytes_before=writer.size,
+            bytes_after=writer.size,
+            estimated_tokens=estimate_image_tokens(width, height)
+        )
+
+    if needs_resize:
+        size = (target_height, target_width) if swapped else (target_width, target_height)
+        # JPEG은 DCT 단계에서 1/2~1/8로 줄여 디코딩하므로 원본 해상도의 픽셀 버퍼를 만들지 않음
+        image.draft(image.mode, size)
+        image = _convert_unsupported_mode(image, _RESAMPLE_MODES)
+        image = image.resize(size, Image.LANCZOS, reducing_gap=REDUCING_GAP)
+    if transpose is not None:
+        image = image.transpose(transpose)
+
+    writer = Base64Writer()
+    _save(image, output_format, options.quality, writer)
+    bytes_before = _stream_size(stream) if stream is not None else writer.size
+
+    # 재압축만 한 결과가 원본보다 크면 원본을 유지
+    if stream is not None and not needs_resize and writer.size >= bytes_before \
+            and source_format in MIME_TYPES:
+        writer, output_format = _stream_base64(stream), source_format
+
+    return PreparedImage(
+        base64=writer.getvalue(),
+        mime_type=MIME_TYPES[output_format],
+        width=image.width,
+        height=image.height,
+        bytes_before=bytes_before,
+        bytes_after=writer.size,
+        estimated_tokens=estimate_image_tokens(image.width, image.height)
+    )
+
+
+def make_thumbnail(source: Union[bytes, BinaryIO], max_size: Tuple[int, int] = THUMBNAIL_SIZE) -> bytes:
+    """미리보기용 썸네일 바이트 (표시 크기로 미리 줄여 두면 st.image가 다시 디코딩/축소하지 않음)
+
+    thumbnail은 JPEG이면 draft로 축소 디코딩하고, 그 외 포맷은 reduce로 정수배 축소한 뒤 리샘플링
+    """
+    image = open_image(source)
+    transpose, swapped = _orientation(image)
+    image = _convert_unsupported_mode(image, _RESAMPLE_MODES)
+    image.thumbnail((max_size[1], max_size[0]) if swapped else max_size, Image.LANCZOS,
+                    reducing_gap=REDUCING_GAP)
+    if transpose is not None:
+        image = image.transpose(transpose)
+    # 투명 배경이 있으면 PNG, 아니면 더 작은 JPEG
+    output_format = "PNG" if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info else "JPEG"
+    buffer = io.BytesIO()
+    _save(image, output_format, THUMBNAIL_QUALITY, buffer)
+    return buffer.getvalue()
+
+
+def _save(image: Image.Image, output_format: str, quality: int, fp) -> None:
+    if output_format == "JPEG":
+        if image.mode in ("RGBA", "LA", "P"):
+            # JPEG는 투명도를 지원하지 않으므로 흰 배경에 합성
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(fp, format="JPEG", quality=quality, optimize=True)
+    elif output_format == "WEBP":
+        image = _convert_unsupported_mode(image, _WEBP_MODES)
+        image.save(fp, format="WEBP", quality=quality, method=4)
+    else:
+        image = _convert_unsupported_mode(image, _PNG_MODES)
+        image.save(fp, format="PNG", optimize=True)
+
+
+def _convert_unsupported_mode(image: Image.Image, supported: Tuple[str, ...]) -> Image.Image:
+    """포맷이 저장할 수 없는 모드(CMYK, YCbCr 등)를 RGB로, 알파 채널이 있으면 RGBA로 변환"""
+    if image.mode in supported:
+        return image
+    has_alpha = any(band in ("A", "a") for band in image.getbands()) or "transparency" in image.info
+    return image.convert("RGBA" if has_alpha else "RGB")
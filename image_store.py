@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+세션 이미지 저장소 - 업로드 이미지를 세션당 한 번만 디코딩/전처리/인코딩하여 재실행 간에 재사용
+Streamlit은 위젯이 바뀔 때마다 스크립트 전체를 다시 실행하므로 결과를 st.session_state에 보관
+"""
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from PIL import Image
+
+from image_pipeline import (BASE64_CHUNK_BYTES, THUMBNAIL_SIZE, PreparedImage, PreprocessOptions, check_pixels,
+                            make_thumbnail)
+
+DEFAULT_SESSION_MAX_BYTES = 64 * 1024 * 1024  # 세션당 64MB
+# PIL 이미지를 해시할 때 한 번에 복사하는 픽셀 수
+HASH_STRIP_PIXELS = 1024 * 1024
+
+
+@dataclass
+class StoredImage:
+    """한 업로드에 대한 미리보기 썸네일 바이트와 전처리 결과(base64) 묶음"""
+    content_hash: str
+    preview: bytes
+    prepared: PreparedImage
+
+    @property
+    def base64(self) -> str:
+        return self.prepared.base64
+
+    @property
+    def size_bytes(self) -> int:
+        """메모리 사용량 추정치 (미리보기 썸네일 + base64 문자열)"""
+        return len(self.preview) + len(self.prepared.base64)
+
+
+class SessionImageStore:
+    """콘텐츠 해시 기준 이미지 저장소 (메모리 한도를 넘으면 가장 오래 쓰지 않은 항목부터 제거)"""
+
+    def __init__(self, max_bytes: int = DEFAULT_SESSION_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, PreprocessOptions], StoredImage]" = OrderedDict()
+        # 업로드 file_id → 콘텐츠 해시 (재실행 때마다 전체 바이트를 다시 해시하지 않기 위함)
+        self._file_ids: Dict[str, str] = {}
+        self.total_bytes = 0
+
+    def load(self, image_input, options: PreprocessOptions,
+             prepare: Callable[[object], PreparedImage]) -> StoredImage:
+        """저장된 항목을 반환하고, 없으면 prepare로 전처리하여 저장"""
+        content_hash = self._content_hash(image_input)
+        key = (content_hash, options)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        prepared = prepare(image_input)
+        entry = StoredImage(
+            content_hash=content_hash,
+            preview=self._make_preview(prepared),
+            prepared=prepared
+        )
+        self._entries[key] = entry
+        self.total_bytes += entry.size_bytes
+        self._evict(keep=key)
+        return entry
+
+    def _content_hash(self, image_input) -> str:
+        file_id = getattr(image_input, "file_id", None)
+        if file_id and file_id in self._file_ids:
+            return self._file_ids[file_id]
+
+        if isinstance(image_input, Image.Image):
+            # 제한을 먼저 확인하고, tobytes()로 전체 픽셀을 복사하지 않도록 가로 띠 단위로 해시
+            check_pixels(image_input)
+            digest = hashlib.sha256(f"{image_input.mode}{image_input.size}".encode("ascii"))
+            width, height = image_input.size
+            rows = max(1, HASH_STRIP_PIXELS // max(1, width))
+            for top in range(0, height, rows):
+                digest.update(image_input.crop((0, top, width, min(height, top + rows))).tobytes())
+        elif hasattr(image_input, "getbuffer"):
+            # 업로드 버퍼를 복사하지 않고 그대로 해시
+            with image_input.getbuffer() as view:
+                digest = hashlib.sha256(view)
+        elif hasattr(image_input, "read"):
+            digest = hashlib.sha256()
+            image_input.seek(0)
+            for chunk in iter(lambda: image_input.read(BASE64_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        else:
+            raise TypeError(f"지원되지 않는 이미지 형식입니다: {type(image_input)}. PIL Image 또는 파일 업로드만 지원됩니다.")
+        content_hash = digest.hexdigest()
+
+        if file_id:
+            self._file_ids[file_id] = content_hash
+        return content_hash
+
+    def _make_preview(self, prepared: PreparedImage) -> bytes:
+        # 전처리된 이미지는 이미 모델 해상도로 축소되어 있으므로 원본 대신 이를 디코딩하여 썸네일 생성
+        return make_thumbnail(prepared.data, THUMBNAIL_SIZE)
+
+    def _evict(self, keep: Tuple[str, PreprocessOptions]) -> None:
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self.total_bytes -= entry.size_bytes
+        live_hashes = {content_hash for content_hash, _ in self._entries}
+        self._file_ids = {
+            file_id: content_hash for file_id, content_hash in self._file_ids.items()
+            if content_hash in live_hashes
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._file_ids.clear()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "bytes": self.total_bytes, "max_bytes": self.max_bytes}
+
+
+def get_session_image_store(session_state, max_bytes: int = DEFAULT_SESSION_MAX_BYTES,
+                            key: str = "image_store") -> SessionImageStore:
+    """st.session_state에 세션별 이미지 저장소를 생성/조회"""
+    store: Optional[SessionImageStore] = session_state.get(key)
+    if store is None:
+        store = SessionImageStore(max_bytes=max_bytes)
+        session_state[key] = store
+    return store
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+백그라운드 평가 작업 - 평가 요청을 작업 ID로 접수하고 작업 스레드 풀에서 실행
+Streamlit 스크립트가 재실행되거나 웹소켓이 다시 연결되어도 진행 중인 평가와 결과가 유지됨
+완료된 페르소나 결과는 SQLite에 바로 기록하고, 생성 중인 텍스트는 메모리에 보관하여 폴링 시 표시
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from evaluator import (
+    DEFAULT_MAX_CONCURRENCY, REQUEST_MODE_COMBINED, PersonaEvaluator, failed_result
+)
+from reports import ReportStore
+from result_cache import DEFAULT_CACHE_PATH
+
+DEFAULT_JOB_DB_PATH = os.environ.get(
+    "PERSONA_JOB_DB_PATH", os.path.join(os.path.dirname(DEFAULT_CACHE_PATH), "jobs.sqlite3")
+)
+DEFAULT_JOB_WORKERS = 8
+
+# 작업 종류
+JOB_KIND_SINGLE = "single"
+JOB_KIND_AB = "ab"
+JOB_KIND_FLOW = "flow"
+JOB_KIND_RANK = "rank"
+
+# 작업 상태
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_INTERRUPTED)
+
+RESULT_FIELDS = {
+    JOB_KIND_SINGLE: "evaluation", JOB_KIND_AB: "comparison", JOB_KIND_FLOW: "flow", JOB_KIND_RANK: "ranking"
+}
+
+
+class JobStore:
+    """작업 상태와 페르소나별 결과를 저장하는 SQLite 저장소"""
+
+    def __init__(self, path: str = DEFAULT_JOB_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                personas TEXT NOT NULL,
+                request_mode TEXT NOT NULL,
+                error TEXT,
+                report_id TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_results (
+                job_id TEXT NOT NULL,
+                persona TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, persona)
+            );
+            """
+        )
+        # 리포트 기능 이전에 만들어진 DB에 컬럼 추가
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "report_id" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN report_id TEXT")
+
+    def create(self, job_id: str, kind: str, personas: List[str], request_mode: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, personas, request_mode, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, JOB_QUEUED, json.dumps(personas, ensure_ascii=False), request_mode, now, now)
+            )
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+
+    def set_report(self, job_id: str, report_id: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET report_id = ? WHERE id = ?", (report_id, job_id))
+
+    def add_result(self, job_id: str, result: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, persona, result, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, result["persona"], json.dumps(result, ensure_ascii=False), time.time())
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """작업 정보와 지금까지 완료된 결과 (완료 순서대로)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, status, personas, request_mode, error, report_id, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            results = [
+                json.loads(value) for (value,) in self._conn.execute(
+                    "SELECT result FROM job_results WHERE job_id = ? ORDER BY created_at", (job_id,)
+                )
+            ]
+        kind, status, personas, request_mode, error, report_id, created_at, updated_at = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "personas": json.loads(personas),
+            "request_mode": request_mode,
+            "error": error,
+            "report_id": report_id,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "results": results
+        }
+
+    def mark_interrupted(self) -> int:
+        """이전 프로세스에서 끝나지 않은 작업을 중단됨으로 표시 (API 키를 저장하지 않으므로 재개 불가)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status IN (?, ?)",
+                (JOB_INTERRUPTED, time.time(), JOB_QUEUED, JOB_RUNNING)
+            )
+            return cursor.rowcount
+
+
+class JobManager:
+    """평가 작업을 접수하고 스레드 풀에서 실행하는 관리자 (프로세스당 하나를 공유)"""
+
+    def __init__(self, store: Optional[JobStore] = None, max_workers: int = DEFAULT_JOB_WORKERS,
+                 report_store: Optional[ReportStore] = None):
+        self.store = store or JobStore()
+        # 완료된 작업을 공유 가능한 리포트로 저장 (없으면 저장하지 않음)
+        self.report_store = report_store
+        self.store.mark_interrupted()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="persona-job")
+        self._partial: Dict[str, Dict[str, str]] = {}
+        self._partial_lock = threading.Lock()
+
+    def submit(self, evaluator: PersonaEvaluator, kind: str, images: List[str], personas: Dict[str, Dict],
+               request_mode: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> str:
+        """작업을 등록하고 바로 작업 ID를 반환 (실행은 백그라운드에서 진행)"""
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, kind, list(personas), request_mode)
+        with self._partial_lock:
+            self._partial[job_id] = {}
+        self._executor.submit(self._run, job_id, evaluator, kind, images, personas, request_mode, max_concurrency)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """작업 상태, 완료된 결과, 아직 생성 중인 페르소나의 부분 텍스트"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        with self._partial_lock:
+            job["partial"] = dict(self._partial.get(job_id, {}))
+        return job
+
+    def _append_partial(self, job_id: str, persona: str, text: str) -> None:
+        with self._partial_lock:
+            buffers = self._partial.get(job_id)
+            if buffers is not None:
+                buffers[persona] = buffers.get(persona, "") + text
+
+    def _run(self, job_id: str, evaluator: PersonaEvaluator, kind: str, images: List[str],
+             personas: Dict[str, Dict], request_mode: str, max_concurrency: int) -> None:
+        self.store.set_status(job_id, JOB_RUNNING)
+        try:
+            if kind in (JOB_KIND_SINGLE, JOB_KIND_AB) and request_mode == REQUEST_MODE_COMBINED:
+                combined = evaluator.evaluate_single_screen_combined if kind == JOB_KIND_SINGLE \
+                    else evaluator.compare_ab_test_combined
+                for result in combined(*images, personas):
+                    self.store.add_result(job_id, result)
+            else:
+                if kind in (JOB_KIND_FLOW, JOB_KIND_RANK):
+                    # 흐름/순위 평가는 화면 목록 전체를 한 인자로 받고 단계·비교 진행 상황을 토큰 이벤트로 전달
+                    stream = evaluator.evaluate_flow_stream if kind == JOB_KIND_FLOW \
+                        else evaluator.rank_variants_stream
+                    events = stream(images, personas, max_concurrency)
+                else:
+                    stream = evaluator.evaluate_single_screen_stream if kind == JOB_KIND_SINGLE \
+                        else evaluator.compare_ab_test_stream
+                    events = stream(*images, personas, max_concurrency)
+                for event, persona, payload in events:
+                    if event == "token":
+                        self._append_partial(job_id, persona, payload)
+                    else:
+                        self.store.add_result(job_id, payload)
+            self._finish(job_id, images, JOB_DONE)
+        except Exception as e:
+            # 예상치 못한 오류: 남은 페르소나는 실패 결과로 채워 화면이 무한 대기하지 않도록 함
+            finished = {result["persona"] for result in self.store.get(job_id)["results"]}
+            for persona in personas:
+                if persona not in finished:
+                    self.store.add_result(job_id, failed_result(
+                        persona, RESULT_FIELDS[kind], f"평가 중 오류가 발생했습니다: {str(e)}", e
+                    ))
+            self._finish(job_id, images, JOB_FAILED, str(e))
+        finally:
+            with self._partial_lock:
+                self._partial.pop(job_id, None)
+
+    def _finish(self, job_id: str, images: List[str], status: str, error: Optional[str] = None) -> None:
+        """리포트를 먼저 저장한 뒤 완료 상태로 바꿔 완료된 작업에는 항상 리포트 ID가 보이도록 함"""
+        if self.report_store is not None:
+            job = self.store.get(job_id)
+            try:
+                report_id = self.report_store.save(
+                    job["kind"], images, job["personas"], job["request_mode"], job["results"],
+                    duration_seconds=time.time() - job["created_at"]
+                )
+                self.store.set_report(job_id, report_id)
+            except Exception:
+                # 리포트 저장 실패는 평가 결과 표시에 영향을 주지 않음
+                pass
+        self.store.set_status(job_id, status, error)
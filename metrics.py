@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+모델 호출 계측 - 호출마다 이미지 전처리 시간, 페이로드 크기, 지연/첫 토큰 시간, 토큰 사용량, 재시도, 캐시 히트를 기록
+구조화된 JSON 로그, Prometheus 텍스트, CSV로 내보내고 p50/p95 지연과 예상 비용을 계산
+"""
+
+import csv
+import io
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# 모델별 100만 토큰당 가격 (USD: 입력, 캐시된 입력, 출력)
+MODEL_PRICING = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+KRW_PER_USD = float(os.environ.get("PERSONA_KRW_PER_USD", "1400"))
+
+# PRD 목표: 5분 이내 / 1만원 이하
+TARGET_RUN_SECONDS = 5 * 60
+TARGET_RUN_COST_KRW = 10000
+
+DEFAULT_MAX_RECORDS = 5000
+DEFAULT_METRICS_LOG_PATH = os.environ.get("PERSONA_METRICS_LOG")
+
+logger = logging.getLogger("persona.metrics")
+
+
+@dataclass
+class CallMetric:
+    """모델 호출 한 번 (캐시 히트 포함)의 계측값"""
+    timestamp: float
+    kind: str
+    persona: str
+    model: str
+    status: str
+    cached: bool = False
+    error_type: Optional[str] = None
+    # 이 호출에 보낸 이미지들의 전처리 시간 (같은 이미지를 쓰는 호출마다 같은 값, 합계는 preprocess_seconds 카운터)
+    preprocess_seconds: float = 0.0
+    payload_bytes: int = 0
+    latency_seconds: Optional[float] = None
+    ttft_seconds: Optional[float] = None
+    connect_seconds: float = 0.0
+    throttled_seconds: float = 0.0
+    retries: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    image_tokens: int = 0
+
+    @property
+    def cost_usd(self) -> float:
+        return estimate_cost_usd(self.model, self.prompt_tokens, self.completion_tokens, self.cached_tokens)
+
+
+def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """토큰 사용량의 예상 비용 (USD, 가격표에 없는 모델은 0)"""
+    input_price, cached_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0, 0.0))
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+def estimate_cost_krw(model: str, usage: Dict) -> float:
+    """summarize_usage 형식의 사용량을 원화 비용으로 환산"""
+    return estimate_cost_usd(
+        model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), usage.get("cached_tokens", 0)
+    ) * KRW_PER_USD
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """최근접 순위 방식 백분위수 (값이 없으면 None)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class MetricsRecorder:
+    """호출 계측값을 최근 max_records개까지 보관하는 스레드 안전 기록기"""
+
+    def __init__(self, max_records: int = DEFAULT_MAX_RECORDS, log_path: Optional[str] = DEFAULT_METRICS_LOG_PATH):
+        self._records: deque = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        # 보관 개수와 무관하게 누적되는 카운터 (Prometheus counter)
+        self._totals = {"calls": 0, "cache_hits": 0, "failures": 0, "retries": 0,
+                        "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "latency_seconds": 0.0,
+                        "preprocess_images": 0, "preprocess_seconds": 0.0}
+        # 이미지 해시 → 전처리 시간 (호출 계측값에 채우기 위해 최근 max_records장까지 보관)
+        self._preprocess: "OrderedDict[str, float]" = OrderedDict()
+        self._max_records = max_records
+        if log_path and not any(getattr(handler, "baseFilename", None) == os.path.abspath(log_path)
+                                for handler in logger.handlers):
+            handler = logging.FileHandler(log_path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+    def record(self, metric: CallMetric) -> None:
+        with self._lock:
+            self._records.append(metric)
+            self._totals["calls"] += 1
+            self._totals["cache_hits"] += int(metric.cached)
+            self._totals["failures"] += int(metric.status != "ok")
+            self._totals["retries"] += metric.retries
+            self._totals["prompt_tokens"] += metric.prompt_tokens
+            self._totals["cached_tokens"] += metric.cached_tokens
+            self._totals["completion_tokens"] += metric.completion_tokens
+            if not metric.cached:
+                self._totals["latency_seconds"] += metric.latency_seconds or 0.0
+        # 한 줄에 하나의 JSON 객체 (로그 수집기에서 바로 파싱 가능)
+        logger.info(json.dumps({"event": "model_call", **asdict(metric)}, ensure_ascii=False))
+
+    def record_preprocess(self, seconds: float, image_hash: Optional[str] = None) -> None:
+        """이미지 전처리(축소/재압축) 시간 (image_hash를 주면 그 이미지를 보내는 호출에 기록)"""
+        with self._lock:
+            self._totals["preprocess_images"] += 1
+            self._totals["preprocess_seconds"] += seconds
+            if image_hash is not None:
+                self._preprocess[image_hash] = seconds
+                self._preprocess.move_to_end(image_hash)
+                while len(self._preprocess) > self._max_records:
+                    self._preprocess.popitem(last=False)
+
+    def preprocess_seconds(self, image_hashes: List[str]) -> float:
+        """이미지들의 전처리 시간 합 (이 기록기로 전처리하지 않은 이미지는 0)"""
+        with self._lock:
+            return sum(self._preprocess.get(image_hash, 0.0) for image_hash in image_hashes)
+
+    def records(self) -> List[CallMetric]:
+        with self._lock:
+            return list(self._records)
+
+    def summary(self) -> Dict:
+        """캐시 히트를 제외한 실제 호출의 p50/p95 지연, 첫 토큰 시간, 누적 비용"""
+        records = self.records()
+        calls = [record for record in records if not record.cached and record.latency_seconds is not None]
+        latencies = [record.latency_seconds for record in calls]
+        ttfts = [record.ttft_seconds for record in calls if record.ttft_seconds is not None]
+        with self._lock:
+            totals = dict(self._totals)
+        return {
+            **totals,
+            "p50_latency_seconds": percentile(latencies, 50),
+            "p95_latency_seconds": percentile(latencies, 95),
+            "p50_ttft_seconds": percentile(ttfts, 50),
+            "p95_ttft_seconds": percentile(ttfts, 95),
+            "cost_usd": sum(record.cost_usd for record in records),
+        }
+
+    def to_csv(self) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([field.name for field in fields(CallMetric)])
+        for record in self.records():
+            writer.writerow(list(asdict(record).values()))
+        return buffer.getvalue()
+
+    def to_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식"""
+        summary = self.summary()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, value, labels: str = "") -> None:
+            if value is None:
+                return
+            if not any(line.startswith(f"# TYPE {name} ") for line in lines):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{labels} {value}")
+
+        metric("persona_model_calls_total", "counter", "Model calls including cache hits", summary["calls"])
+        metric("persona_cache_hits_total", "counter", "Result cache hits", summary["cache_hits"])
+        metric("persona_call_failures_total", "counter", "Calls that failed after retries", summary["failures"])
+        metric("persona_call_retries_total", "counter", "Retries across all calls", summary["retries"])
+        metric("persona_tokens_total", "counter", "Tokens billed", summary["prompt_tokens"], '{type="prompt"}')
+        metric("persona_tokens_total", "counter", "Tokens billed", summary["cached_tokens"], '{type="cached_prompt"}')
+        metric("persona_tokens_total", "counter", "Tokens billed", summary["completion_tokens"],
+               '{type="completion"}')
+        metric("persona_call_latency_seconds_sum", "counter", "Total model call latency", summary["latency_seconds"])
+        metric("persona_image_preprocess_total", "counter", "Images preprocessed", summary["preprocess_images"])
+        metric("persona_image_preprocess_seconds_total", "counter", "Time spent preprocessing images",
+               summary["preprocess_seconds"])
+        # 같은 이름의 샘플은 HELP/TYPE 아래에 모여 있어야 함
+        for name, key, help_text in (("persona_call_latency_seconds", "latency", "Recent model call latency"),
+                                     ("persona_call_ttft_seconds", "ttft", "Recent time-to-first-token")):
+            for quantile, label in (("p50", "0.5"), ("p95", "0.95")):
+                metric(name, "gauge", f"{help_text} quantiles", summary[f"{quantile}_{key}_seconds"],
+                       f'{{quantile="{label}"}}')
+        metric("persona_estimated_cost_usd", "gauge", "Estimated cost of recent calls", summary["cost_usd"])
+        return "\n".join(lines) + "\n"
+
+
+_shared_recorder: Optional[MetricsRecorder] = None
+_shared_recorder_lock = threading.Lock()
+
+
+def shared_metrics() -> MetricsRecorder:
+    """프로세스 전체에서 공유하는 기록기 (평가기를 재실행마다 새로 만들어도 누적)"""
+    global _shared_recorder
+    with _shared_recorder_lock:
+        if _shared_recorder is None:
+            _shared_recorder = MetricsRecorder()
+        return _shared_recorder
+
+
+def serve_metrics(recorder: MetricsRecorder, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """/metrics (Prometheus 텍스트)와 /metrics.csv를 제공하는 HTTP 서버를 백그라운드 스레드로 시작"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = recorder.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.csv":
+                body, content_type = recorder.to_csv(), "text/csv"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="persona-metrics", daemon=True).start()
+    return server
+
+
+def run_summary(model: str, usage: Dict, duration_seconds: Optional[float]) -> Dict:
+    """실행(작업) 하나의 예상 비용과 소요 시간을 PRD 목표와 비교"""
+    cost_krw = estimate_cost_krw(model, usage)
+    return {
+        "cost_krw": cost_krw,
+        "duration_seconds": duration_seconds,
+        "within_cost": cost_krw <= TARGET_RUN_COST_KRW,
+        "within_time": duration_seconds is not None and duration_seconds <= TARGET_RUN_SECONDS,
+    }
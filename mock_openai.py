@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+로컬 목 OpenAI 서버 - /v1/chat/completions를 흉내 내어 API 비용 없이 평가 경로를 부하 테스트
+지연 분포, 429 주입(retry-after-ms 포함), 스트리밍(SSE)과 usage 청크를 지원하고
+응답 본문은 요청의 JSON Schema(response_format)에 맞춰 생성
+
+사용 예:
+    python mock_openai.py --port 8765 --latency lognormal:1.5,0.5 --rate-limit 0.05 --jitter 2
+    (클라이언트는 base_url=http://127.0.0.1:8765/v1 로 연결)
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from image_pipeline import estimate_base64_image_tokens
+
+# prompts.persona_list_block 형식 ("페르소나 목록 (N명):" 다음 줄마다 "- 이름: 설명 (특성: ...)")
+PERSONA_LIST_HEADER = "페르소나 목록"
+PERSONA_LINE = re.compile(r"^- (.+?): ", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """응답 전체 지연 분포 (초)
+
+    fixed:0.5 / uniform:0.2,1.0 / lognormal:<중앙값>,<sigma> 형식의 문자열로 지정
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, params = spec.partition(":")
+        values = [float(value) for value in params.split(",") if value.strip()]
+        if kind == "fixed" and len(values) == 1:
+            return cls(kind, values[0])
+        if kind in ("uniform", "lognormal") and len(values) == 2:
+            return cls(kind, values[0], values[1])
+        raise ValueError(f"지연 분포 형식이 올바르지 않습니다: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(max(self.a, 1e-6)), self.b)
+        return self.a
+
+
+@dataclass
+class MockConfig:
+    latency: LatencyModel = LatencyModel()
+    # 첫 토큰까지 걸리는 시간이 전체 지연에서 차지하는 비율 (스트리밍)
+    ttft_fraction: float = 0.3
+    # 요청을 429로 거절할 확률과 응답 헤더의 retry-after-ms
+    rate_limit_probability: float = 0.0
+    retry_after_ms: int = 200
+    stream_chunks: int = 20
+    # n= 요청의 선택지마다 정수 필드(점수/선호도)를 ±sample_jitter만큼 흔들어 반복 샘플링의 분산을 흉내
+    sample_jitter: int = 0
+    seed: Optional[int] = None
+
+
+def sample_from_schema(schema: Dict, name: str = "", rng: Optional[random.Random] = None, jitter: int = 0):
+    """JSON Schema를 만족하는 예시 값 (strict 스키마의 object/array/string/integer/enum만 사용)"""
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            key: sample_from_schema(value, key, rng, jitter) for key, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [sample_from_schema(schema.get("items", {}), name, rng, jitter) for _ in range(3)]
+    if kind == "integer":
+        if name.startswith("preference"):
+            return 50 + (rng.randint(-jitter, jitter) * 5 if rng is not None and jitter else 0)
+        return 7 + (rng.randint(-jitter, jitter) if rng is not None and jitter else 0)
+    if kind == "number":
+        return 0.5
+    if kind == "boolean":
+        return True
+    return f"목 서버 응답 ({name})" if name else "목 서버 응답"
+
+
+def requested_personas(body: Dict) -> List[str]:
+    """묶음 요청의 페르소나 목록 블록("- 이름: 설명" 줄)에서 요청한 페르소나 이름을 순서대로 추출"""
+    for message in reversed(body.get("messages", [])):
+        content = message.get("content")
+        parts = [{"type": "text", "text": content}] if isinstance(content, str) else content or []
+        for part in parts:
+            text = part.get("text", "") if part.get("type") == "text" else ""
+            if text.startswith(PERSONA_LIST_HEADER):
+                return PERSONA_LINE.findall(text)
+    return []
+
+
+def response_content(body: Dict, rng: Optional[random.Random] = None, jitter: int = 0) -> str:
+    schema = (body.get("response_format") or {}).get("json_schema", {}).get("schema")
+    if schema is None:
+        return "목 서버 응답입니다."
+    content = sample_from_schema(schema, rng=rng, jitter=jitter)
+    personas = requested_personas(body)
+    if personas and isinstance(content, dict) and "results" in content:
+        # 묶음 요청은 요청한 페르소나마다 결과 하나씩 (이름이 다르면 평가기가 missing_persona로 처리)
+        item = schema["properties"]["results"].get("items", {})
+        content["results"] = [
+            dict(sample_from_schema(item, rng=rng, jitter=jitter), persona=name) for name in personas
+        ]
+    return json.dumps(content, ensure_ascii=False)
+
+
+def estimate_prompt_tokens(body: Dict) -> int:
+    """텍스트는 글자당 1토큰, 이미지는 해상도 기반 추정치로 prompt_tokens 계산"""
+    tokens = 0
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                tokens += len(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                url = part["image_url"]["url"]
+                tokens += estimate_base64_image_tokens(url.split(",", 1)[-1])
+    return tokens
+
+
+class MockOpenAIServer:
+    """스레드로 실행되는 목 서버 (with 문 또는 start/stop으로 사용)"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "streamed": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """현재 스레드에서 실행 (CLI용)"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _draw(self) -> Tuple[bool, float]:
+        """(429로 거절할지, 응답 지연)"""
+        with self._rng_lock:
+            limited = self._rng.random() < self.config.rate_limit_probability
+            return limited, self.config.latency.sample(self._rng)
+
+    def _contents(self, body: Dict) -> List[str]:
+        """요청의 n개 선택지 본문"""
+        with self._rng_lock:
+            return [
+                response_content(body, self._rng, self.config.sample_jitter)
+                for _ in range(max(1, body.get("n") or 1))
+            ]
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive 연결을 유지해야 실제 API와 비슷한 연결 재사용 패턴이 나옴
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                    return
+                server._count("requests")
+                limited, latency = server._draw()
+                if limited:
+                    server._count("rate_limited")
+                    self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests"}},
+                                    {"retry-after-ms": str(server.config.retry_after_ms)})
+                    return
+
+                contents = server._contents(body)
+                # 실제 API처럼 입력 토큰은 한 번만, 출력 토큰은 선택지 수만큼 과금
+                usage = {
+                    "prompt_tokens": estimate_prompt_tokens(body),
+                    "completion_tokens": sum(len(content) for content in contents)
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+                if body.get("stream"):
+                    server._count("streamed")
+                    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+                    # 스트리밍은 첫 번째 선택지만 전송 (평가기는 n>1 요청을 스트리밍하지 않음)
+                    self._stream(completion_id, body.get("model", ""), contents[0], latency,
+                                 usage if include_usage else None)
+                    return
+
+                time.sleep(latency)
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", ""),
+                    "choices": [
+                        {"index": index, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                        for index, content in enumerate(contents)
+                    ],
+                    "usage": usage
+                })
+
+            def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, completion_id: str, model: str, content: str, latency: float,
+                        usage: Optional[Dict]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                chunks = max(1, server.config.stream_chunks)
+                size = math.ceil(len(content) / chunks)
+                ttft = latency * server.config.ttft_fraction
+                interval = (latency - ttft) / chunks
+                time.sleep(ttft)
+                for start in range(0, len(content), size):
+                    self._event(self._chunk(completion_id, model, [{
+                        "index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None
+                    }]))
+                    time.sleep(interval)
+                self._event(self._chunk(completion_id, model, [{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+                if usage is not None:
+                    self._event(self._chunk(completion_id, model, [], usage))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _chunk(self, completion_id: str, model: str, choices, usage: Optional[Dict] = None) -> Dict:
+                return {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": choices,
+                    "usage": usage
+                }
+
+            def _event(self, payload: Dict) -> None:
+                self._write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="벤치마크용 목 OpenAI chat completions 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.5", help="지연 분포 (fixed:s / uniform:a,b / lognormal:median,sigma)")
+    parser.add_argument("--ttft-fraction", type=float, default=0.3, help="스트리밍 첫 토큰 지연 비율")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="429를 돌려줄 확률 (0-1)")
+    parser.add_argument("--retry-after-ms", type=int, default=200)
+    parser.add_argument("--jitter", type=int, default=0, help="n= 선택지마다 점수/선호도를 흔드는 폭")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=LatencyModel.parse(args.latency),
+        ttft_fraction=args.ttft_fraction,
+        rate_limit_probability=args.rate_limit,
+        retry_after_ms=args.retry_after_ms,
+        sample_jitter=args.jitter,
+        seed=args.seed
+    )
+    server = MockOpenAIServer(config, args.host, args.port)
+    print(f"목 서버 실행 중: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+헤드리스 평가 API와 CLI - Streamlit 없이 단일 화면/A/B/배치 평가를 구조화된 JSON으로 제공 (CI 파이프라인용)
+HTTP 서버는 Starlette(ASGI)로 한 프로세스에서 여러 요청을 비동기로 받고, 평가 호출은 제한된 작업 스레드에서 실행
+
+사용 예:
+    python persona_eval.py single screen.png --personas 개발자,디자이너 --min-score 6
+    python persona_eval.py ab a.png b.png
+    python persona_eval.py batch screens.zip --out results.jsonl
+    python persona_eval.py serve --port 8080
+    curl -F image=@screen.png "http://127.0.0.1:8080/v1/single?personas=개발자"
+    curl --data-binary @screen.png -H "Content-Type: image/png" http://127.0.0.1:8080/v1/single
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from client_pool import build_api
+from evaluation_schema import aggregate_preferences, aggregate_scores
+from evaluator import DEFAULT_MAX_CONCURRENCY, MODEL, PersonaEvaluator, summarize_usage
+from image_pipeline import MAX_IMAGE_BYTES, ImageTooLargeError
+from metrics import estimate_cost_krw
+from persona_registry import DEFAULT_PERSONA_LIBRARY_PATH, PersonaRegistry
+from result_cache import ResultCache
+from sampling import MAX_SAMPLES_LIMIT, SamplingOptions
+
+# 업로드 이미지 한 장의 최대 크기 (본문을 읽는 도중에 넘으면 바로 413)
+MAX_UPLOAD_BYTES = int(os.environ.get("PERSONA_MAX_UPLOAD_BYTES", MAX_IMAGE_BYTES))
+# 원본 본문을 메모리에 두는 최대 크기 (넘으면 임시 파일로 옮김)
+SPOOL_MAX_BYTES = 1024 * 1024
+# 배치 요청 한 번에 받을 최대 화면 수
+MAX_BATCH_SCREENS = 50
+# 이미지 바이트 또는 업로드 임시 파일 (파일은 바이트로 읽지 않고 전처리 단계에서 스트림으로 읽음)
+ImageSource = Union[bytes, BinaryIO]
+# 동시에 평가를 진행할 HTTP 요청 수 (초과 요청은 스레드를 잡지 않고 이벤트 루프에서 대기)
+DEFAULT_SERVER_WORKERS = 16
+
+
+class RequestError(ValueError):
+    """잘못된 평가 요청 (HTTP 응답 상태 코드 포함, CLI에서는 사용법 오류)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def select_personas(library: Dict[str, Dict], names: Optional[str]) -> Dict[str, Dict]:
+    """쉼표로 구분한 페르소나 이름을 라이브러리에서 찾음 (비어 있으면 전체)"""
+    if not names:
+        return dict(library)
+    selected = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in library]
+    if unknown:
+        raise RequestError(f"알 수 없는 페르소나: {', '.join(unknown)}")
+    return {name: library[name] for name in selected}
+
+
+def _encode(evaluator: PersonaEvaluator, image: ImageSource, name: str) -> str:
+    try:
+        return evaluator.encode_image(image if hasattr(image, "read") else io.BytesIO(image))
+    except ImageTooLargeError as e:
+        raise RequestError(f"{name}: {str(e)}", 413)
+    except (TypeError, ValueError) as e:
+        raise RequestError(f"{name}: {str(e)}")
+
+
+def _response(kind: str, personas: Dict[str, Dict], results: List[Dict], summary: Dict, started: float) -> Dict:
+    """페르소나 순서로 정렬한 결과와 집계, 사용량, 예상 비용"""
+    order = {name: index for index, name in enumerate(personas)}
+    results = sorted(results, key=lambda result: order.get(result["persona"], len(order)))
+    usage = summarize_usage(results)
+    return {
+        "kind": kind,
+        "model": MODEL,
+        "results": results,
+        "summary": summary,
+        "failed": sum(1 for result in results if result.get("error")),
+        "usage": usage,
+        "cost_krw": estimate_cost_krw(MODEL, usage),
+        "duration_seconds": time.perf_counter() - started
+    }
+
+
+def evaluate_single(evaluator: PersonaEvaluator, image: ImageSource, personas: Dict[str, Dict],
+                    max_concurrency: int = DEFAULT_MAX_CONCURRENCY, name: str = "image") -> Dict:
+    """단일 화면 평가 (페르소나별 요청을 동시에 실행)"""
+    started = time.perf_counter()
+    image_base64 = _encode(evaluator, image, name)
+    results = list(evaluator.evaluate_single_screen_many(image_base64, personas, max_concurrency))
+    return _response("single", personas, results, aggregate_scores(results), started)
+
+
+def compare_ab(evaluator: PersonaEvaluator, image_a: ImageSource, image_b: ImageSource,
+               personas: Dict[str, Dict], max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Dict:
+    """A/B 비교 평가 (페르소나별 요청을 동시에 실행)"""
+    started = time.perf_counter()
+    image_a_base64 = _encode(evaluator, image_a, "image_a")
+    image_b_base64 = _encode(evaluator, image_b, "image_b")
+    results = list(evaluator.compare_ab_test_many(image_a_base64, image_b_base64, personas, max_concurrency))
+    return _response("ab", personas, results, aggregate_preferences(results), started)
+
+
+def evaluate_screens(evaluator: PersonaEvaluator, screens: List[Tuple[str, ImageSource]],
+                     personas: Dict[str, Dict], max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Dict:
+    """여러 화면을 차례로 단일 화면 평가 (화면 안에서는 페르소나를 동시에 실행)"""
+    if len(screens) > MAX_BATCH_SCREENS:
+        raise RequestError(f"한 번에 최대 {MAX_BATCH_SCREENS}개 화면까지 평가할 수 있습니다")
+    started = time.perf_counter()
+    evaluated = [
+        dict(evaluate_single(evaluator, data, personas, max_concurrency, name), screen=name)
+        for name, data in screens
+    ]
+    usage = summarize_usage([result for screen in evaluated for result in screen["results"]])
+    return {
+        "kind": "batch",
+        "model": MODEL,
+        "screens": evaluated,
+        "failed": sum(screen["failed"] for screen in evaluated),
+        "usage": usage,
+        "cost_krw": estimate_cost_krw(MODEL, usage),
+        "duration_seconds": time.perf_counter() - started
+    }
+
+
+def build_evaluator(api_key: str, base_url: Optional[str] = None, use_cache: bool = True,
+                    samples: int = 1) -> PersonaEvaluator:
+    """CLI/서버용 평가기 (base_url은 호환 서버나 목 서버, 결과 캐시는 앱과 같은 SQLite 파일을 공유)"""
+    return PersonaEvaluator(
+        api_key,
+        cache=ResultCache() if use_cache else None,
+        api=build_api(api_key, base_url) if base_url else None,
+        sampling=SamplingOptions(max_samples=samples)
+    )
+
+
+def create_app(evaluator: PersonaEvaluator, registry: PersonaRegistry,
+               max_concurrency: int = DEFAULT_MAX_CONCURRENCY, workers: int = DEFAULT_SERVER_WORKERS):
+    """평가 API ASGI 앱 (Starlette)
+
+    POST /v1/single, /v1/ab, /v1/batch는 multipart(image / image_a, image_b / images) 업로드를 받고,
+    /v1/single은 이미지 바이트를 그대로 보낸 본문(application/octet-stream, image/*)도 스트리밍으로 읽음
+    페르소나는 personas 쿼리 또는 폼 필드(쉼표 구분)로 지정
+    """
+    try:
+        import anyio
+        from starlette.applications import Starlette
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse
+        from starlette.routing import Route
+    except ImportError:
+        raise RuntimeError("HTTP 서버를 실행하려면 starlette, uvicorn, python-multipart가 필요합니다 "
+                           "(pip install starlette uvicorn python-multipart)")
+
+    # 평가는 블로킹 호출이므로 전용 한도 안에서 작업 스레드로 실행
+    limiter = anyio.CapacityLimiter(workers)
+
+    async def read_body(request: Request, body: BinaryIO) -> None:
+        # 청크를 모아 합치지 않고 임시 파일에 바로 기록 (1MB를 넘으면 디스크로 옮겨짐)
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise RequestError(f"이미지가 너무 큽니다 (최대 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB)", 413)
+            body.write(chunk)
+        if not size:
+            raise RequestError("이미지 본문이 비어 있습니다")
+
+    def upload_file(upload, name: str) -> Tuple[str, BinaryIO]:
+        if upload is None or isinstance(upload, str):
+            raise RequestError(f"{name} 파일 필드가 필요합니다")
+        if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+            raise RequestError(f"{name}: 이미지가 너무 큽니다 (최대 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB)", 413)
+        return upload.filename or name, upload.file
+
+    @contextlib.asynccontextmanager
+    async def open_request(request: Request, fields: List[str], many: bool = False):
+        """(업로드 목록 [(이름, 파일 객체)], 페르소나) - 평가가 끝날 때까지 업로드 임시 파일을 열어 둠"""
+        names = request.query_params.get("personas")
+        if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+            if many or len(fields) > 1:
+                raise RequestError(f"multipart/form-data로 {', '.join(fields)} 파일을 보내주세요", 415)
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as body:
+                await read_body(request, body)
+                yield [(fields[0], body)], select_personas(registry.personas(), names)
+            return
+        async with request.form(max_files=MAX_BATCH_SCREENS + 1) as form:
+            names = names or form.get("personas")
+            if many:
+                uploads = [upload_file(upload, fields[0]) for upload in form.getlist(fields[0])]
+                if not uploads:
+                    raise RequestError(f"{fields[0]} 파일 필드가 필요합니다")
+            else:
+                uploads = [upload_file(form.get(field), field) for field in fields]
+            yield uploads, select_personas(registry.personas(), names)
+
+    async def run(func, *args) -> JSONResponse:
+        return JSONResponse(await anyio.to_thread.run_sync(func, *args, limiter=limiter))
+
+    async def single(request: Request) -> JSONResponse:
+        async with open_request(request, ["image"]) as (uploads, personas):
+            return await run(evaluate_single, evaluator, uploads[0][1], personas, max_concurrency, uploads[0][0])
+
+    async def ab(request: Request) -> JSONResponse:
+        async with open_request(request, ["image_a", "image_b"]) as (uploads, personas):
+            return await run(compare_ab, evaluator, uploads[0][1], uploads[1][1], personas, max_concurrency)
+
+    async def batch(request: Request) -> JSONResponse:
+        async with open_request(request, ["images"], many=True) as (uploads, personas):
+            return await run(evaluate_screens, evaluator, uploads, personas, max_concurrency)
+
+    async def personas(request: Request) -> JSONResponse:
+        return JSONResponse({"personas": registry.personas(), "version": registry.version})
+
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok", "model": MODEL})
+
+    async def request_error(request: Request, exc: RequestError) -> JSONResponse:
+        return JSONResponse({"error": str(exc)}, status_code=exc.status)
+
+    return Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/v1/personas", personas),
+            Route("/v1/single", single, methods=["POST"]),
+            Route("/v1/ab", ab, methods=["POST"]),
+            Route("/v1/batch", batch, methods=["POST"]),
+        ],
+        exception_handlers={RequestError: request_error}
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["batch"]:
+        # 폴더/zip 배치는 체크포인트와 재개를 지원하는 batch.py로 그대로 위임
+        from batch import main as batch_main
+        return batch_main(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="persona-eval", description="Streamlit 없이 페르소나 평가 실행 (JSON 출력)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    single_parser = subparsers.add_parser("single", help="단일 화면 평가")
+    single_parser.add_argument("image", help="화면 이미지 경로")
+    single_parser.add_argument("--min-score", type=float, help="페르소나 평균 점수가 이보다 낮으면 종료 코드 1 (CI 게이트)")
+    ab_parser = subparsers.add_parser("ab", help="A/B 비교 평가")
+    ab_parser.add_argument("image_a", help="A안 이미지 경로")
+    ab_parser.add_argument("image_b", help="B안 이미지 경로")
+    subparsers.add_parser("batch", help="폴더/zip 배치 평가 (batch.py와 같은 옵션)")
+    serve_parser = subparsers.add_parser("serve", help="HTTP API 서버 실행")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--workers", type=int, default=DEFAULT_SERVER_WORKERS, help="동시에 평가할 요청 수")
+    for command_parser in (single_parser, ab_parser, serve_parser):
+        command_parser.add_argument("--personas", help="쉼표로 구분한 페르소나 이름 (기본: 전체)")
+        command_parser.add_argument("--persona-file", default=DEFAULT_PERSONA_LIBRARY_PATH,
+                                    help="커스텀 페르소나 YAML/JSON 파일")
+        command_parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                                    help="요청 하나 안에서 동시에 평가할 페르소나 수")
+        command_parser.add_argument("--samples", type=int, default=1, help="페르소나당 최대 샘플 수")
+        command_parser.add_argument("--no-cache", action="store_true", help="결과 캐시를 사용하지 않음")
+        command_parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"),
+                                    help="OpenAI 호환 서버 주소 (기본: OPENAI_BASE_URL 환경 변수)")
+        command_parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"),
+                                    help="OpenAI API 키 (기본: OPENAI_API_KEY 환경 변수)")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("OpenAI API 키가 필요합니다 (--api-key 또는 OPENAI_API_KEY)")
+    if not 1 <= args.samples <= MAX_SAMPLES_LIMIT:
+        parser.error(f"--samples는 1-{MAX_SAMPLES_LIMIT} 사이여야 합니다")
+    registry = PersonaRegistry(args.persona_file)
+    if registry.last_error:
+        parser.error(f"페르소나 파일 오류: {registry.last_error}")
+    evaluator = build_evaluator(args.api_key, args.base_url, not args.no_cache, args.samples)
+
+    if args.command == "serve":
+        try:
+            import uvicorn
+        except ImportError:
+            parser.error("HTTP 서버를 실행하려면 uvicorn이 필요합니다 (pip install uvicorn)")
+        app = create_app(evaluator, registry, args.concurrency, args.workers)
+        uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+        return 0
+
+    try:
+        personas = select_personas(registry.personas(), args.personas)
+        if args.command == "single":
+            with open(args.image, "rb") as image:
+                output = evaluate_single(evaluator, image, personas, args.concurrency, args.image)
+        else:
+            with open(args.image_a, "rb") as image_a, open(args.image_b, "rb") as image_b:
+                output = compare_ab(evaluator, image_a, image_b, personas, args.concurrency)
+    except (OSError, RequestError) as e:
+        parser.error(str(e))
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    if output["failed"]:
+        return 1
+    mean = output["summary"].get("mean")
+    if args.command == "single" and args.min_score is not None and (mean is None or mean < args.min_score):
+        print(f"평균 점수 {mean if mean is not None else '-'}점이 기준 {args.min_score}점보다 낮습니다", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
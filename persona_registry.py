@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+페르소나 라이브러리 - YAML/JSON 파일에서 커스텀 페르소나를 불러와 기본 페르소나와 합침 (PRD P1)
+파일이 바뀌면 다음 조회 때 자동으로 다시 읽고, 검증에 실패하면 마지막으로 정상이던 목록을 유지
+
+파일 형식 (YAML 예시):
+    personas:
+      - name: 시니어 사용자
+        description: 스마트폰 사용이 서툰 60대 사용자
+        characteristics: 큰 글씨 선호, 단계가 적은 흐름 선호
+        version: 2
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from evaluator import DEFAULT_PERSONAS
+
+DEFAULT_PERSONA_LIBRARY_PATH = os.environ.get(
+    "PERSONA_LIBRARY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "personas.yaml")
+)
+
+MAX_NAME_LENGTH = 50
+MAX_TEXT_LENGTH = 1000
+REQUIRED_FIELDS = ("description", "characteristics")
+
+
+class PersonaValidationError(ValueError):
+    """페르소나 파일 형식 오류 (문제 목록을 모두 담아 한 번에 보여줌)"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("\n".join(problems))
+        self.problems = problems
+
+
+def _parse(text: str, path: str):
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise PersonaValidationError(["YAML 파일을 읽으려면 PyYAML이 필요합니다 (pip install PyYAML)"])
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def validate_personas(data) -> Dict[str, Dict]:
+    """파일 내용을 {이름: {description, characteristics, version}}으로 검증/정규화
+
+    personas 목록 형식과 {이름: 정보} 매핑 형식을 모두 허용
+    """
+    if data is None:
+        return {}
+    if isinstance(data, dict) and "personas" in data:
+        data = data["personas"]
+    if isinstance(data, dict):
+        entries = [dict(info, name=name) if isinstance(info, dict) else None for name, info in data.items()]
+    elif isinstance(data, list):
+        entries = data
+    else:
+        raise PersonaValidationError(["최상위는 personas 목록 또는 {이름: 정보} 매핑이어야 합니다."])
+
+    personas: Dict[str, Dict] = {}
+    problems = []
+    for index, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            problems.append(f"{index}번째 페르소나: 항목은 객체여야 합니다.")
+            continue
+        name = str(entry.get("name") or "").strip()
+        label = name or f"{index}번째 페르소나"
+        entry_problems = []
+        if not name:
+            entry_problems.append("name이 비어 있습니다.")
+        elif len(name) > MAX_NAME_LENGTH:
+            entry_problems.append(f"name은 {MAX_NAME_LENGTH}자 이하여야 합니다.")
+        elif name in personas:
+            entry_problems.append("이름이 중복됩니다.")
+        for field in REQUIRED_FIELDS:
+            value = entry.get(field)
+            if not isinstance(value, str) or not value.strip():
+                entry_problems.append(f"{field}는 비어 있지 않은 문자열이어야 합니다.")
+            elif len(value) > MAX_TEXT_LENGTH:
+                entry_problems.append(f"{field}는 {MAX_TEXT_LENGTH}자 이하여야 합니다.")
+        version = entry.get("version", 1)
+        if isinstance(version, bool) or not isinstance(version, int) or version < 1:
+            entry_problems.append("version은 1 이상의 정수여야 합니다.")
+        if entry_problems:
+            problems.extend(f"{label}: {problem}" for problem in entry_problems)
+            continue
+        personas[name] = {
+            "description": entry["description"].strip(),
+            "characteristics": entry["characteristics"].strip(),
+            "version": version
+        }
+    if problems:
+        raise PersonaValidationError(problems)
+    return personas
+
+
+class PersonaRegistry:
+    """기본 페르소나 + 파일 페르소나 (같은 이름이면 파일 정의가 우선)
+
+    personas()를 호출할 때마다 파일 수정 시각을 확인해 바뀐 경우에만 다시 읽음
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_PERSONA_LIBRARY_PATH, include_defaults: bool = True):
+        self.path = path
+        self.include_defaults = include_defaults
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._custom: Dict[str, Dict] = {}
+        self._personas: Dict[str, Dict] = {}
+        self._rebuild()
+
+    def personas(self) -> Dict[str, Dict]:
+        """현재 페르소나 목록 (파일이 바뀌었으면 다시 불러옴)"""
+        with self._lock:
+            self._reload_if_changed()
+            return dict(self._personas)
+
+    def custom_names(self) -> List[str]:
+        with self._lock:
+            return list(self._custom)
+
+    @property
+    def version(self) -> str:
+        """전체 페르소나 정의의 해시 (목록이 바뀌면 달라짐)"""
+        with self._lock:
+            encoded = json.dumps(self._personas, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:12]
+
+    def _reload_if_changed(self) -> None:
+        if not self.path:
+            return
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._signature is not None:
+                # 파일이 삭제되면 기본 페르소나만 사용
+                self._signature = None
+                self._custom = {}
+                self.last_error = None
+                self._rebuild()
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        self._signature = signature
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._custom = validate_personas(_parse(f.read(), self.path))
+            self.last_error = None
+        except Exception as e:
+            # 잘못 저장된 파일(YAML/JSON 문법 오류 포함) 때문에 앱이 멈추지 않도록 이전 목록 유지
+            self.last_error = str(e)
+            return
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        personas = {name: dict(info, version=1) for name, info in DEFAULT_PERSONAS.items()} \
+            if self.include_defaults else {}
+        personas.update(self._custom)
+        self._personas = personas
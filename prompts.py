@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+평가 프롬프트 템플릿 - 모든 요청이 같은 바이트로 시작하도록 정적 지시문을 한 번만 만들어 재사용
+메시지 순서는 [정적 지시문(system)] → [이미지] → [페르소나 블록]으로, 같은 화면을 평가하는 페르소나들이
+지시문과 이미지까지의 접두부를 공유하므로 OpenAI 프롬프트 캐시(1024토큰 이상 동일 접두부)가 적중함
+"""
+
+import hashlib
+import textwrap
+from functools import lru_cache
+from typing import Dict, List
+
+SINGLE_SCREEN_INSTRUCTIONS = textwrap.dedent("""
+    당신은 지정된 사용자 페르소나가 되어 SaaS 프로토타입 화면을 평가하는 평가자입니다.
+    첨부된 프로토타입 화면을 마지막에 주어지는 페르소나의 관점에서 평가해주세요.
+
+    다음 항목을 JSON으로 응답해주세요:
+    - score: 전체적인 인상 (1-10점, 정수)
+    - summary: 전체적인 인상 요약
+    - pros: 장점 (3가지)
+    - cons: 단점 (3가지)
+    - suggestions: 개선 제안 (3가지)
+    - key_factor: 이 페르소나가 가장 중요하게 생각할 요소
+
+    구체적이고 실용적인 피드백을 제공해주세요.
+""").strip()
+
+AB_TEST_INSTRUCTIONS = textwrap.dedent("""
+    당신은 지정된 사용자 페르소나가 되어 두 개의 SaaS 프로토타입 화면을 비교하는 평가자입니다.
+    첨부된 두 개의 프로토타입 화면(첫 번째가 A안, 두 번째가 B안)을 마지막에 주어지는 페르소나의 관점에서 비교하여 평가해주세요.
+
+    다음 항목을 JSON으로 응답해주세요:
+    - preferred: 선호하는 안 ("A" 또는 "B")
+    - preference_a, preference_b: A안 vs B안 선호도 (정수 %, 합계 100. 예: 70, 30)
+    - reasons: 선택 이유 (구체적으로 3가지)
+    - a_pros, a_cons: A안의 장단점
+    - b_pros, b_cons: B안의 장단점
+    - recommendation: 이 페르소나 관점에서의 최종 추천
+
+    객관적이고 구체적인 근거를 제시해주세요.
+""").strip()
+
+SINGLE_SCREEN_COMBINED_INSTRUCTIONS = textwrap.dedent("""
+    당신은 마지막에 주어지는 여러 페르소나를 각각 독립적으로 연기하는 평가자입니다.
+    각 페르소나의 관점에서 첨부된 프로토타입 화면을 평가해주세요.
+
+    각 페르소나마다 다음 항목을 작성해주세요:
+    - score: 전체적인 인상 (1-10점, 정수)
+    - summary: 전체적인 인상 요약
+    - pros: 장점 (3가지)
+    - cons: 단점 (3가지)
+    - suggestions: 개선 제안 (3가지)
+    - key_factor: 이 페르소나가 가장 중요하게 생각할 요소
+
+    results 배열에 페르소나마다 하나씩, persona 필드에 페르소나 이름을 그대로 넣어 JSON으로 응답해주세요.
+    구체적이고 실용적인 피드백을 제공해주세요.
+""").strip()
+
+AB_TEST_COMBINED_INSTRUCTIONS = textwrap.dedent("""
+    당신은 마지막에 주어지는 여러 페르소나를 각각 독립적으로 연기하는 평가자입니다.
+    첨부된 두 개의 프로토타입 화면(첫 번째가 A안, 두 번째가 B안)을 각 페르소나의 관점에서 비교하여 평가해주세요.
+
+    각 페르소나마다 다음 항목을 작성해주세요:
+    - preferred: 선호하는 안 ("A" 또는 "B")
+    - preference_a, preference_b: A안 vs B안 선호도 (정수 %, 합계 100. 예: 70, 30)
+    - reasons: 선택 이유 (구체적으로 3가지)
+    - a_pros, a_cons: A안의 장단점
+    - b_pros, b_cons: B안의 장단점
+    - recommendation: 이 페르소나 관점에서의 최종 추천
+
+    results 배열에 페르소나마다 하나씩, persona 필드에 페르소나 이름을 그대로 넣어 JSON으로 응답해주세요.
+    객관적이고 구체적인 근거를 제시해주세요.
+""").strip()
+
+FLOW_STEP_INSTRUCTIONS = textwrap.dedent("""
+    당신은 지정된 사용자 페르소나가 되어 SaaS 프로토타입의 사용자 흐름을 한 단계씩 따라가는 평가자입니다.
+    첨부된 화면은 흐름의 현재 단계이며, 이전 단계는 마지막에 요약으로만 주어집니다.
+    이전 단계에서 겪은 경험을 이어서 고려하여 현재 단계를 평가해주세요.
+
+    다음 항목을 JSON으로 응답해주세요:
+    - score: 이 단계 화면의 점수 (1-10점, 정수)
+    - summary: 이 단계에서 보고 한 일 (다음 단계에 요약으로 전달되므로 한두 문장으로 간결하게)
+    - friction: 이 단계에서 막히거나 헷갈리는 점
+    - continue_likelihood: 다음 단계로 계속 진행할 가능성 (정수 %)
+    - suggestions: 이 단계의 개선 제안
+
+    구체적이고 실용적인 피드백을 제공해주세요.
+""").strip()
+
+
+@lru_cache(maxsize=1024)
+def _compile_persona_block(name: str, description: str, characteristics: str) -> str:
+    return (
+        f"당신은 '{name}' 페르소나입니다.\n\n"
+        f"페르소나 정보:\n"
+        f"- 설명: {description}\n"
+        f"- 특성: {characteristics}"
+    )
+
+
+def persona_block(name: str, info: Dict) -> str:
+    """페르소나별 프롬프트 블록 (같은 정의면 항상 같은 문자열 객체를 반환)"""
+    return _compile_persona_block(name, info["description"], info["characteristics"])
+
+
+def persona_list_block(personas: Dict[str, Dict]) -> str:
+    """묶음 요청용 페르소나 목록 블록"""
+    lines = [
+        f"- {name}: {info['description']} (특성: {info['characteristics']})"
+        for name, info in personas.items()
+    ]
+    return f"페르소나 목록 ({len(personas)}명):\n" + "\n".join(lines)
+
+
+def flow_context_block(step: int, previous: List[Dict]) -> str:
+    """흐름의 현재 위치와 이전 단계 요약 (이전 이미지 대신 한 줄 요약만 전달해 페이로드가 단계 수에 비례)
+
+    전체 단계 수는 넣지 않아 뒤에 단계를 추가해도 앞 단계의 프롬프트와 캐시가 그대로 유지됨
+    """
+    lines = [f"사용자 흐름의 {step}단계 화면입니다."]
+    if previous:
+        lines.append("이전 단계 요약:")
+        for index, summary in enumerate(previous, 1):
+            score = summary.get("score")
+            lines.append(f"- {index}단계 ({score if score is not None else '-'}/10): {summary.get('summary', '')}")
+    return "\n".join(lines)
+
+
+def prompt_cache_key(kind: str, image_hashes: List[str]) -> str:
+    """같은 화면을 평가하는 요청을 같은 캐시 서버로 보내기 위한 prompt_cache_key"""
+    return hashlib.sha256(f"{kind}:{','.join(image_hashes)}".encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+평가 리포트 저장소 - 완료된 평가를 UUID로 저장하여 ?report=<id> 링크로 공유 (PRD P0 고유 URL)
+이미지는 콘텐츠 해시로 중복 제거하고, 결과는 압축한 JSON 한 덩어리로 저장하여 한 번의 조회로 불러옴
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+from evaluator import summarize_usage
+from image_pipeline import sniff_mime_type
+from result_cache import DEFAULT_CACHE_PATH
+
+DEFAULT_REPORT_DB_PATH = os.environ.get(
+    "PERSONA_REPORT_DB_PATH", os.path.join(os.path.dirname(DEFAULT_CACHE_PATH), "reports.sqlite3")
+)
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ReportStore:
+    """리포트와 이미지를 저장하는 SQLite 저장소 (이미지는 해시 기준으로 한 번만 저장)"""
+
+    def __init__(self, path: str = DEFAULT_REPORT_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                hash TEXT PRIMARY KEY,
+                mime_type TEXT NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS reports (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                image_hashes TEXT NOT NULL,
+                personas TEXT NOT NULL,
+                request_mode TEXT NOT NULL,
+                results BLOB NOT NULL,
+                usage TEXT NOT NULL,
+                duration_seconds REAL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_screens ON reports(kind, image_hashes);
+            """
+        )
+
+    def save(self, kind: str, images: List[str], personas: List[str], request_mode: str,
+             results: List[Dict], duration_seconds: Optional[float] = None) -> str:
+        """리포트를 저장하고 공유용 UUID를 반환"""
+        report_id = str(uuid.uuid4())
+        image_hashes = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for image_base64 in images:
+                    data = base64.b64decode(image_base64)
+                    image_hash = hashlib.sha256(data).hexdigest()
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO images (hash, mime_type, data) VALUES (?, ?, ?)",
+                        (image_hash, sniff_mime_type(image_base64), data)
+                    )
+                    image_hashes.append(image_hash)
+                self._conn.execute(
+                    "INSERT INTO reports (id, kind, image_hashes, personas, request_mode, results, usage, "
+                    "duration_seconds, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        report_id, kind, json.dumps(image_hashes), json.dumps(personas, ensure_ascii=False),
+                        request_mode, _pack(results), json.dumps(summarize_usage(results)),
+                        duration_seconds, time.time()
+                    )
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return report_id
+
+    def load(self, report_id: str) -> Optional[Dict]:
+        """저장된 리포트와 원본 이미지 바이트 (모델 호출 없음)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, image_hashes, personas, request_mode, results, usage, duration_seconds, created_at "
+                "FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            kind, image_hashes, personas, request_mode, results, usage, duration_seconds, created_at = row
+            image_hashes = json.loads(image_hashes)
+            placeholders = ",".join("?" * len(image_hashes))
+            images = {
+                image_hash: {"mime_type": mime_type, "data": data}
+                for image_hash, mime_type, data in self._conn.execute(
+                    f"SELECT hash, mime_type, data FROM images WHERE hash IN ({placeholders})", image_hashes
+                )
+            }
+        return {
+            "id": report_id,
+            "kind": kind,
+            "images": [images[image_hash] for image_hash in image_hashes if image_hash in images],
+            "personas": json.loads(personas),
+            "request_mode": request_mode,
+            "results": _unpack(results),
+            "usage": json.loads(usage),
+            "duration_seconds": duration_seconds,
+            "created_at": created_at
+        }
+
+    def iter_results(self, kind: Optional[str] = None, same_screens_as: Optional[str] = None,
+                     limit: Optional[int] = None) -> Iterator[Dict]:
+        """분석용 리포트 결과 목록 (이미지 바이트 없이 최신순)
+
+        same_screens_as에 리포트 ID를 주면 그 리포트와 같은 종류, 같은 화면 조합의 리포트만 반환
+        """
+        query = "SELECT id, kind, image_hashes, results, created_at FROM reports"
+        conditions, params = [], []
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        if same_screens_as is not None:
+            conditions.append("(kind, image_hashes) = (SELECT kind, image_hashes FROM reports WHERE id = ?)")
+            params.append(same_screens_as)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for report_id, report_kind, image_hashes, results, created_at in rows:
+            yield {
+                "id": report_id,
+                "kind": report_kind,
+                "image_hashes": json.loads(image_hashes),
+                "results": _unpack(results),
+                "created_at": created_at
+            }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+평가 결과 캐시 - (이미지, 페르소나, 프롬프트, 모델) 단위의 콘텐츠 주소 기반 디스크 캐시
+동일한 화면을 다시 평가할 때 OpenAI 호출 없이 저장된 결과를 반환
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "PERSONA_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".persona_cache", "results.sqlite3")
+)
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60  # 7일
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 50MB
+
+
+def hash_image(image_base64: str) -> str:
+    """이미지 내용 해시 (base64는 원본 바이트와 1:1 대응하므로 그대로 해시)"""
+    return hashlib.sha256(image_base64.encode("ascii")).hexdigest()
+
+
+def make_cache_key(**parts) -> str:
+    """키 구성 요소를 정렬된 JSON으로 직렬화하여 안정적인 캐시 키 생성"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite 기반 평가 결과 캐시 (TTL 만료 + 용량 기준 LRU 제거)"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # 동시 평가 스레드에서 공유하므로 check_same_thread를 끄고 직접 잠금
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """캐시된 결과 조회 (만료된 항목은 삭제 후 미스로 처리)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict) -> None:
+        """결과 저장 후 용량 한도를 넘으면 가장 오래 사용되지 않은 항목부터 제거"""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed_at ASC"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def clear(self) -> None:
+        """캐시 전체 삭제 및 통계 초기화"""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """히트/미스 횟수와 저장 항목 수, 용량"""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total
+        }
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+반복 샘플링 - 같은 페르소나의 응답을 여러 개 받아 점수/선호도의 평균과 신뢰구간을 계산
+n=으로 한 요청에 여러 응답을 받고(이미지는 한 번만 전송), 신뢰구간이 기준보다 좁아지면 추가 요청을 멈춤
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+MAX_SAMPLES_LIMIT = 10
+
+# 자유도 1-19의 t분포 97.5% 분위수 (95% 양측 신뢰구간, 20 이상은 정규분포 근사)
+_T_975 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+          2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093]
+
+
+@dataclass(frozen=True)
+class SamplingOptions:
+    """반복 샘플링 설정 (max_samples가 1이면 기존처럼 응답 하나만 사용)
+
+    첫 요청에서 initial_samples개를 받고, 95% 신뢰구간 폭이 기준보다 넓으면 batch_samples개씩 추가로 요청
+    """
+    max_samples: int = 1
+    initial_samples: int = 3
+    batch_samples: int = 2
+    # 단일 화면 점수(1-10점)와 A안 선호도(%)의 목표 신뢰구간 폭
+    score_ci_width: float = 1.0
+    preference_ci_width: float = 10.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_samples > 1
+
+    def first_batch(self) -> int:
+        return max(2, min(self.initial_samples, self.max_samples))
+
+    def next_batch(self, drawn: int) -> int:
+        return max(1, min(self.batch_samples, self.max_samples - drawn))
+
+
+def mean_interval(values: List[float]) -> Optional[Tuple[float, float, float]]:
+    """(평균, 표본 표준편차, 95% t 신뢰구간 반폭), 값이 없으면 None (하나면 표준편차/반폭은 무한대)"""
+    if not values:
+        return None
+    count = len(values)
+    mean = sum(values) / count
+    if count == 1:
+        return mean, math.inf, math.inf
+    std = math.sqrt(sum((value - mean) ** 2 for value in values) / (count - 1))
+    t = _T_975[count - 2] if count - 1 <= len(_T_975) else 1.96
+    return mean, std, t * std / math.sqrt(count)
+
+
+def converged(values: List[float], ci_width: float) -> bool:
+    """신뢰구간 폭이 기준 이하인지 (모든 샘플이 같으면 바로 수렴)"""
+    interval = mean_interval(values)
+    return interval is not None and 2 * interval[2] <= ci_width
+
+
+def merge_samples(samples: List[Dict], field: str) -> Tuple[int, Dict]:
+    """평균에 가장 가까운 샘플을 대표로 골라 field를 평균값으로 바꾼 구조화 결과와 대표 샘플 인덱스
+
+    장단점 같은 서술은 대표 샘플의 것을 그대로 쓰고 수치만 전체 샘플의 평균으로 대체
+    """
+    values = [(index, sample[field]) for index, sample in enumerate(samples) if sample.get(field) is not None]
+    if not values:
+        return 0, dict(samples[0])
+    mean = sum(value for _, value in values) / len(values)
+    representative = min(values, key=lambda item: abs(item[1] - mean))[0]
+    merged = dict(samples[representative])
+    if field == "preference_a":
+        preference_a = round(mean)
+        merged["preference_a"], merged["preference_b"] = preference_a, 100 - preference_a
+        if preference_a != 50:
+            merged["preferred"] = "A" if preference_a > 50 else "B"
+    else:
+        merged[field] = round(mean, 1)
+    return representative, merged
+
+
+def sampling_summary(samples: List[Dict], field: str, requests: int, target_width: float) -> Dict:
+    """리포트에 점 추정치와 함께 표시할 샘플 수, 값 목록, 표준편차, 95% 신뢰구간"""
+    values = [sample[field] for sample in samples if sample.get(field) is not None]
+    interval = mean_interval(values)
+    summary = {
+        "field": field,
+        "samples": len(samples),
+        "values": values,
+        "requests": requests,
+        "target_ci_width": target_width,
+        "mean": None,
+        "std": None,
+        "ci_low": None,
+        "ci_high": None
+    }
+    if interval is not None:
+        mean, std, half_width = interval
+        summary["mean"] = mean
+        if math.isfinite(half_width):
+            summary.update(std=std, ci_low=mean - half_width, ci_high=mean + half_width)
+    summary["converged"] = summary["ci_low"] is not None and summary["ci_high"] - summary["ci_low"] <= target_width
+    return summary
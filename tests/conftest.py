@@ -0,0 +1,31 @@
+"""
+테스트 공통 설정 - 저장소 루트의 모듈을 import할 수 있도록 경로 추가하고 내장 목 OpenAI 서버 픽스처 제공
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import RateLimiter  # noqa: E402
+from client_pool import build_api  # noqa: E402
+from evaluator import PersonaEvaluator  # noqa: E402
+from metrics import MetricsRecorder  # noqa: E402
+from mock_openai import MockConfig, MockOpenAIServer  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def server():
+    with MockOpenAIServer(MockConfig(seed=0)) as mock:
+        yield mock
+
+
+@pytest.fixture
+def make_evaluator(server):
+    """목 서버에 연결된 PersonaEvaluator를 만드는 함수 (클라이언트 측 속도 제한은 사실상 해제)"""
+    def make(cache=None, **kwargs) -> PersonaEvaluator:
+        api = build_api("sk-test", server.base_url, limiter=RateLimiter(rpm=100_000, tpm=100_000_000))
+        return PersonaEvaluator("sk-test", cache=cache, api=api, metrics=MetricsRecorder(log_path=None), **kwargs)
+    return make
@@ -0,0 +1,81 @@
+"""결과 분석 - 부트스트랩 신뢰구간, A/B 선호도 집계, 반복 평가 일치도"""
+
+import math
+
+import numpy as np
+import pytest
+
+import analytics
+from analytics import bootstrap_ci, persona_agreement, preference_overall, preference_summary, results_frame
+
+
+def report(report_id, kind, screens, results):
+    return {"id": report_id, "kind": kind, "image_hashes": screens, "created_at": 0.0, "results": results}
+
+
+def ab(persona, preference_a, cached=False):
+    return {"persona": persona, "structured": {"preference_a": preference_a,
+                                               "preferred": "A" if preference_a > 50 else "B"}, "cached": cached}
+
+
+def single(persona, score, cached=False):
+    return {"persona": persona, "structured": {"score": score}, "cached": cached}
+
+
+def test_bootstrap_ci_is_deterministic_and_brackets_mean():
+    values = np.arange(1, 12, dtype=float)
+    low, high = bootstrap_ci(values)
+    assert (low, high) == bootstrap_ci(values)
+    assert low < values.mean() < high
+    # 표본 평균의 표준오차 약 0.95이므로 95% 구간은 평균 ±2 안팎
+    assert 3.5 < low < 4.6 and 7.4 < high < 8.5
+    assert bootstrap_ci(values, seed=1) != (low, high)
+
+
+def test_bootstrap_ci_edge_cases():
+    assert bootstrap_ci([7.0]) == (7.0, 7.0)
+    assert bootstrap_ci([float("nan"), 7.0]) == (7.0, 7.0)
+    assert all(math.isnan(bound) for bound in bootstrap_ci([]))
+
+
+@pytest.mark.parametrize("max_elements", [77, 11, 1])
+def test_chunked_bootstrap_matches_single_pass(monkeypatch, max_elements):
+    values = np.arange(1, 12, dtype=float)
+    expected = bootstrap_ci(values, resamples=500)
+    # 재표본 행렬을 여러 조각으로 나눠도 같은 난수열을 쓰므로 결과가 같아야 함
+    monkeypatch.setattr(analytics, "BOOTSTRAP_MAX_ELEMENTS", max_elements)
+    assert bootstrap_ci(values, resamples=500) == pytest.approx(expected)
+
+
+def test_preference_summary_aggregates_per_persona():
+    frame = results_frame([
+        report("r1", "ab", ["a", "b"], [ab("개발자", 70), ab("디자이너", 40)]),
+        report("r2", "ab", ["a", "b"], [ab("개발자", 90), ab("디자이너", 20),
+                                       {"persona": "마케터", "error": True}]),
+        report("r3", "single", ["a"], [single("개발자", 7)]),
+    ])
+    summary = preference_summary(frame, resamples=200)
+    assert list(summary.index) == ["개발자", "디자이너"]
+    developer = summary.loc["개발자"]
+    assert (developer["count"], developer["mean_a"], developer["mean_b"]) == (2, 80.0, 20.0)
+    assert (developer["votes_a"], developer["votes_b"]) == (2, 0)
+    assert 70 <= developer["ci_low"] <= developer["mean_a"] <= developer["ci_high"] <= 90
+    assert summary.loc["디자이너", "votes_b"] == 2
+
+    overall = preference_overall(frame, resamples=200)
+    assert (overall["count"], overall["mean_a"]) == (4, 55.0)
+    assert preference_overall(results_frame([]))["mean_a"] is None
+
+
+def test_persona_agreement_ignores_cached_and_single_runs():
+    frame = results_frame([
+        report("r1", "single", ["a"], [single("개발자", 7), single("디자이너", 5)]),
+        report("r2", "single", ["a"], [single("개발자", 8), single("디자이너", 5, cached=True)]),
+        report("r3", "single", ["a"], [single("개발자", 3)]),
+    ])
+    agreement = persona_agreement(frame)
+    assert list(agreement.index.get_level_values("persona")) == ["개발자"]
+    row = agreement.iloc[0]
+    assert row["samples"] == 3
+    # 중앙값 7에서 ±1 안인 점수는 7, 8
+    assert row["score_agreement"] == pytest.approx(2 / 3)
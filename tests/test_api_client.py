@@ -0,0 +1,43 @@
+"""분당 한도 토큰 버킷의 대기 시간 계산"""
+
+import pytest
+
+from api_client import RateLimiter, TokenBucket
+
+
+def test_full_bucket_does_not_wait():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60, bucket.updated_at) == 0.0
+
+
+def test_wait_time_is_deficit_over_refill_rate():
+    bucket = TokenBucket(600)  # 초당 10개
+    now = bucket.updated_at
+    bucket.tokens = 0
+    assert bucket.wait_time(25, now) == pytest.approx(2.5)
+    # 1초 뒤에는 10개가 채워져 15개만 부족
+    assert bucket.wait_time(25, now + 1) == pytest.approx(1.5)
+
+
+def test_refill_is_capped_at_capacity():
+    bucket = TokenBucket(60)
+    now = bucket.updated_at
+    bucket.tokens = 0
+    bucket.wait_time(1, now + 3600)
+    assert bucket.tokens == pytest.approx(60)
+
+
+def test_request_larger_than_capacity_waits_only_for_full_bucket():
+    bucket = TokenBucket(60)
+    now = bucket.updated_at
+    assert bucket.wait_time(1000, now) == 0.0
+    bucket.tokens = 30
+    assert bucket.wait_time(1000, now) == pytest.approx(30.0)
+
+
+def test_penalize_drains_request_bucket_for_retry_after():
+    limiter = RateLimiter(rpm=60, tpm=100_000)
+    limiter.penalize(2.0)
+    bucket = limiter.requests
+    # 2초 동안 막힌 뒤 다음 요청 1건이 채워질 때까지 1초 더
+    assert bucket.wait_time(1, bucket.updated_at) == pytest.approx(3.0)
@@ -0,0 +1,82 @@
+"""배치 평가 - 폴더/zip 화면 수집과 JSONL 체크포인트로 이어서 실행"""
+
+import json
+import zipfile
+
+import pytest
+
+from batch import BatchJob, collect_screens, load_checkpoint
+from benchmark import synthetic_screen
+from evaluator import DEFAULT_PERSONAS
+
+PERSONAS = {name: DEFAULT_PERSONAS[name] for name in ("개발자", "기획자")}
+
+
+def write_screens(directory, count):
+    directory.mkdir(exist_ok=True)
+    for index in range(count):
+        (directory / f"screen_{index}.png").write_bytes(synthetic_screen(320, 240, index))
+    return directory
+
+
+def test_collect_screens_from_zip(tmp_path):
+    path = tmp_path / "screens.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("flow/b.png", synthetic_screen(320, 240, 1))
+        archive.writestr("a.JPG", b"jpeg")
+        archive.writestr("__MACOSX/flow/._b.png", b"resource fork")
+        archive.writestr("notes.txt", b"not an image")
+        archive.writestr("flow/", b"")
+    screens = collect_screens(str(path))
+    assert [screen.name for screen in screens] == ["a.JPG", "flow/b.png"]
+    assert screens[0].load() == b"jpeg"
+    with pytest.raises(ValueError):
+        collect_screens(str(tmp_path / "missing.zip"))
+
+
+def test_resumed_batch_skips_checkpointed_screens(tmp_path, server, make_evaluator):
+    screens = collect_screens(str(write_screens(tmp_path / "screens", 3)))
+    results_path = str(tmp_path / "results.jsonl")
+
+    # 세 번째 요청에서 중단 (Ctrl-C 같은 예외는 실행 전체를 멈춤)
+    evaluator = make_evaluator()
+    evaluate = evaluator.evaluate_single_screen
+    calls = []
+
+    def interrupted(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 2:
+            raise KeyboardInterrupt
+        return evaluate(*args, **kwargs)
+
+    evaluator.evaluate_single_screen = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        BatchJob(evaluator, screens, PERSONAS, results_path, max_concurrency=1).run()
+    # 기록 도중 끊긴 마지막 줄은 체크포인트에서 무시
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write('{"screen": "screen_2.png", "persona"')
+    assert len(load_checkpoint(results_path)) == 2
+
+    requests_before = server.stats["requests"]
+    summary = BatchJob(make_evaluator(), screens, PERSONAS, results_path, max_concurrency=2).run()
+    assert summary == {"total": 6, "skipped": 2, "completed": 4, "failed": 0}
+    assert server.stats["requests"] - requests_before == 4
+
+    # 모든 쌍이 끝난 뒤 다시 실행하면 요청 없이 전부 건너뜀
+    requests_before = server.stats["requests"]
+    summary = BatchJob(make_evaluator(), screens, PERSONAS, results_path).run()
+    assert (summary["skipped"], server.stats["requests"] - requests_before) == (6, 0)
+
+
+def test_failed_pairs_are_retried_on_resume(tmp_path, make_evaluator):
+    screens = collect_screens(str(write_screens(tmp_path / "screens", 1)))
+    results_path = tmp_path / "results.jsonl"
+    screen_hash = BatchJob(make_evaluator(), screens, PERSONAS, str(results_path))._prepare(screens[0])[1]
+    results_path.write_text("".join(
+        json.dumps({"screen": screens[0].name, "screen_hash": screen_hash, "persona": name,
+                    "result": {"persona": name, "error": name == "기획자"}}, ensure_ascii=False) + "\n"
+        for name in PERSONAS
+    ), encoding="utf-8")
+
+    summary = BatchJob(make_evaluator(), screens, PERSONAS, str(results_path)).run()
+    assert summary == {"total": 2, "skipped": 1, "completed": 1, "failed": 0}
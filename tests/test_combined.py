@@ -0,0 +1,66 @@
+"""묶음 요청 모드 - 한 응답을 페르소나별 결과로 분리, 누락된 페르소나 처리"""
+
+import base64
+import json
+
+from benchmark import synthetic_screen
+from evaluator import DEFAULT_PERSONAS, ERROR_MISSING_PERSONA
+from result_cache import ResultCache
+
+PERSONAS = {name: DEFAULT_PERSONAS[name] for name in ("개발자", "기획자", "비숙련 사용자")}
+IMAGE_A = base64.b64encode(synthetic_screen(320, 240, 1)).decode("ascii")
+IMAGE_B = base64.b64encode(synthetic_screen(320, 240, 2)).decode("ascii")
+
+
+def test_combined_response_is_split_per_persona(server, make_evaluator):
+    evaluator = make_evaluator(cache=ResultCache(":memory:"))
+    requests_before = server.stats["requests"]
+    results = evaluator.evaluate_single_screen_combined(IMAGE_A, PERSONAS)
+    assert server.stats["requests"] - requests_before == 1
+    assert [result["persona"] for result in results] == list(PERSONAS)
+    assert not any(result.get("error") for result in results)
+    assert all(result["structured"]["score"] == 7 for result in results)
+    # 한 요청을 나눠 가지므로 요청 ID와 사용량이 모두 같음
+    assert len({result["request_id"] for result in results}) == 1
+
+    cached = evaluator.evaluate_single_screen_combined(IMAGE_A, PERSONAS)
+    assert server.stats["requests"] - requests_before == 1
+    assert all(result["cached"] for result in cached)
+
+
+def test_combined_ab_comparison(make_evaluator):
+    results = make_evaluator().compare_ab_test_combined(IMAGE_A, IMAGE_B, PERSONAS)
+    assert [result["persona"] for result in results] == list(PERSONAS)
+    assert all(result["structured"]["preference_a"] + result["structured"]["preference_b"] == 100
+               for result in results)
+
+
+def test_missing_persona_fails_only_that_persona_and_skips_cache(make_evaluator):
+    evaluator = make_evaluator(cache=ResultCache(":memory:"))
+    chat = evaluator._chat
+    calls = []
+
+    def drop_last_persona(*args, **kwargs):
+        calls.append(args)
+        content, call = chat(*args, **kwargs)
+        data = json.loads(content)
+        data["results"] = [item for item in data["results"] if item["persona"] != "비숙련 사용자"]
+        return json.dumps(data, ensure_ascii=False), call
+
+    evaluator._chat = drop_last_persona
+    results = {result["persona"]: result for result in evaluator.evaluate_single_screen_combined(IMAGE_A, PERSONAS)}
+    missing = results["비숙련 사용자"]
+    assert (missing["error"], missing["error_type"]) == (True, ERROR_MISSING_PERSONA)
+    assert not results["개발자"].get("error") and not results["기획자"].get("error")
+
+    # 일부라도 실패한 응답은 캐시하지 않으므로 다시 요청
+    evaluator.evaluate_single_screen_combined(IMAGE_A, PERSONAS)
+    assert len(calls) == 2
+
+
+def test_unparseable_combined_response_fails_every_persona(make_evaluator):
+    evaluator = make_evaluator()
+    evaluator._chat = lambda *args, **kwargs: ("응답을 만들 수 없습니다", {"usage": {}, "retries": 0})
+    results = evaluator.evaluate_single_screen_combined(IMAGE_A, PERSONAS)
+    assert [result["persona"] for result in results] == list(PERSONAS)
+    assert all(result["error"] for result in results)
@@ -0,0 +1,55 @@
+"""모델 응답 JSON 복구와 필드 검증/보정"""
+
+import pytest
+
+from evaluation_schema import (
+    PARSE_JSON, PARSE_REPAIRED, PARSE_TEXT, load_json, parse_ab_comparison, parse_single_evaluation,
+    validate_ab_comparison, validate_single_evaluation
+)
+
+
+def test_load_json_valid():
+    assert load_json('{"score": 7}') == ({"score": 7}, PARSE_JSON)
+
+
+@pytest.mark.parametrize("text", [
+    '```json\n{"score": 7}\n```',
+    '평가 결과입니다: {"score": 7} 참고하세요',
+    '{"score": 7, "pros": ["a", "b",],}',
+])
+def test_load_json_repairs_fences_prose_and_trailing_commas(text):
+    data, mode = load_json(text)
+    assert mode == PARSE_REPAIRED
+    assert data["score"] == 7
+
+
+@pytest.mark.parametrize("text", ["", None, "점수는 7점입니다", '{"score": }'])
+def test_load_json_gives_up_on_text(text):
+    assert load_json(text) == (None, PARSE_TEXT)
+
+
+def test_validate_single_evaluation_clamps_and_coerces():
+    structured = validate_single_evaluation({"score": "12점", "pros": "하나", "cons": None, "suggestions": ["", "x"]})
+    assert structured["score"] == 10
+    assert structured["pros"] == ["하나"]
+    assert structured["cons"] == []
+    assert structured["suggestions"] == ["x"]
+    assert validate_single_evaluation({"score": 0})["score"] == 1
+    assert validate_single_evaluation({"score": True})["score"] is None
+
+
+def test_validate_ab_comparison_normalizes_preferences():
+    structured = validate_ab_comparison({"preferred": "a", "preference_a": 30, "preference_b": 90})
+    assert (structured["preference_a"], structured["preference_b"]) == (25, 75)
+    # 선호도와 맞지 않는 선호 안은 선호도를 따름
+    assert structured["preferred"] == "B"
+    assert validate_ab_comparison({"preference_b": 40})["preference_a"] == 60
+    tie = validate_ab_comparison({"preferred": "B안", "preference_a": 50})
+    assert (tie["preferred"], tie["preference_b"]) == ("B", 50)
+
+
+def test_parse_falls_back_to_free_text():
+    structured, mode = parse_single_evaluation("전체적으로 괜찮습니다. 7.6/10")
+    assert (structured["score"], mode) == (8, PARSE_TEXT)
+    structured, mode = parse_ab_comparison("A안과 B안 선호도는 70% vs 30%입니다")
+    assert (structured["preference_a"], structured["preferred"], mode) == (70, "A", PARSE_TEXT)
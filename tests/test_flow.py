@@ -0,0 +1,61 @@
+"""사용자 흐름 평가 - 단계별 캐시, 흐름 요약, 이전 단계 요약 블록"""
+
+import base64
+
+from benchmark import synthetic_screen
+from evaluation_schema import summarize_flow
+from evaluator import DEFAULT_PERSONAS
+from prompts import flow_context_block
+from result_cache import ResultCache
+
+PERSONA = "비숙련 사용자"
+
+
+def screens(*seeds):
+    return [base64.b64encode(synthetic_screen(320, 240, seed)).decode("ascii") for seed in seeds]
+
+
+def test_changed_step_reevaluates_only_from_that_step(server, make_evaluator):
+    evaluator = make_evaluator(cache=ResultCache(":memory:"))
+    first = evaluator.evaluate_flow(screens(1, 2, 3), PERSONA, DEFAULT_PERSONAS[PERSONA])
+    assert (first["requests"], first["reused_steps"]) == (3, 0)
+
+    # 마지막 화면만 바꾸면 그 단계만 호출
+    requests_before = server.stats["requests"]
+    changed_last = evaluator.evaluate_flow(screens(1, 2, 4), PERSONA, DEFAULT_PERSONAS[PERSONA])
+    assert server.stats["requests"] - requests_before == changed_last["requests"] == 1
+    assert [bool(step.get("cached")) for step in changed_last["steps"]] == [True, True, False]
+
+    # 중간 화면을 바꾸면 앞 단계는 캐시, 그 단계부터는 이전 요약이 달라지므로 다시 평가
+    requests_before = server.stats["requests"]
+    changed_middle = evaluator.evaluate_flow(screens(1, 5, 3), PERSONA, DEFAULT_PERSONAS[PERSONA])
+    assert server.stats["requests"] - requests_before == changed_middle["requests"] == 2
+    assert changed_middle["reused_steps"] == 1
+
+
+def test_flow_result_summarizes_each_step(make_evaluator):
+    evaluator = make_evaluator()
+    result = evaluator.evaluate_flow(screens(1, 2), PERSONA, DEFAULT_PERSONAS[PERSONA])
+    steps = [step["structured"] for step in result["steps"]]
+    assert [step["step"] for step in result["steps"]] == [1, 2]
+    assert result["structured"] == summarize_flow(steps)
+    assert result["usage"]["total_tokens"] == sum(step["usage"]["total_tokens"] for step in result["steps"])
+
+
+def test_summarize_flow_aggregates_scores_and_drop_off():
+    summary = summarize_flow([
+        {"score": 8, "continue_likelihood": 90},
+        {"score": None, "continue_likelihood": 70},
+        {"score": 4, "continue_likelihood": 30},
+        {"score": 3, "continue_likelihood": 10},
+    ])
+    assert summary == {"steps": 4, "scores": [8, None, 4, 3], "mean_score": 5.0, "drop_off_step": 3}
+    assert summarize_flow([{"score": 7, "continue_likelihood": 80}])["drop_off_step"] is None
+    assert summarize_flow([])["mean_score"] is None
+
+
+def test_flow_context_block_lists_previous_summaries_only():
+    assert flow_context_block(1, []) == "사용자 흐름의 1단계 화면입니다."
+    block = flow_context_block(3, [{"score": 8, "summary": "가입"}, {"score": None, "summary": "인증"}])
+    assert block.splitlines() == ["사용자 흐름의 3단계 화면입니다.", "이전 단계 요약:",
+                                  "- 1단계 (8/10): 가입", "- 2단계 (-/10): 인증"]
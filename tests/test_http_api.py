@@ -0,0 +1,71 @@
+"""헤드리스 HTTP API - Starlette TestClient로 업로드 요청과 응답, 오류 상태 코드 확인 (목 서버 사용)"""
+
+import pytest
+from starlette.testclient import TestClient
+
+import persona_eval
+from benchmark import synthetic_screen
+from persona_registry import PersonaRegistry
+
+SCREEN_A = synthetic_screen(320, 240, 1)
+SCREEN_B = synthetic_screen(320, 240, 2)
+
+
+@pytest.fixture
+def client(make_evaluator):
+    app = persona_eval.create_app(make_evaluator(), PersonaRegistry(path=None), max_concurrency=2)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_health_and_personas(client):
+    assert client.get("/health").json()["status"] == "ok"
+    body = client.get("/v1/personas").json()
+    assert "개발자" in body["personas"] and body["version"]
+
+
+def test_single_multipart_upload(client, server):
+    requests_before = server.stats["requests"]
+    response = client.post("/v1/single", params={"personas": "개발자,디자이너"},
+                           files={"image": ("screen.png", SCREEN_A, "image/png")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["kind"] == "single"
+    assert [result["persona"] for result in body["results"]] == ["개발자", "디자이너"]
+    assert body["failed"] == 0
+    assert body["usage"]["requests"] == server.stats["requests"] - requests_before == 2
+    assert body["cost_krw"] > 0
+
+
+def test_single_raw_body_and_form_personas(client):
+    raw = client.post("/v1/single?personas=마케터", content=SCREEN_A, headers={"content-type": "image/png"})
+    assert [result["persona"] for result in raw.json()["results"]] == ["마케터"]
+
+    form = client.post("/v1/single", data={"personas": "기획자"}, files={"image": ("s.png", SCREEN_A, "image/png")})
+    assert [result["persona"] for result in form.json()["results"]] == ["기획자"]
+
+
+def test_ab_and_batch(client):
+    ab = client.post("/v1/ab?personas=개발자", files={"image_a": ("a.png", SCREEN_A, "image/png"),
+                                                     "image_b": ("b.png", SCREEN_B, "image/png")})
+    assert ab.status_code == 200
+    assert ab.json()["results"][0]["structured"]["preferred"] in ("A", "B")
+
+    batch = client.post("/v1/batch?personas=개발자", files=[("images", ("a.png", SCREEN_A, "image/png")),
+                                                          ("images", ("b.png", SCREEN_B, "image/png"))])
+    assert batch.status_code == 200
+    assert [screen["screen"] for screen in batch.json()["screens"]] == ["a.png", "b.png"]
+
+
+def test_request_errors(client, monkeypatch):
+    image = {"image": ("s.png", SCREEN_A, "image/png")}
+    assert client.post("/v1/single?personas=없는사람", files=image).status_code == 400
+    assert client.post("/v1/single", files={"image": ("s.png", b"not an image", "image/png")}).status_code == 400
+    assert client.post("/v1/single", content=b"", headers={"content-type": "image/png"}).status_code == 400
+    assert client.post("/v1/ab", content=SCREEN_A, headers={"content-type": "image/png"}).status_code == 415
+    assert client.post("/v1/ab", files=image).status_code == 400
+
+    monkeypatch.setattr(persona_eval, "MAX_UPLOAD_BYTES", len(SCREEN_A) - 1)
+    response = client.post("/v1/single", content=SCREEN_A, headers={"content-type": "image/png"})
+    assert response.status_code == 413
+    assert "error" in response.json()
@@ -0,0 +1,105 @@
+"""이미지 크기/픽셀 제한, 413 오류 매핑, 재인코딩과 base64 스트리밍"""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+import persona_eval
+from image_pipeline import (Base64Writer, ImageTooLargeError, PreprocessOptions, check_pixels, open_image,
+                            preprocess_image)
+
+
+def _png(width: int, height: int, mode: str = "RGB") -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_open_image_rejects_oversized_bytes_and_pixels():
+    data = _png(100, 100)
+    with pytest.raises(ImageTooLargeError):
+        open_image(data, max_bytes=len(data) - 1)
+    with pytest.raises(ImageTooLargeError):
+        open_image(data, max_pixels=100 * 100 - 1)
+    assert open_image(data).size == (100, 100)
+
+
+def test_open_image_maps_decompression_bomb(monkeypatch):
+    # Pillow은 MAX_IMAGE_PIXELS의 2배를 넘으면 DecompressionBombError를 던짐
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    with pytest.raises(ImageTooLargeError):
+        open_image(_png(100, 100))
+
+
+def test_open_image_rejects_garbage_as_plain_value_error():
+    with pytest.raises(ValueError) as excinfo:
+        open_image(b"not an image")
+    assert not isinstance(excinfo.value, ImageTooLargeError)
+
+
+def _evaluator():
+    return persona_eval.build_evaluator("sk-test", use_cache=False)
+
+
+def test_encode_maps_too_large_to_413(monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    with pytest.raises(persona_eval.RequestError) as excinfo:
+        persona_eval._encode(_evaluator(), _png(100, 100), "image")
+    assert excinfo.value.status == 413
+
+
+def test_encode_maps_invalid_image_to_400():
+    with pytest.raises(persona_eval.RequestError) as excinfo:
+        persona_eval._encode(_evaluator(), b"not an image", "image")
+    assert excinfo.value.status == 400
+
+
+def test_small_image_passes_through_unchanged():
+    data = _png(64, 48)
+    prepared = preprocess_image(data)
+    assert prepared.data == data
+    assert (prepared.width, prepared.height, prepared.mime_type) == (64, 48, "image/png")
+
+
+def test_large_image_is_downscaled_to_model_resolution():
+    prepared = preprocess_image(_png(4000, 1000))
+    assert (prepared.width, prepared.height) == (2048, 512)
+
+
+@pytest.mark.parametrize("output_format", ["PNG", "WEBP"])
+def test_cmyk_is_converted_before_saving(output_format):
+    buffer = io.BytesIO()
+    Image.new("CMYK", (32, 32)).save(buffer, format="JPEG")
+    prepared = preprocess_image(buffer.getvalue(), PreprocessOptions(output_format=output_format))
+    assert Image.open(io.BytesIO(prepared.data)).mode == "RGB"
+
+
+def test_base64_writer_matches_b64encode_across_chunk_boundaries():
+    data = bytes(range(256)) * 7 + b"xy"
+    writer = Base64Writer()
+    for start in range(0, len(data), 5):
+        writer.write(data[start:start + 5])
+    assert writer.getvalue() == base64.b64encode(data).decode("ascii")
+    assert writer.size == len(data)
+
+
+def test_pil_input_is_checked_against_pixel_limit():
+    # 붙여넣기 경로(PIL 이미지)도 open_image와 같은 픽셀 제한 적용 (1비트 모드라 48MP도 6MB)
+    with pytest.raises(ImageTooLargeError):
+        preprocess_image(Image.new("1", (8000, 6000)))
+    with pytest.raises(ImageTooLargeError):
+        check_pixels(Image.new("1", (20, 20)), max_pixels=399)
+
+
+def test_palette_image_is_resampled_smoothly():
+    # 흑백 줄무늬 팔레트 이미지를 축소하면 LANCZOS는 중간 밝기를, NEAREST는 0/255만 남김
+    stripes = Image.new("L", (4000, 1000))
+    stripes.putdata([255 * (x % 2) for _ in range(1000) for x in range(4000)])
+    buffer = io.BytesIO()
+    stripes.convert("P").save(buffer, format="PNG")
+    prepared = preprocess_image(buffer.getvalue())
+    resized = Image.open(io.BytesIO(prepared.data)).convert("L")
+    assert resized.size == (2048, 512)
+    assert sum(resized.histogram()[1:255]) > 0
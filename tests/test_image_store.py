@@ -0,0 +1,100 @@
+"""세션 이미지 저장소 - 콘텐츠 해시 기준 재사용, 메모리 한도 LRU 제거, PIL 이미지 해시"""
+
+import io
+
+import pytest
+from PIL import Image
+
+import image_store
+from benchmark import synthetic_screen
+from image_pipeline import ImageTooLargeError, PreprocessOptions, preprocess_image
+from image_store import DEFAULT_SESSION_MAX_BYTES, SessionImageStore, get_session_image_store
+
+OPTIONS = PreprocessOptions()
+
+
+class Upload(io.BytesIO):
+    """Streamlit UploadedFile처럼 file_id를 가진 업로드"""
+
+    def __init__(self, data: bytes, file_id: str):
+        super().__init__(data)
+        self.file_id = file_id
+
+
+class CountingPrepare:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, image_input):
+        self.calls += 1
+        return preprocess_image(image_input, OPTIONS)
+
+
+def test_same_content_is_prepared_once():
+    store, prepare = SessionImageStore(), CountingPrepare()
+    data = synthetic_screen(320, 240, 1)
+    first = store.load(io.BytesIO(data), OPTIONS, prepare)
+    # 다른 업로드 객체라도 바이트가 같으면 저장된 결과를 재사용
+    again = store.load(Upload(data, "upload-1"), OPTIONS, prepare)
+    assert again is first and prepare.calls == 1
+
+    store.load(io.BytesIO(synthetic_screen(320, 240, 2)), OPTIONS, prepare)
+    store.load(io.BytesIO(data), PreprocessOptions(output_format="JPEG"), prepare)
+    assert prepare.calls == 3 and len(store) == 3
+    assert first.preview and first.base64 == first.prepared.base64
+
+
+def test_file_id_skips_rehashing():
+    store, prepare = SessionImageStore(), CountingPrepare()
+    entry = store.load(Upload(synthetic_screen(320, 240, 1), "upload-1"), OPTIONS, prepare)
+    # 같은 file_id는 바이트를 다시 해시하지 않으므로 내용과 관계없이 같은 항목을 반환
+    assert store.load(Upload(b"", "upload-1"), OPTIONS, prepare) is entry
+    assert prepare.calls == 1
+
+
+def test_least_recently_used_entries_are_evicted_at_cap():
+    assert SessionImageStore().max_bytes == DEFAULT_SESSION_MAX_BYTES == 64 * 1024 * 1024
+    prepare = CountingPrepare()
+    screens = [synthetic_screen(320, 240, seed) for seed in range(4)]
+    entry_size = SessionImageStore().load(io.BytesIO(screens[0]), OPTIONS, prepare).size_bytes
+    store = SessionImageStore(max_bytes=int(entry_size * 2.5))
+
+    first = store.load(io.BytesIO(screens[0]), OPTIONS, prepare)
+    store.load(io.BytesIO(screens[1]), OPTIONS, prepare)
+    # 첫 화면을 다시 쓰면 가장 최근으로 옮겨져 두 번째 화면이 먼저 제거됨
+    store.load(io.BytesIO(screens[0]), OPTIONS, prepare)
+    store.load(io.BytesIO(screens[2]), OPTIONS, prepare)
+    assert store.total_bytes <= store.max_bytes
+    assert {entry.content_hash for entry in store._entries.values()} == {
+        first.content_hash, store._content_hash(io.BytesIO(screens[2]))
+    }
+
+    calls = prepare.calls
+    store.load(io.BytesIO(screens[1]), OPTIONS, prepare)
+    assert prepare.calls == calls + 1
+
+
+def test_single_entry_larger_than_cap_is_kept():
+    store = SessionImageStore(max_bytes=1)
+    entry = store.load(io.BytesIO(synthetic_screen(320, 240, 1)), OPTIONS, CountingPrepare())
+    assert len(store) == 1 and store.total_bytes == entry.size_bytes
+
+
+def test_pil_images_hash_by_pixels(monkeypatch):
+    # 띠 단위 해시가 여러 조각으로 나뉘도록 한 번에 복사하는 픽셀 수를 줄임
+    monkeypatch.setattr(image_store, "HASH_STRIP_PIXELS", 320 * 7)
+    store = SessionImageStore()
+    image = Image.open(io.BytesIO(synthetic_screen(320, 240, 1))).convert("RGB")
+    changed = image.copy()
+    changed.putpixel((319, 239), (1, 2, 3))
+    assert store._content_hash(image) == store._content_hash(image.copy())
+    assert store._content_hash(image) != store._content_hash(changed)
+    assert store._content_hash(image) != store._content_hash(image.convert("RGBA"))
+    with pytest.raises(ImageTooLargeError):
+        store._content_hash(Image.new("1", (8000, 6000)))
+
+
+def test_session_store_is_created_once_per_session():
+    session_state = {}
+    store = get_session_image_store(session_state)
+    assert get_session_image_store(session_state) is store
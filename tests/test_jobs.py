@@ -0,0 +1,75 @@
+"""백그라운드 평가 작업 - 접수/폴링, 재시작 시 중단 표시, 사라진 작업 폴링"""
+
+import base64
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from benchmark import synthetic_screen
+from evaluator import DEFAULT_PERSONAS, REQUEST_MODE_COMBINED, REQUEST_MODE_PER_PERSONA
+from jobs import (FINISHED_STATUSES, JOB_DONE, JOB_INTERRUPTED, JOB_KIND_SINGLE, JOB_RUNNING, JobManager,
+                  JobStore)
+
+PERSONAS = {name: DEFAULT_PERSONAS[name] for name in ("개발자", "디자이너", "마케터")}
+
+
+def wait_for(manager, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in FINISHED_STATUSES:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"작업이 {timeout}초 안에 끝나지 않았습니다: {job['status']}")
+
+
+def screen():
+    return base64.b64encode(synthetic_screen(320, 240, 1)).decode("ascii")
+
+
+def test_submit_and_poll_until_done(make_evaluator):
+    manager = JobManager(JobStore(":memory:"), max_workers=2)
+    for request_mode in (REQUEST_MODE_PER_PERSONA, REQUEST_MODE_COMBINED):
+        job_id = manager.submit(make_evaluator(), JOB_KIND_SINGLE, [screen()], PERSONAS, request_mode)
+        job = wait_for(manager, job_id)
+        assert job["status"] == JOB_DONE
+        assert job["request_mode"] == request_mode
+        assert sorted(result["persona"] for result in job["results"]) == sorted(PERSONAS)
+        assert not any(result.get("error") for result in job["results"])
+        # 완료된 작업은 생성 중인 텍스트를 남기지 않음
+        assert job["partial"] == {}
+
+
+def test_unfinished_jobs_are_marked_interrupted_on_startup(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    store.create("queued", JOB_KIND_SINGLE, ["개발자"], REQUEST_MODE_PER_PERSONA)
+    store.create("running", JOB_KIND_SINGLE, ["개발자"], REQUEST_MODE_PER_PERSONA)
+    store.set_status("running", JOB_RUNNING)
+    store.create("done", JOB_KIND_SINGLE, ["개발자"], REQUEST_MODE_PER_PERSONA)
+    store.set_status("done", JOB_DONE)
+
+    # 새 프로세스가 같은 DB로 관리자를 만드는 상황
+    manager = JobManager(JobStore(path))
+    assert manager.get("queued")["status"] == JOB_INTERRUPTED
+    assert manager.get("running")["status"] == JOB_INTERRUPTED
+    assert manager.get("done")["status"] == JOB_DONE
+    assert manager.get("unknown") is None
+
+
+def _poll_missing_job():
+    from app import poll_job
+    from jobs import JobManager, JobStore
+
+    poll_job(JobManager(JobStore(":memory:")), "missing-job")
+
+
+def test_poll_job_forgets_missing_job():
+    app = AppTest.from_function(_poll_missing_job)
+    app.session_state["job_single"] = "missing-job"
+    app.session_state["job_ab"] = "other-job"
+    app.run()
+    assert not app.exception
+    assert "job_single" not in app.session_state
+    assert app.session_state["job_ab"] == "other-job"
+    assert len(app.info) == 1
@@ -0,0 +1,62 @@
+"""지연 백분위수(최근접 순위), 비용 추정, 호출별 전처리 시간 기록"""
+
+import base64
+import csv
+import io
+
+import pytest
+
+from benchmark import synthetic_screen
+from metrics import MetricsRecorder, estimate_cost_usd, percentile
+
+
+@pytest.mark.parametrize("values, q, expected", [
+    ([1, 2], 50, 1),
+    (list(range(1, 21)), 95, 19),
+    (list(range(1, 21)), 50, 10),
+    (list(range(1, 101)), 99, 99),
+    ([3, 1, 2], 100, 3),
+    ([3, 1, 2], 0, 1),
+    ([5.0], 95, 5.0),
+])
+def test_percentile_nearest_rank(values, q, expected):
+    assert percentile(values, q) == expected
+
+
+def test_percentile_of_empty_is_none():
+    assert percentile([], 50) is None
+
+
+def test_cached_input_tokens_cost_less():
+    full = estimate_cost_usd("gpt-4o", 1_000_000, 0)
+    cached = estimate_cost_usd("gpt-4o", 1_000_000, 0, cached_tokens=1_000_000)
+    assert full == pytest.approx(2.50)
+    assert cached == pytest.approx(1.25)
+    assert estimate_cost_usd("unknown-model", 1000, 1000) == 0.0
+
+
+def test_preprocess_seconds_are_kept_per_image_hash():
+    recorder = MetricsRecorder(max_records=2, log_path=None)
+    recorder.record_preprocess(0.5, "a")
+    recorder.record_preprocess(0.25, "b")
+    recorder.record_preprocess(0.125)
+    assert recorder.preprocess_seconds(["a", "b", "unknown"]) == 0.75
+    # 보관 개수를 넘으면 오래된 이미지부터 잊지만 누적 카운터는 유지
+    recorder.record_preprocess(1.0, "c")
+    assert recorder.preprocess_seconds(["a", "c"]) == 1.0
+    assert recorder.summary()["preprocess_images"] == 4
+    assert recorder.summary()["preprocess_seconds"] == 1.875
+
+
+def test_model_calls_record_their_images_preprocess_time(make_evaluator):
+    evaluator = make_evaluator()
+    image = evaluator.encode_image(io.BytesIO(synthetic_screen(640, 400, 1)))
+    evaluator.evaluate_single_screen(image, "개발자", {"description": "개발자", "characteristics": "기술 중심"})
+    other = base64.b64encode(synthetic_screen(320, 240, 2)).decode("ascii")
+    evaluator.evaluate_single_screen(other, "개발자", {"description": "개발자", "characteristics": "기술 중심"})
+
+    prepared, unprepared = evaluator.metrics.records()
+    assert prepared.preprocess_seconds == evaluator.metrics.summary()["preprocess_seconds"] > 0
+    assert unprepared.preprocess_seconds == 0.0
+    rows = list(csv.DictReader(io.StringIO(evaluator.metrics.to_csv())))
+    assert float(rows[0]["preprocess_seconds"]) == prepared.preprocess_seconds
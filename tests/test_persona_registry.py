@@ -0,0 +1,103 @@
+"""페르소나 라이브러리 - 파일 검증, 수정 시각 기반 자동 재로드, 바이트 단위로 고정된 프롬프트 블록"""
+
+import json
+import os
+
+import pytest
+
+from evaluator import DEFAULT_PERSONAS
+from persona_registry import PersonaRegistry, PersonaValidationError, validate_personas
+from prompts import persona_block
+
+SENIOR_YAML = """
+personas:
+  - name: 시니어 사용자
+    description: 스마트폰 사용이 서툰 60대 사용자
+    characteristics: 큰 글씨 선호
+    version: 2
+"""
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is not None:
+        # 파일 시스템의 수정 시각 해상도와 관계없이 변경이 보이도록 명시적으로 설정
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_validate_accepts_list_and_mapping_forms():
+    as_list = validate_personas({"personas": [{"name": " 학생 ", "description": "대학생 ", "characteristics": "빠름"}]})
+    as_mapping = validate_personas({"학생": {"description": "대학생", "characteristics": "빠름"}})
+    assert as_list == as_mapping == {"학생": {"description": "대학생", "characteristics": "빠름", "version": 1}}
+    assert validate_personas(None) == {}
+
+
+def test_validate_reports_every_problem_at_once():
+    with pytest.raises(PersonaValidationError) as excinfo:
+        validate_personas([
+            {"name": "", "description": "설명", "characteristics": "특성"},
+            {"name": "학생", "description": "", "characteristics": "특성", "version": 0},
+            {"name": "교사", "description": "설명", "characteristics": "x" * 1001},
+            {"name": "교사", "description": "설명", "characteristics": "특성"},
+            {"name": "관리자", "description": "설명", "characteristics": "특성", "version": True},
+            "문자열",
+        ])
+    problems = excinfo.value.problems
+    assert problems == [
+        "1번째 페르소나: name이 비어 있습니다.",
+        "학생: description는 비어 있지 않은 문자열이어야 합니다.",
+        "학생: version은 1 이상의 정수여야 합니다.",
+        "교사: characteristics는 1000자 이하여야 합니다.",
+        "관리자: version은 1 이상의 정수여야 합니다.",
+        "6번째 페르소나: 항목은 객체여야 합니다.",
+    ]
+    with pytest.raises(PersonaValidationError):
+        validate_personas("personas")
+
+
+def test_registry_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "personas.yaml"
+    write(path, SENIOR_YAML, mtime_ns=1_000_000_000)
+    registry = PersonaRegistry(str(path))
+    personas = registry.personas()
+    assert personas["시니어 사용자"]["version"] == 2
+    assert set(DEFAULT_PERSONAS) < set(personas)
+    version = registry.version
+
+    write(path, SENIOR_YAML.replace("큰 글씨 선호", "큰 글씨와 음성 안내 선호"), mtime_ns=2_000_000_000)
+    assert registry.personas()["시니어 사용자"]["characteristics"] == "큰 글씨와 음성 안내 선호"
+    assert registry.version != version
+
+    # 잘못된 파일은 오류만 기록하고 마지막 정상 목록 유지
+    write(path, "personas: [", mtime_ns=3_000_000_000)
+    assert registry.personas()["시니어 사용자"]["characteristics"] == "큰 글씨와 음성 안내 선호"
+    assert registry.last_error
+
+    path.unlink()
+    assert "시니어 사용자" not in registry.personas()
+    assert registry.last_error is None
+
+
+def test_json_file_overrides_default_persona(tmp_path):
+    path = tmp_path / "personas.json"
+    write(path, json.dumps({"개발자": {"description": "백엔드 개발자", "characteristics": "API 중심"}},
+                           ensure_ascii=False))
+    registry = PersonaRegistry(str(path), include_defaults=False)
+    assert registry.personas() == {"개발자": {"description": "백엔드 개발자", "characteristics": "API 중심",
+                                           "version": 1}}
+    assert registry.custom_names() == ["개발자"]
+
+
+def test_persona_block_is_byte_stable_across_reloads(tmp_path):
+    path = tmp_path / "personas.yaml"
+    write(path, SENIOR_YAML, mtime_ns=1_000_000_000)
+    registry = PersonaRegistry(str(path))
+    before = persona_block("시니어 사용자", registry.personas()["시니어 사용자"])
+    assert before == ("당신은 '시니어 사용자' 페르소나입니다.\n\n페르소나 정보:\n"
+                      "- 설명: 스마트폰 사용이 서툰 60대 사용자\n- 특성: 큰 글씨 선호")
+
+    # 내용이 같은 파일을 다시 읽어 새 dict가 만들어져도 (version만 달라도) 블록은 바이트 단위로 같음
+    write(path, SENIOR_YAML.replace("version: 2", "version: 3"), mtime_ns=2_000_000_000)
+    after = persona_block("시니어 사용자", registry.personas()["시니어 사용자"])
+    assert after.encode("utf-8") == before.encode("utf-8")
+    assert persona_block("개발자", DEFAULT_PERSONAS["개발자"]) is persona_block("개발자", dict(DEFAULT_PERSONAS["개발자"]))
@@ -0,0 +1,68 @@
+"""디자인 변형 순위 평가 (이진 삽입 정렬) - 내장 목 OpenAI 서버 사용"""
+
+import base64
+
+from benchmark import synthetic_screen
+from evaluation_schema import variant_label
+from evaluator import DEFAULT_PERSONAS
+from result_cache import ResultCache
+
+PERSONA = "개발자"
+
+
+def variants(count):
+    return [base64.b64encode(synthetic_screen(320, 240, seed)).decode("ascii") for seed in range(count)]
+
+
+def max_comparisons(count):
+    # 이진 삽입 정렬에서 i번째 변형을 끼워 넣는 데 필요한 최대 비교 수의 합
+    return sum(index.bit_length() for index in range(1, count))
+
+
+def test_ranking_is_consistent_with_every_comparison(server, make_evaluator):
+    evaluator = make_evaluator()
+    requests_before = server.stats["requests"]
+    result = evaluator.rank_variants(variants(5), PERSONA, DEFAULT_PERSONAS[PERSONA])
+
+    order = result["structured"]["order"]
+    assert sorted(order) == [variant_label(index) for index in range(5)]
+    position = {label: rank for rank, label in enumerate(order)}
+    for comparison in result["comparisons"]:
+        assert position[variant_label(comparison["winner"])] < position[variant_label(comparison["loser"])]
+
+    comparisons = len(result["comparisons"])
+    assert 4 <= comparisons <= max_comparisons(5)
+    assert server.stats["requests"] - requests_before == comparisons == result["requests"]
+
+
+def test_rerun_and_added_variant_reuse_cached_comparisons(server, make_evaluator):
+    evaluator = make_evaluator(cache=ResultCache(":memory:"))
+    first = evaluator.rank_variants(variants(4), PERSONA, DEFAULT_PERSONAS[PERSONA])
+
+    requests_before = server.stats["requests"]
+    again = evaluator.rank_variants(variants(4), PERSONA, DEFAULT_PERSONAS[PERSONA])
+    assert again["structured"]["order"] == first["structured"]["order"]
+    assert again["reused_comparisons"] == len(again["comparisons"])
+    assert server.stats["requests"] == requests_before
+
+    # 변형을 하나 추가하면 새 변형이 포함된 비교만 새로 호출
+    extended = evaluator.rank_variants(variants(5), PERSONA, DEFAULT_PERSONAS[PERSONA])
+    fresh = [comparison for comparison in extended["comparisons"] if not comparison["cached"]]
+    assert fresh and all(4 in (comparison["winner"], comparison["loser"]) for comparison in fresh)
+    assert server.stats["requests"] - requests_before == len(fresh)
+
+
+def test_ranking_recovers_known_preference_order(make_evaluator):
+    evaluator = make_evaluator()
+    images = variants(6)
+    quality = {image: score for image, score in zip(images, [3, 9, 1, 7, 5, 8])}
+
+    def compare_ab_test(image_a, image_b, persona_name, persona_info):
+        preference_a = 50 + 5 * (quality[image_a] - quality[image_b])
+        return {"structured": {"preference_a": preference_a, "preferred": "A" if preference_a > 50 else "B"},
+                "usage": {}}
+
+    evaluator.compare_ab_test = compare_ab_test
+    result = evaluator.rank_variants(images, PERSONA, DEFAULT_PERSONAS[PERSONA])
+    assert result["structured"]["order"] == ["B", "F", "D", "E", "A", "C"]
+    assert len(result["comparisons"]) <= max_comparisons(6)
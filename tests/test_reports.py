@@ -0,0 +1,70 @@
+"""리포트 저장소 - 압축 결과 왕복, 이미지 해시 중복 제거, 같은 화면 조합 필터"""
+
+import base64
+import zlib
+
+from benchmark import synthetic_screen
+from reports import ReportStore, _pack, _unpack
+
+IMAGE_A = base64.b64encode(synthetic_screen(320, 240, 1)).decode("ascii")
+IMAGE_B = base64.b64encode(synthetic_screen(320, 240, 2)).decode("ascii")
+
+
+def result(persona, score, total_tokens=100):
+    return {"persona": persona, "evaluation": "평가 " * 50, "structured": {"score": score},
+            "usage": {"prompt_tokens": total_tokens - 10, "completion_tokens": 10, "total_tokens": total_tokens},
+            "requests": 2}
+
+
+def test_pack_compresses_and_round_trips():
+    results = [result("개발자", 7), result("디자이너", None)]
+    blob = _pack(results)
+    assert _unpack(blob) == results
+    assert len(blob) < len(zlib.decompress(blob))
+
+
+def test_save_and_load_round_trip():
+    store = ReportStore(":memory:")
+    results = [result("개발자", 7), result("디자이너", 5, total_tokens=50)]
+    report_id = store.save("ab", [IMAGE_A, IMAGE_B], ["개발자", "디자이너"], "per_persona", results,
+                           duration_seconds=1.5)
+
+    report = store.load(report_id)
+    assert report["results"] == results
+    assert (report["kind"], report["personas"], report["request_mode"]) == ("ab", ["개발자", "디자이너"], "per_persona")
+    assert [image["data"] for image in report["images"]] == [base64.b64decode(IMAGE_A), base64.b64decode(IMAGE_B)]
+    assert report["images"][0]["mime_type"] == "image/png"
+    assert report["usage"]["total_tokens"] == 150
+    assert report["usage"]["requests"] == 4
+    assert report["duration_seconds"] == 1.5
+    assert store.load("missing") is None
+
+
+def test_images_are_stored_once_per_hash():
+    store = ReportStore(":memory:")
+    first = store.save("single", [IMAGE_A], ["개발자"], "per_persona", [result("개발자", 7)])
+    store.save("single", [IMAGE_A], ["디자이너"], "per_persona", [result("디자이너", 6)])
+    same_twice = store.save("ab", [IMAGE_A, IMAGE_A], ["개발자"], "per_persona", [result("개발자", 7)])
+    assert store._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0] == 1
+    assert store._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0] == 3
+    # 같은 이미지를 두 번 쓴 리포트도 이미지 순서 그대로 복원
+    assert len(store.load(same_twice)["images"]) == 2
+    assert store.load(first)["images"][0]["data"] == base64.b64decode(IMAGE_A)
+
+
+def test_iter_results_filters_same_screens():
+    store = ReportStore(":memory:")
+    first = store.save("single", [IMAGE_A], ["개발자"], "per_persona", [result("개발자", 7)])
+    second = store.save("single", [IMAGE_A], ["개발자"], "per_persona", [result("개발자", 8)])
+    other_screen = store.save("single", [IMAGE_B], ["개발자"], "per_persona", [result("개발자", 3)])
+    other_kind = store.save("ab", [IMAGE_A, IMAGE_B], ["개발자"], "per_persona", [result("개발자", 5)])
+
+    same = {report["id"] for report in store.iter_results(same_screens_as=first)}
+    assert same == {first, second}
+    assert {report["id"] for report in store.iter_results(kind="ab")} == {other_kind}
+    assert {report["id"] for report in store.iter_results(kind="single")} == {first, second, other_screen}
+    assert len(list(store.iter_results(limit=2))) == 2
+    assert list(store.iter_results(same_screens_as="missing")) == []
+    report = next(store.iter_results(same_screens_as=other_screen))
+    assert report["results"][0]["structured"]["score"] == 3
+    assert "images" not in report
@@ -0,0 +1,48 @@
+"""결과 캐시의 TTL 만료와 용량 기준 LRU 제거"""
+
+import result_cache
+from result_cache import ResultCache, make_cache_key
+
+
+def test_make_cache_key_ignores_argument_order():
+    assert make_cache_key(a=1, b=[2, 3]) == make_cache_key(b=[2, 3], a=1)
+    assert make_cache_key(a=1) != make_cache_key(a=2)
+
+
+def test_get_returns_stored_value_and_counts_hits():
+    cache = ResultCache(":memory:")
+    assert cache.get("missing") is None
+    cache.set("key", {"score": 7})
+    assert cache.get("key") == {"score": 7}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: clock[0])
+    cache = ResultCache(":memory:", ttl_seconds=60)
+    cache.set("key", {"score": 7})
+    clock[0] += 59
+    assert cache.get("key") == {"score": 7}
+    clock[0] += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_removes_least_recently_used_first(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: clock[0])
+    value = {"text": "x" * 100}
+    cache = ResultCache(":memory:", max_bytes=250)
+    cache.set("old", value)
+    clock[0] += 1
+    cache.set("recent", value)
+    clock[0] += 1
+    # old를 다시 읽으면 recent가 가장 오래 사용되지 않은 항목이 됨
+    assert cache.get("old") is not None
+    clock[0] += 1
+    cache.set("new", value)
+    assert cache.get("recent") is None
+    assert cache.get("old") is not None
+    assert cache.get("new") is not None
@@ -0,0 +1,62 @@
+"""반복 샘플링의 t 신뢰구간, 수렴 판정, 샘플 병합"""
+
+import math
+
+import pytest
+
+from sampling import SamplingOptions, converged, mean_interval, merge_samples, sampling_summary
+
+
+def test_mean_interval_uses_student_t():
+    mean, std, half_width = mean_interval([6, 7, 8])
+    assert mean == pytest.approx(7.0)
+    assert std == pytest.approx(1.0)
+    # 자유도 2의 t(0.975) = 4.303
+    assert half_width == pytest.approx(4.303 / math.sqrt(3))
+
+
+def test_mean_interval_edge_cases():
+    assert mean_interval([]) is None
+    assert mean_interval([5]) == (5, math.inf, math.inf)
+    # 자유도 20 이상은 정규분포 근사
+    _, std, half_width = mean_interval([0, 1] * 11)
+    assert half_width == pytest.approx(1.96 * std / math.sqrt(22))
+
+
+def test_converged_compares_full_interval_width():
+    assert converged([7, 7, 7], 1.0)
+    assert not converged([7], 1.0)
+    assert not converged([6, 7, 8], 1.0)
+    assert converged([6, 7, 8], 2 * 4.303 / math.sqrt(3) + 1e-9)
+    assert not converged([], 1.0)
+
+
+def test_sampling_options_batches():
+    options = SamplingOptions(max_samples=6, initial_samples=3, batch_samples=2)
+    assert options.enabled
+    assert options.first_batch() == 3
+    assert options.next_batch(3) == 2
+    assert options.next_batch(5) == 1
+    assert not SamplingOptions().enabled
+    assert SamplingOptions(max_samples=2, initial_samples=5).first_batch() == 2
+
+
+def test_merge_samples_keeps_representative_text_with_mean_score():
+    samples = [{"score": 5, "summary": "a"}, {"score": 8, "summary": "b"}, {"score": 7, "summary": "c"}]
+    representative, merged = merge_samples(samples, "score")
+    assert representative == 2
+    assert merged == {"score": 6.7, "summary": "c"}
+
+
+def test_merge_samples_rebalances_preferences():
+    samples = [{"preference_a": 40, "preference_b": 60, "preferred": "B"},
+               {"preference_a": 80, "preference_b": 20, "preferred": "A"}]
+    _, merged = merge_samples(samples, "preference_a")
+    assert (merged["preference_a"], merged["preference_b"], merged["preferred"]) == (60, 40, "A")
+
+
+def test_sampling_summary_reports_interval():
+    summary = sampling_summary([{"score": 6}, {"score": 7}, {"score": 8}], "score", 2, 1.0)
+    assert (summary["samples"], summary["requests"], summary["converged"]) == (3, 2, False)
+    assert summary["ci_low"] == pytest.approx(7 - 4.303 / math.sqrt(3))
+    assert sampling_summary([{"score": 7}], "score", 1, 1.0)["ci_low"] is None